@@ -0,0 +1,74 @@
+"""unique user progress
+
+Revision ID: a97276c68186
+Revises: b4ff15cdf246
+Create Date: 2026-10-17 01:48:44.437082
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a97276c68186'
+down_revision: Union[str, None] = 'b4ff15cdf246'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# models.progress.TITLE_THRESHOLDS as of this revision
+TITLE_THRESHOLDS = [(0, "Beginner"), (200, "Confident"), (500, "Strategist"), (900, "Investor"), (1400, "Master")]
+
+# Double-submitted completions left duplicate rows; keep one per (user, lesson),
+# preferring a completed row, then the oldest
+DUPLICATE = """
+    EXISTS (
+        SELECT 1 FROM user_progress AS keep
+        WHERE keep.user_id = user_progress.user_id
+          AND keep.lesson_id = user_progress.lesson_id
+          AND (COALESCE(keep.completed, false) > COALESCE(user_progress.completed, false)
+               OR (COALESCE(keep.completed, false) = COALESCE(user_progress.completed, false)
+                   AND keep.id < user_progress.id))
+    )
+"""
+
+
+def title_case(column: str) -> str:
+    whens = " ".join(
+        f"WHEN {column} >= {threshold} THEN '{title}'" for threshold, title in reversed(TITLE_THRESHOLDS)
+    )
+    return f"CASE {whens} ELSE '{TITLE_THRESHOLDS[0][1]}' END"
+
+
+def upgrade() -> None:
+    # Every completed duplicate was awarded its XP again: take it back
+    op.execute(f"""
+        UPDATE user_stats SET total_xp = COALESCE(total_xp, 0) - (
+            SELECT COALESCE(SUM(user_progress.xp_earned), 0) FROM user_progress
+            WHERE user_progress.user_id = user_stats.user_id
+              AND COALESCE(user_progress.completed, false) = true
+              AND {DUPLICATE}
+        )
+    """)
+    op.execute(f"UPDATE user_stats SET current_title = {title_case('total_xp')}")
+    op.execute(f"DELETE FROM user_progress WHERE {DUPLICATE}")
+
+    # The per-module counters counted the duplicates too: recount them
+    op.execute("DELETE FROM user_level_progress")
+    op.execute("""
+        INSERT INTO user_level_progress (user_id, level, module, completed_count)
+        SELECT user_progress.user_id, lessons.level, lessons.module, COUNT(user_progress.id)
+        FROM user_progress JOIN lessons ON lessons.id = user_progress.lesson_id
+        WHERE user_progress.completed = true
+        GROUP BY user_progress.user_id, lessons.level, lessons.module
+    """)
+
+    with op.batch_alter_table('user_progress') as batch_op:
+        batch_op.create_unique_constraint('uq_user_progress', ['user_id', 'lesson_id'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('user_progress') as batch_op:
+        batch_op.drop_constraint('uq_user_progress', type_='unique')
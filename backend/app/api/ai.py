@@ -1,12 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import math
+from typing import Optional, Union
 
-from ..database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import get_db, get_session_factory
 from ..models.user import User
-from ..services.auth import get_current_user
-from ..services import ai_service
+from ..services.auth import CurrentIdentity, get_current_identity, get_current_user
+from ..services import ai_service, jobs, rate_limiter
+from ..services.admission import OverloadedError
+from ..services.circuit_breaker import CircuitOpenError
+from ..services.rate_limiter import RateLimitExceeded
+from ..services.sse import SSE_HEADERS, SSE_MEDIA_TYPE, sse_event
+from .jobs import accepted, prefers_async
 from ..schemas.ai_schemas import (
-    CoachChatRequest, CoachChatResponse,
+    CoachChatRequest, CoachChatResponse, ChatHistoryResponse,
     RegenerateRequest, RegenerateResponse,
     LifeExampleRequest, LifeExampleResponse,
     DictionaryRequest, DictionaryResponse,
@@ -15,15 +24,31 @@ from ..schemas.ai_schemas import (
 router = APIRouter()
 
 
+def rate_limited(e: RateLimitExceeded) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=str(e),
+        headers={"Retry-After": str(math.ceil(e.retry_after))},
+    )
+
+
+def overloaded(e: Union[OverloadedError, CircuitOpenError]) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e),
+        headers={"Retry-After": str(math.ceil(e.retry_after))},
+    )
+
+
 @router.post("/coach", response_model=CoachChatResponse)
 async def coach_chat(
     request: CoachChatRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     """AI Financial Coach — contextual chat during lessons."""
     try:
-        return ai_service.coach_chat(
+        return await ai_service.coach_chat(
             db=db,
             user_id=current_user.id,
             lesson_id=request.lesson_id,
@@ -31,32 +56,98 @@ async def coach_chat(
             user_level=request.user_level,
             recent_quiz_errors=request.recent_quiz_errors,
         )
+    except RateLimitExceeded as e:
+        raise rate_limited(e)
+    except (OverloadedError, CircuitOpenError) as e:
+        raise overloaded(e)
     except ValueError as e:
-        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS if "Rate limit" in str(e) else status.HTTP_400_BAD_REQUEST, detail=str(e))
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Coach chat error: {str(e)}")
 
 
-@router.post("/lesson-regenerate", response_model=RegenerateResponse)
-async def regenerate_lesson(
-    request: RegenerateRequest,
-    db: Session = Depends(get_db),
+@router.post("/coach/stream")
+async def coach_chat_stream(
+    request: CoachChatRequest,
+    db: AsyncSession = Depends(get_db),
+    session_factory = Depends(get_session_factory),
     current_user: User = Depends(get_current_user),
 ):
-    """Regenerate lesson content with custom difficulty/length/focus settings."""
+    """
+    Coach chat as server-sent events: `token` events carry reply text as it
+    is generated, then one `done` event carries the saved message.
+    """
     try:
-        return ai_service.regenerate_lesson(
+        turn = await ai_service.start_coach_stream(
             db=db,
             user_id=current_user.id,
             lesson_id=request.lesson_id,
-            difficulty=request.params.difficulty,
-            length=request.params.length,
-            more_examples=request.params.more_examples,
-            topic_focus=request.params.topic_focus,
-            user_level=1,  # TODO: inject from user profile once M5 is done
+            user_message=request.user_message,
+            user_level=request.user_level,
+            recent_quiz_errors=request.recent_quiz_errors,
         )
+    except RateLimitExceeded as e:
+        raise rate_limited(e)
+    except (OverloadedError, CircuitOpenError) as e:
+        raise overloaded(e)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    async def events():
+        async for event, data in ai_service.stream_coach_reply(session_factory, turn):
+            yield sse_event(data, event=event)
+    
+    return StreamingResponse(events(), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+
+@router.get("/coach/history", response_model=ChatHistoryResponse)
+async def coach_history(
+    lesson_id: int,
+    before: Optional[str] = Query(None, description="Cursor from a previous page or coach reply"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentIdentity = Depends(get_current_identity),
+):
+    """Coach chat history for one lesson, newest page first (messages oldest-first within a page)."""
+    try:
+        return await ai_service.get_chat_history(db, current_user.id, lesson_id, before=before, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post("/lesson-regenerate", response_model=RegenerateResponse)
+async def regenerate_lesson(
+    request: RegenerateRequest,
+    http_request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Regenerate lesson content with custom difficulty/length/focus settings."""
+    params = dict(
+        user_id=current_user.id,
+        lesson_id=request.lesson_id,
+        difficulty=request.params.difficulty,
+        length=request.params.length,
+        more_examples=request.params.more_examples,
+        topic_focus=request.params.topic_focus,
+        user_level=1,  # TODO: inject from user profile once M5 is done
+    )
+    if prefers_async(http_request):
+        try:
+            await rate_limiter.enforce("regenerate", current_user.id)
+        except RateLimitExceeded as e:
+            raise rate_limited(e)
+        job = await jobs.enqueue(db, "ai_regenerate", params, user_id=current_user.id)
+        return accepted(job)
+    
+    try:
+        return await ai_service.regenerate_lesson(db=db, **params)
+    except RateLimitExceeded as e:
+        raise rate_limited(e)
+    except (OverloadedError, CircuitOpenError) as e:
+        raise overloaded(e)
     except ValueError as e:
-        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS if "Rate limit" in str(e) else status.HTTP_400_BAD_REQUEST, detail=str(e))
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Regeneration error: {str(e)}")
 
@@ -64,12 +155,12 @@ async def regenerate_lesson(
 @router.post("/life-example", response_model=LifeExampleResponse)
 async def life_example(
     request: LifeExampleRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     """Generate a personalized financial example based on user's situation."""
     try:
-        return ai_service.generate_life_example(
+        return await ai_service.generate_life_example(
             db=db,
             user_id=current_user.id,
             income_type=request.income_type,
@@ -78,8 +169,12 @@ async def life_example(
             goals=request.goals,
             lesson_id=request.lesson_id,
         )
+    except RateLimitExceeded as e:
+        raise rate_limited(e)
+    except (OverloadedError, CircuitOpenError) as e:
+        raise overloaded(e)
     except ValueError as e:
-        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS if "Rate limit" in str(e) else status.HTTP_400_BAD_REQUEST, detail=str(e))
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Life example error: {str(e)}")
 
@@ -87,19 +182,23 @@ async def life_example(
 @router.post("/dictionary", response_model=DictionaryResponse)
 async def dictionary_lookup(
     request: DictionaryRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     """Look up a financial term definition with example and mini-quiz."""
     try:
-        return ai_service.dictionary_lookup(
+        return await ai_service.dictionary_lookup(
             db=db,
             user_id=current_user.id,
             term=request.term,
             lesson_id=request.lesson_id,
             user_level=request.user_level,
         )
+    except RateLimitExceeded as e:
+        raise rate_limited(e)
+    except (OverloadedError, CircuitOpenError) as e:
+        raise overloaded(e)
     except ValueError as e:
-        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS if "Rate limit" in str(e) else status.HTTP_400_BAD_REQUEST, detail=str(e))
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Dictionary error: {str(e)}")
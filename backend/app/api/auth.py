@@ -1,34 +1,49 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..database import get_db
 from ..schemas.user import UserCreate, UserLogin, UserResponse, Token, RefreshToken
 from ..services.auth import AuthService, get_current_user
+from ..services.password_pool import PasswordPoolSaturated
 from ..models.user import User
 
 router = APIRouter()
 
 
+def _password_pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-ins right now, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/signup", response_model=Token, status_code=status.HTTP_201_CREATED)
-async def signup(user_data: UserCreate, db: Session = Depends(get_db)):
-    existing_user = AuthService.get_user_by_email(db, user_data.email)
+async def signup(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
+    existing_user = await AuthService.get_user_by_email(db, user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    user = AuthService.create_user(db, user_data.name, user_data.email, user_data.password)
+    try:
+        user = await AuthService.create_user(db, user_data.name, user_data.email, user_data.password)
+    except PasswordPoolSaturated:
+        raise _password_pool_busy()
     
-    access_token = AuthService.create_access_token({"sub": str(user.id), "email": user.email})
+    access_token = AuthService.create_access_token(AuthService.identity_claims(user))
     refresh_token = AuthService.create_refresh_token({"sub": str(user.id), "email": user.email})
     
     return Token(access_token=access_token, refresh_token=refresh_token)
 
 
 @router.post("/login", response_model=Token)
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
-    user = AuthService.authenticate_user(db, user_data.email, user_data.password)
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_db)):
+    try:
+        user = await AuthService.authenticate_user(db, user_data.email, user_data.password)
+    except PasswordPoolSaturated:
+        raise _password_pool_busy()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -36,14 +51,14 @@ async def login(user_data: UserLogin, db: Session = Depends(get_db)):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token = AuthService.create_access_token({"sub": str(user.id), "email": user.email})
+    access_token = AuthService.create_access_token(AuthService.identity_claims(user))
     refresh_token = AuthService.create_refresh_token({"sub": str(user.id), "email": user.email})
     
     return Token(access_token=access_token, refresh_token=refresh_token)
 
 
 @router.post("/refresh", response_model=Token)
-async def refresh_token(token_data: RefreshToken, db: Session = Depends(get_db)):
+async def refresh_token(token_data: RefreshToken, db: AsyncSession = Depends(get_db)):
     token_payload = AuthService.verify_token(token_data.refresh_token, "refresh")
     if not token_payload:
         raise HTTPException(
@@ -52,14 +67,14 @@ async def refresh_token(token_data: RefreshToken, db: Session = Depends(get_db))
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = AuthService.get_user_by_id(db, token_payload.user_id)
+    user = await AuthService.get_user_by_id(db, token_payload.user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
     
-    access_token = AuthService.create_access_token({"sub": str(user.id), "email": user.email})
+    access_token = AuthService.create_access_token(AuthService.identity_claims(user))
     refresh_token = AuthService.create_refresh_token({"sub": str(user.id), "email": user.email})
     
     return Token(access_token=access_token, refresh_token=refresh_token)
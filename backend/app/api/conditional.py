@@ -0,0 +1,73 @@
+"""
+Conditional GET for read endpoints.
+
+`Depends(conditional(...))` builds a strong ETag from cheap validators
+(the shared catalog version, per-user version counters, hashes of static
+data) before the endpoint runs. If the request's If-None-Match already
+names it, NotModified short-circuits to an empty 304 and the handler body
+never runs; otherwise the ETag is added to the response. The validators
+are counters kept in the database, so every worker computes the same ETag
+for the same data.
+
+The ETag also covers the path and the user, so a browser shared by two
+accounts never revalidates one user's cached body with the other's.
+"""
+import hashlib
+import json
+from typing import Any, Awaitable, Callable
+
+from fastapi import Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import get_db
+from ..services import metrics, versions
+from ..services.auth import CurrentIdentity, get_current_identity
+from ..services.http_cache import CACHE_CONTROL, etag_for, etag_matches
+
+# Bump when a covered endpoint's response shape changes without any data changing
+RESPONSE_FORMAT = "1"
+
+Validator = Callable[[AsyncSession, int], Awaitable[Any]]
+
+
+class NotModified(Exception):
+    def __init__(self, etag: str):
+        self.etag = etag
+
+
+async def catalog_version(db: AsyncSession, user_id: int) -> int:
+    return await versions.get_shared_version(db, versions.CATALOG)
+
+
+def user_version(scope: str) -> Validator:
+    async def validator(db: AsyncSession, user_id: int) -> int:
+        return await versions.get_version(db, user_id, scope)
+    return validator
+
+
+def static_version(data: Any) -> Validator:
+    """For endpoints serving module constants: the hash of the data."""
+    digest = hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+    async def validator(db: AsyncSession, user_id: int) -> str:
+        return digest
+    return validator
+
+
+def conditional(*validators: Validator):
+    async def check(
+        request: Request,
+        response: Response,
+        db: AsyncSession = Depends(get_db),
+        current_user: CurrentIdentity = Depends(get_current_identity),
+    ) -> None:
+        parts = [RESPONSE_FORMAT, request.url.path, current_user.id]
+        for validator in validators:
+            parts.append(await validator(db, current_user.id))
+        etag = etag_for("|".join(map(str, parts)).encode())
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            metrics.inc("http_cache.not_modified")
+            raise NotModified(etag)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = CACHE_CONTROL
+    return check
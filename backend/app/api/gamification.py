@@ -2,14 +2,19 @@
 import json
 from datetime import datetime, date
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, defer
 from pydantic import BaseModel, Field
 from typing import Optional, List
 
 from ..database import get_db
 from ..models.user import User
 from ..models.gamification import Duel, BudgetScenario, TrapScenario, HabitTracker
-from ..api.auth import get_current_user
+from ..services import versions, xp
+from ..services.auth import CurrentIdentity, get_current_identity, get_current_user
+from ..services.xp import award_xp
+from .conditional import conditional, static_version, user_version
 
 router = APIRouter()
 
@@ -25,7 +30,8 @@ class DuelAnswer(BaseModel):
     duel_id: int
     score: int = Field(..., ge=0)
 
-class DuelOut(BaseModel):
+class DuelSummary(BaseModel):
+    """A duel in listings; the questions come from GET /duels/{id}."""
     id: int
     invite_code: str
     challenger_id: int
@@ -37,9 +43,11 @@ class DuelOut(BaseModel):
     winner_id: Optional[int] = None
     challenger_score: int
     opponent_score: int
-    questions_json: Optional[str] = None
     created_at: datetime
 
+class DuelOut(DuelSummary):
+    questions_json: Optional[str] = None
+
 class BudgetCreate(BaseModel):
     monthly_income: float = Field(..., gt=0)
 
@@ -97,7 +105,7 @@ DUEL_QUESTIONS = {
 @router.post("/duels/create", response_model=DuelOut)
 async def create_duel(
     body: DuelCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     level = min(body.level, 3)
@@ -108,18 +116,17 @@ async def create_duel(
         questions_json=questions,
     )
     db.add(duel)
-    db.commit()
-    db.refresh(duel)
-    return _duel_out(duel, db)
+    await db.commit()
+    return await _get_duel_out(db, duel.id)
 
 
 @router.post("/duels/join", response_model=DuelOut)
 async def join_duel(
     body: DuelJoin,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    duel = db.query(Duel).filter(Duel.invite_code == body.invite_code.upper()).first()
+    duel = await db.scalar(select(Duel).where(Duel.invite_code == body.invite_code.upper()))
     if not duel:
         raise HTTPException(404, "Duel not found")
     if duel.status != "pending":
@@ -128,19 +135,18 @@ async def join_duel(
         raise HTTPException(400, "You can't join your own duel")
     duel.opponent_id = current_user.id
     duel.status = "active"
-    db.commit()
-    db.refresh(duel)
-    return _duel_out(duel, db)
+    await db.commit()
+    return await _get_duel_out(db, duel.id)
 
 
 @router.post("/duels/{duel_id}/submit")
 async def submit_duel_score(
     duel_id: int,
     body: DuelAnswer,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    duel = db.query(Duel).filter(Duel.id == duel_id).first()
+    duel = await db.get(Duel, duel_id)
     if not duel:
         raise HTTPException(404, "Duel not found")
     
@@ -160,35 +166,80 @@ async def submit_duel_score(
         elif duel.opponent_score > duel.challenger_score:
             duel.winner_id = duel.opponent_id
     
-    db.commit()
-    db.refresh(duel)
-    return _duel_out(duel, db)
+    await db.commit()
+    return await _get_duel_out(db, duel.id)
 
 
 @router.get("/duels/my", response_model=List[DuelOut])
 async def my_duels(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentIdentity = Depends(get_current_identity),
 ):
-    duels = db.query(Duel).filter(
-        (Duel.challenger_id == current_user.id) | (Duel.opponent_id == current_user.id)
-    ).order_by(Duel.created_at.desc()).limit(20).all()
-    return [_duel_out(d, db) for d in duels]
+    # Kept with questions for clients that start a duel from the list;
+    # new clients should use /duels/my/summary and GET /duels/{id}
+    rows = (await db.execute(_my_duels_query(current_user.id))).all()
+    return [_duel_out(DuelOut, *row) for row in rows]
+
 
+@router.get("/duels/my/summary", response_model=List[DuelSummary])
+async def my_duel_summaries(
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentIdentity = Depends(get_current_identity),
+):
+    rows = (await db.execute(_my_duels_query(current_user.id).options(defer(Duel.questions_json)))).all()
+    return [_duel_out(DuelSummary, *row) for row in rows]
+
+
+@router.get("/duels/{duel_id}", response_model=DuelOut)
+async def get_duel(
+    duel_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentIdentity = Depends(get_current_identity),
+):
+    duel = await _get_duel_out(db, duel_id)
+    if current_user.id not in (duel.challenger_id, duel.opponent_id):
+        raise HTTPException(403, "You are not part of this duel")
+    return duel
 
-def _duel_out(duel: Duel, db: Session) -> DuelOut:
-    c = db.query(User).get(duel.challenger_id) if duel.challenger_id else None
-    o = db.query(User).get(duel.opponent_id) if duel.opponent_id else None
-    return DuelOut(
+
+def _duels_with_names():
+    """Duels with both players' names in one query (no per-duel user lookups)."""
+    challenger = aliased(User)
+    opponent = aliased(User)
+    return (
+        select(Duel, challenger.name, opponent.name)
+        .outerjoin(challenger, challenger.id == Duel.challenger_id)
+        .outerjoin(opponent, opponent.id == Duel.opponent_id)
+    )
+
+
+def _my_duels_query(user_id: int):
+    return _duels_with_names().where(
+        (Duel.challenger_id == user_id) | (Duel.opponent_id == user_id)
+    ).order_by(Duel.created_at.desc()).limit(20)
+
+
+async def _get_duel_out(db: AsyncSession, duel_id: int) -> DuelOut:
+    row = (await db.execute(_duels_with_names().where(Duel.id == duel_id))).first()
+    if row is None:
+        raise HTTPException(404, "Duel not found")
+    return _duel_out(DuelOut, *row)
+
+
+def _duel_out(shape, duel: Duel, challenger_name: Optional[str], opponent_name: Optional[str]):
+    fields = dict(
         id=duel.id, invite_code=duel.invite_code or "",
-        challenger_id=duel.challenger_id, challenger_name=c.name if c else None,
-        opponent_id=duel.opponent_id, opponent_name=o.name if o else None,
+        challenger_id=duel.challenger_id, challenger_name=challenger_name,
+        opponent_id=duel.opponent_id, opponent_name=opponent_name,
         level=duel.level, status=duel.status or "pending",
         winner_id=duel.winner_id,
         challenger_score=duel.challenger_score or 0,
         opponent_score=duel.opponent_score or 0,
-        questions_json=duel.questions_json, created_at=duel.created_at,
+        created_at=duel.created_at,
     )
+    if shape is DuelOut:
+        fields["questions_json"] = duel.questions_json
+    return shape(**fields)
 
 # ─────────────── BUDGET SIMULATOR ──────────────────────────────────
 
@@ -206,7 +257,7 @@ BUDGET_CATEGORIES = ["Rent", "Food", "Transport", "Savings", "Entertainment", "U
 @router.post("/budget/start")
 async def start_budget(
     body: BudgetCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     import random
@@ -217,8 +268,8 @@ async def start_budget(
         scenario_text=scenario_text,
     )
     db.add(scenario)
-    db.commit()
-    db.refresh(scenario)
+    await db.commit()
+    await db.refresh(scenario)
     return {
         "id": scenario.id,
         "scenario_text": scenario.scenario_text,
@@ -231,13 +282,13 @@ async def start_budget(
 async def submit_budget(
     scenario_id: int,
     body: BudgetAllocate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    scenario = db.query(BudgetScenario).filter(
+    scenario = await db.scalar(select(BudgetScenario).where(
         BudgetScenario.id == scenario_id,
         BudgetScenario.user_id == current_user.id,
-    ).first()
+    ))
     if not scenario:
         raise HTTPException(404, "Scenario not found")
     
@@ -278,7 +329,7 @@ async def submit_budget(
         feedback_parts.append("Budget balances well — every dollar has a job! ✅")
     
     scenario.feedback = " ".join(feedback_parts)
-    db.commit()
+    await db.commit()
     
     return {
         "score": score,
@@ -357,7 +408,7 @@ TRAP_SCENARIOS_DATA = {
 @router.post("/traps/start")
 async def start_trap(
     body: TrapStart,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     if body.scenario_type not in TRAP_SCENARIOS_DATA:
@@ -371,8 +422,8 @@ async def start_trap(
         user_choices="[]",
     )
     db.add(trap)
-    db.commit()
-    db.refresh(trap)
+    await db.commit()
+    await db.refresh(trap)
     return {
         "id": trap.id,
         "title": scenario_data["title"],
@@ -386,13 +437,13 @@ async def start_trap(
 async def choose_trap(
     trap_id: int,
     body: TrapChoice,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    trap = db.query(TrapScenario).filter(
+    trap = await db.scalar(select(TrapScenario).where(
         TrapScenario.id == trap_id,
         TrapScenario.user_id == current_user.id,
-    ).first()
+    ))
     if not trap:
         raise HTTPException(404, "Scenario not found")
     
@@ -412,18 +463,27 @@ async def choose_trap(
     next_step_idx = step_idx + 1
     if next_step_idx >= len(scenario_data["steps"]):
         all_safe = all(c["safe"] for c in choices)
-        trap.outcome = "survived" if all_safe else "trapped"
-        trap.xp_earned = 30 if all_safe else 10
-        db.commit()
+        outcome = "survived" if all_safe else "trapped"
+        xp_earned = 30 if all_safe else 10
+        # Only the request that finishes the scenario awards its XP
+        finished = await db.execute(
+            update(TrapScenario)
+            .where(TrapScenario.id == trap.id, TrapScenario.outcome.is_(None))
+            .values(outcome=outcome, xp_earned=xp_earned)
+        )
+        if finished.rowcount:
+            await award_xp(db, current_user.id, xp_earned, xp.TRAP, ref_id=trap.id, activity=False)
+            await versions.bump_version(db, current_user.id, versions.PROGRESS)
+        await db.commit()
         return {
             "finished": True,
-            "outcome": trap.outcome,
-            "xp_earned": trap.xp_earned,
+            "outcome": outcome,
+            "xp_earned": xp_earned,
             "is_safe": is_safe,
             "choices_summary": choices,
         }
     
-    db.commit()
+    await db.commit()
     next_step = scenario_data["steps"][next_step_idx]
     return {
         "finished": False,
@@ -434,8 +494,8 @@ async def choose_trap(
     }
 
 
-@router.get("/traps/types")
-async def trap_types(current_user: User = Depends(get_current_user)):
+@router.get("/traps/types", dependencies=[Depends(conditional(static_version(TRAP_SCENARIOS_DATA)))])
+async def trap_types(current_user: CurrentIdentity = Depends(get_current_identity)):
     return [
         {"type": k, "title": v["title"], "intro": v["intro"]}
         for k, v in TRAP_SCENARIOS_DATA.items()
@@ -453,14 +513,17 @@ PRESET_HABITS = [
 ]
 
 
-@router.get("/habits")
+@router.get(
+    "/habits",
+    dependencies=[Depends(conditional(static_version(PRESET_HABITS), user_version(versions.HABITS)))],
+)
 async def get_habits(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentIdentity = Depends(get_current_identity),
 ):
-    habits = db.query(HabitTracker).filter(
+    habits = (await db.scalars(select(HabitTracker).where(
         HabitTracker.user_id == current_user.id,
-    ).order_by(HabitTracker.created_at.desc()).all()
+    ).order_by(HabitTracker.created_at.desc()))).all()
     return {
         "habits": [_habit_out(h) for h in habits],
         "presets": PRESET_HABITS,
@@ -470,13 +533,13 @@ async def get_habits(
 @router.post("/habits")
 async def create_habit(
     body: HabitCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    active_count = db.query(HabitTracker).filter(
+    active_count = await db.scalar(select(func.count(HabitTracker.id)).where(
         HabitTracker.user_id == current_user.id,
         HabitTracker.is_active == True,
-    ).count()
+    ))
     if active_count >= 5:
         raise HTTPException(400, "Maximum 5 active habits. Complete or remove one first.")
     
@@ -487,21 +550,22 @@ async def create_habit(
         completions_json="[]",
     )
     db.add(habit)
-    db.commit()
-    db.refresh(habit)
+    await versions.bump_version(db, current_user.id, versions.HABITS)
+    await db.commit()
+    await db.refresh(habit)
     return _habit_out(habit)
 
 
 @router.post("/habits/{habit_id}/check")
 async def check_habit(
     habit_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    habit = db.query(HabitTracker).filter(
+    habit = await db.scalar(select(HabitTracker).where(
         HabitTracker.id == habit_id,
         HabitTracker.user_id == current_user.id,
-    ).first()
+    ))
     if not habit:
         raise HTTPException(404, "Habit not found")
     
@@ -529,25 +593,27 @@ async def check_habit(
     if streak > (habit.streak_best or 0):
         habit.streak_best = streak
     
-    db.commit()
-    db.refresh(habit)
+    await versions.bump_version(db, current_user.id, versions.HABITS)
+    await db.commit()
+    await db.refresh(habit)
     return _habit_out(habit)
 
 
 @router.delete("/habits/{habit_id}")
 async def delete_habit(
     habit_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    habit = db.query(HabitTracker).filter(
+    habit = await db.scalar(select(HabitTracker).where(
         HabitTracker.id == habit_id,
         HabitTracker.user_id == current_user.id,
-    ).first()
+    ))
     if not habit:
         raise HTTPException(404, "Habit not found")
-    db.delete(habit)
-    db.commit()
+    await db.delete(habit)
+    await versions.bump_version(db, current_user.id, versions.HABITS)
+    await db.commit()
     return {"ok": True}
 
 
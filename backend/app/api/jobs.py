@@ -0,0 +1,89 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import get_db, get_session_factory
+from ..models.job import Job
+from ..schemas.job import JobAccepted, JobResponse
+from ..services import jobs
+from ..services.auth import CurrentIdentity, get_current_identity
+from ..services.sse import SSE_HEADERS, SSE_MEDIA_TYPE, sse_comment, sse_event
+
+router = APIRouter()
+
+LONG_POLL_MAX_SECONDS = 30
+SSE_HEARTBEAT_SECONDS = 15
+
+
+def prefers_async(request: Request) -> bool:
+    """True when the client sent `Prefer: respond-async` (RFC 7240)."""
+    return "respond-async" in request.headers.get("prefer", "").lower()
+
+
+def accepted(job: Job) -> JSONResponse:
+    """202 Accepted pointing at the job's status and event stream."""
+    status_url = f"/api/jobs/{job.id}"
+    body = JobAccepted(
+        job_id=job.id,
+        status=job.status,
+        status_url=status_url,
+        events_url=f"{status_url}/events",
+    )
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=body.model_dump(),
+        headers={"Location": status_url, "Preference-Applied": "respond-async"},
+    )
+
+
+async def _get_own_job(db: AsyncSession, job_id: int, user_id: int) -> Job:
+    job = await db.get(Job, job_id)
+    if not job or job.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: int,
+    wait: float = Query(0, ge=0, le=LONG_POLL_MAX_SECONDS, description="Long-poll: seconds to wait for the job to finish"),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentIdentity = Depends(get_current_identity)
+):
+    job = await _get_own_job(db, job_id, current_user.id)
+    if wait and job.status not in jobs.TERMINAL_STATUSES:
+        job = await jobs.wait_for_job(db, job_id, wait)
+    return jobs.job_response(job)
+
+
+@router.get("/{job_id}/events")
+async def job_events(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    session_factory = Depends(get_session_factory),
+    current_user: CurrentIdentity = Depends(get_current_identity)
+):
+    """Server-sent events: one `status` event per state change, ending with the final state."""
+    await _get_own_job(db, job_id, current_user.id)
+    
+    async def stream():
+        # The request's session is closed once the response starts
+        async with session_factory() as stream_db:
+            seen = None
+            while True:
+                job = await jobs.wait_for_job(
+                    stream_db, job_id, SSE_HEARTBEAT_SECONDS,
+                    until=lambda j: (j.status, j.attempts) != seen,
+                )
+                if job is None:
+                    return
+                state = (job.status, job.attempts)
+                if state == seen:
+                    yield sse_comment()
+                    continue
+                seen = state
+                yield sse_event(jobs.job_response(job).model_dump(mode="json"), event="status", event_id=str(job.attempts))
+                if job.status in jobs.TERMINAL_STATUSES:
+                    return
+    
+    return StreamingResponse(stream(), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
@@ -1,18 +1,23 @@
-import json
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from ..database import get_db
+from ..database import get_db, get_session_factory
 from ..models.lesson import Lesson, LessonContent
 from ..models.user import User
 from ..models.progress import UserProgress
 from ..schemas.lesson import (
     LessonResponse, LessonListResponse, LessonContentResponse,
-    LevelResponse, ModuleResponse, FlashcardSchema, QuizQuestionSchema
+    LevelResponse, ModuleResponse
 )
-from ..services.auth import get_current_user
-from ..services.gemini import GeminiService
+from ..services.auth import CurrentIdentity, get_current_identity, get_current_user
+from ..services.catalog import get_catalog
+from ..services import content_cache, jobs, lesson_generation, prefetch, versions
+from ..services.http_cache import json_response
+from .conditional import catalog_version, conditional, user_version
+from .jobs import accepted, prefers_async
+from ..services.progress_counters import get_module_counters, per_level
 
 router = APIRouter()
 
@@ -53,206 +58,139 @@ MODULE_TITLES = {
 }
 
 
-@router.get("", response_model=LessonListResponse)
+# The lesson tree and a user's completions: the catalog plus the user's progress
+lesson_validators = conditional(catalog_version, user_version(versions.PROGRESS))
+
+
+@router.get("", response_model=LessonListResponse, dependencies=[Depends(lesson_validators)])
 async def get_lessons(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentIdentity = Depends(get_current_identity)
 ):
-    lessons = db.query(Lesson).order_by(Lesson.level, Lesson.module, Lesson.lesson_number).all()
+    catalog = await get_catalog(db)
     
-    progress_map = {}
-    user_progress = db.query(UserProgress).filter(
-        UserProgress.user_id == current_user.id,
-        UserProgress.completed == True
-    ).all()
-    for p in user_progress:
-        progress_map[p.lesson_id] = True
-    
-    content_ids = set(
-        row[0] for row in db.query(LessonContent.lesson_id).all()
-    )
-    
-    levels_dict = {}
-    for lesson in lessons:
-        if lesson.level not in levels_dict:
-            levels_dict[lesson.level] = {}
-        if lesson.module not in levels_dict[lesson.level]:
-            levels_dict[lesson.level][lesson.module] = []
-        
-        levels_dict[lesson.level][lesson.module].append(
-            LessonResponse(
-                id=lesson.id,
-                level=lesson.level,
-                module=lesson.module,
-                lesson_number=lesson.lesson_number,
-                title=lesson.title,
-                topic_key=lesson.topic_key,
-                quest_emoji=lesson.quest_emoji,
-                quest_hook=lesson.quest_hook,
-                has_content=lesson.id in content_ids,
-                is_completed=progress_map.get(lesson.id, False)
-            )
+    completed_per_level = per_level(await get_module_counters(db, current_user.id))
+    completed_ids = set((await db.scalars(
+        select(UserProgress.lesson_id).where(
+            UserProgress.user_id == current_user.id,
+            UserProgress.completed == True
         )
+    )).all())
     
     levels = []
-    for level_num in sorted(levels_dict.keys()):
-        modules = []
-        for module_num in sorted(levels_dict[level_num].keys()):
-            modules.append(ModuleResponse(
+    for level_num, level_modules in catalog.tree.items():
+        modules = [
+            ModuleResponse(
                 module_number=module_num,
                 module_title=MODULE_TITLES.get(level_num, {}).get(module_num, f"Module {module_num}"),
-                lessons=levels_dict[level_num][module_num]
-            ))
-        
-        is_locked = False
-        if level_num > 1:
-            prev_level_lessons = db.query(Lesson).filter(Lesson.level == level_num - 1).count()
-            prev_level_completed = db.query(UserProgress).join(Lesson).filter(
-                UserProgress.user_id == current_user.id,
-                UserProgress.completed == True,
-                Lesson.level == level_num - 1
-            ).count()
-            
-            if prev_level_lessons > 0 and prev_level_completed < prev_level_lessons:
-                is_locked = True
+                lessons=[entry.as_response(entry.id in completed_ids) for entry in entries]
+            )
+            for module_num, entries in level_modules.items()
+        ]
         
         levels.append(LevelResponse(
             level_number=level_num,
             level_title=LEVEL_TITLES.get(level_num, f"Level {level_num}"),
             modules=modules,
-            is_locked=is_locked
+            is_locked=catalog.is_level_locked(level_num, completed_per_level)
         ))
     
     return LessonListResponse(levels=levels)
 
 
-@router.get("/{lesson_id}", response_model=LessonResponse)
+@router.get("/{lesson_id}", response_model=LessonResponse, dependencies=[Depends(lesson_validators)])
 async def get_lesson(
     lesson_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentIdentity = Depends(get_current_identity)
 ):
-    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
-    if not lesson:
+    catalog = await get_catalog(db)
+    entry = catalog.get(lesson_id)
+    if not entry:
         raise HTTPException(status_code=404, detail="Lesson not found")
     
-    if lesson.level > 1:
-        prev_level_lessons = db.query(Lesson).filter(Lesson.level == lesson.level - 1).count()
-        prev_level_completed = db.query(UserProgress).join(Lesson).filter(
+    is_completed = await db.scalar(
+        select(UserProgress.id).where(
             UserProgress.user_id == current_user.id,
-            UserProgress.completed == True,
-            Lesson.level == lesson.level - 1
-        ).count()
-        
-        if prev_level_lessons > 0 and prev_level_completed < prev_level_lessons:
-            is_lesson_completed = db.query(UserProgress).filter(
-                UserProgress.user_id == current_user.id,
-                UserProgress.lesson_id == lesson_id,
-                UserProgress.completed == True
-            ).first() is not None
-            
-            if not is_lesson_completed:
-                raise HTTPException(
-                    status_code=403, 
-                    detail=f"Content locked. Please complete Level {lesson.level - 1} first."
-                )
-    
-    has_content = db.query(LessonContent).filter(LessonContent.lesson_id == lesson_id).first() is not None
-    is_completed = db.query(UserProgress).filter(
-        UserProgress.user_id == current_user.id,
-        UserProgress.lesson_id == lesson_id,
-        UserProgress.completed == True
-    ).first() is not None
+            UserProgress.lesson_id == lesson_id,
+            UserProgress.completed == True
+        ).limit(1)
+    ) is not None
+    
+    if entry.level > 1 and not is_completed:
+        completed_per_level = per_level(await get_module_counters(db, current_user.id))
+        if catalog.is_level_locked(entry.level, completed_per_level):
+            raise HTTPException(
+                status_code=403, 
+                detail=f"Content locked. Please complete Level {entry.level - 1} first."
+            )
     
-    return LessonResponse(
-        id=lesson.id,
-        level=lesson.level,
-        module=lesson.module,
-        lesson_number=lesson.lesson_number,
-        title=lesson.title,
-        topic_key=lesson.topic_key,
-        quest_emoji=lesson.quest_emoji,
-        quest_hook=lesson.quest_hook,
-        has_content=has_content,
-        is_completed=is_completed
-    )
+    return entry.as_response(is_completed)
 
 
 @router.post("/{lesson_id}/generate", response_model=LessonContentResponse)
 async def generate_lesson_content(
     lesson_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    session_factory = Depends(get_session_factory),
     current_user: User = Depends(get_current_user)
 ):
-    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
+    lesson = await db.get(Lesson, lesson_id)
     if not lesson:
         raise HTTPException(status_code=404, detail="Lesson not found")
     
-    gemini_service = GeminiService()
-    existing_content = gemini_service.get_content(db, lesson_id)
-    
-    if existing_content:
-        flashcards = [FlashcardSchema(**fc) for fc in json.loads(existing_content.flashcards_json)]
-        quiz = [QuizQuestionSchema(**q) for q in json.loads(existing_content.quiz_json)]
-        return LessonContentResponse(
-            lesson_id=lesson_id,
-            lesson_text=existing_content.lesson_text,
-            flashcards=flashcards,
-            quiz=quiz,
-            created_at=existing_content.created_at
-        )
+    cached = await content_cache.get_content_body(db, lesson_id)
+    if cached:
+        return json_response(None, cached.body, cached.etag)
     
-    generated = gemini_service.generate_content(lesson)
-    content = gemini_service.save_content(db, lesson, generated)
+    if prefers_async(request):
+        job = await jobs.enqueue(db, "lesson_content", {"lesson_id": lesson_id}, user_id=current_user.id)
+        return accepted(job)
     
-    return LessonContentResponse(
-        lesson_id=lesson_id,
-        lesson_text=content.lesson_text,
-        flashcards=generated.flashcards,
-        quiz=generated.quiz,
-        created_at=content.created_at
-    )
+    # Concurrent callers for the same lesson share one generation
+    return await lesson_generation.generate_lesson_content(session_factory, lesson_id)
 
 
 @router.get("/{lesson_id}/content", response_model=LessonContentResponse)
 async def get_lesson_content(
     lesson_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    session_factory = Depends(get_session_factory),
+    current_user: CurrentIdentity = Depends(get_current_identity)
 ):
-    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
-    if not lesson:
+    catalog = await get_catalog(db)
+    if not catalog.get(lesson_id):
         raise HTTPException(status_code=404, detail="Lesson not found")
     
-    content = db.query(LessonContent).filter(LessonContent.lesson_id == lesson_id).first()
-    if not content:
+    # Prebuilt body + ETag: no JSON parsing or model building per request
+    cached = await content_cache.get_content_body(db, lesson_id)
+    prefetch.record_open(lesson_id, cached is not None)
+    if not cached:
         raise HTTPException(
             status_code=404, 
             detail="Content not generated yet. Call POST /lessons/{id}/generate first."
         )
     
-    flashcards = [FlashcardSchema(**fc) for fc in json.loads(content.flashcards_json)]
-    quiz = [QuizQuestionSchema(**q) for q in json.loads(content.quiz_json)]
-    
-    return LessonContentResponse(
-        lesson_id=lesson_id,
-        lesson_text=content.lesson_text,
-        flashcards=flashcards,
-        quiz=quiz,
-        created_at=content.created_at
-    )
+    # The reader moves on to the next lesson soon: get it ready after responding
+    background_tasks.add_task(prefetch.prefetch_quietly, session_factory, lesson_id)
+    return json_response(request, cached.body, cached.etag)
 
 
 @router.delete("/{lesson_id}/content")
 async def delete_lesson_content(
     lesson_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    content = db.query(LessonContent).filter(LessonContent.lesson_id == lesson_id).first()
+    content = await db.scalar(select(LessonContent).where(LessonContent.lesson_id == lesson_id))
     if content:
-        db.delete(content)
-        db.commit()
+        await db.delete(content)
+        await versions.bump_shared_version(db, versions.CATALOG)
+        await db.commit()
+        content_cache.invalidate(lesson_id)
         return {"message": "Content deleted successfully"}
     return {"message": "No content to delete"}
 
@@ -260,26 +198,17 @@ async def delete_lesson_content(
 @router.post("/{lesson_id}/regenerate", response_model=LessonContentResponse)
 async def regenerate_lesson_content(
     lesson_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    session_factory = Depends(get_session_factory),
     current_user: User = Depends(get_current_user)
 ):
-    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
+    lesson = await db.get(Lesson, lesson_id)
     if not lesson:
         raise HTTPException(status_code=404, detail="Lesson not found")
     
-    existing = db.query(LessonContent).filter(LessonContent.lesson_id == lesson_id).first()
-    if existing:
-        db.delete(existing)
-        db.commit()
-    
-    gemini_service = GeminiService()
-    generated = gemini_service.generate_content(lesson)
-    content = gemini_service.save_content(db, lesson, generated)
+    if prefers_async(request):
+        job = await jobs.enqueue(db, "lesson_content", {"lesson_id": lesson_id, "replace": True}, user_id=current_user.id)
+        return accepted(job)
     
-    return LessonContentResponse(
-        lesson_id=lesson_id,
-        lesson_text=content.lesson_text,
-        flashcards=generated.flashcards,
-        quiz=generated.quiz,
-        created_at=content.created_at
-    )
+    return await lesson_generation.generate_lesson_content(session_factory, lesson_id, replace=True)
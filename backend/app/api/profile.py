@@ -2,8 +2,9 @@
 import json
 import random
 from datetime import datetime, date
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 
@@ -12,6 +13,12 @@ from ..models.user import User
 from ..models.boss import BossBattle
 from ..models.progress import UserStats
 from ..api.auth import get_current_user
+from ..services.auth import CurrentIdentity, get_current_identity
+from ..services import versions, xp
+from ..services.identity_cache import invalidate_user
+from ..services.leaderboard import GLOBAL, get_leaderboards
+from ..services.progress_counters import total_completed
+from ..services.xp import award_xp
 
 router = APIRouter()
 
@@ -30,6 +37,21 @@ class ProfileOut(BaseModel):
     joined_at: datetime
     stats: Dict[str, Any]
 
+class LeaderboardEntryOut(BaseModel):
+    rank: int
+    user_id: int
+    name: str
+    xp: int
+
+class LeaderboardOut(BaseModel):
+    board: str  # global | weekly | level
+    level: Optional[int] = None  # title band, for the level board
+    week: Optional[date] = None  # Monday of the week, for the weekly board
+    total: int
+    entries: List[LeaderboardEntryOut]
+    my_rank: Optional[int] = None  # None when the user is not on this board
+    my_xp: Optional[int] = None
+
 class BossStart(BaseModel):
     boss_level: int = Field(..., ge=1, le=5)
 
@@ -53,15 +75,15 @@ class BossTurnResult(BaseModel):
 
 @router.get("/me", response_model=ProfileOut)
 async def get_profile(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    stats = db.query(UserStats).filter(UserStats.user_id == current_user.id).first()
+    stats = await db.scalar(select(UserStats).where(UserStats.user_id == current_user.id))
     
     stats_dict = {
         "total_xp": stats.total_xp if stats else 0,
         "current_streak": stats.streak_days if stats else 0,
-        "lessons_completed": 0, # Lesson completion logic needs to be aggregated or added to UserStats
+        "lessons_completed": await total_completed(db, current_user.id),
         "title": stats.current_title if stats else "Novice",
     }
     
@@ -78,17 +100,46 @@ async def get_profile(
 @router.patch("/me", response_model=ProfileOut)
 async def update_profile(
     body: ProfileUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
+    # current_user may be a detached copy from the identity cache
+    user = await db.get(User, current_user.id)
     if body.bio is not None:
-        current_user.bio = body.bio
+        user.bio = body.bio
     if body.avatar_style is not None:
-        current_user.avatar_style = body.avatar_style
+        user.avatar_style = body.avatar_style
     
-    db.commit()
-    db.refresh(current_user)
-    return await get_profile(db, current_user)
+    await db.commit()
+    invalidate_user(user.id)
+    await db.refresh(user)
+    return await get_profile(db, user)
+
+# ─────────────── LEADERBOARD ────────────────────────────────────────
+
+@router.get("/leaderboard", response_model=LeaderboardOut)
+async def get_leaderboard(
+    board: str = Query(GLOBAL, pattern="^(global|weekly|level)$"),
+    level: Optional[int] = Query(None, ge=1, le=5),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    around_me: bool = False,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentIdentity = Depends(get_current_identity),
+):
+    """Served from the in-memory rank index (services/leaderboard.py); `around_me` pages to your own rank."""
+    leaderboards = get_leaderboards()
+    await leaderboards.refresh(db)
+    page = leaderboards.page(board, current_user.id, level=level, offset=offset, limit=limit, around_me=around_me)
+    return LeaderboardOut(
+        board=page.board,
+        level=page.level,
+        week=page.week,
+        total=page.total,
+        entries=[LeaderboardEntryOut(**vars(entry)) for entry in page.entries],
+        my_rank=page.my_rank,
+        my_xp=page.my_xp,
+    )
 
 # ─────────────── BOSS FIGHT ─────────────────────────────────────────
 
@@ -111,7 +162,7 @@ BOSS_QUESTIONS = [
 @router.post("/boss/start")
 async def start_boss_battle(
     body: BossStart,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     boss_info = BOSS_DATA.get(body.boss_level, BOSS_DATA[1])
@@ -127,8 +178,8 @@ async def start_boss_battle(
         status="active",
     )
     db.add(battle)
-    db.commit()
-    db.refresh(battle)
+    await db.commit()
+    await db.refresh(battle)
     
     # Pick a random question for turn 1
     q = random.choice(BOSS_QUESTIONS)
@@ -146,13 +197,13 @@ async def start_boss_battle(
 @router.post("/boss/turn")
 async def boss_turn(
     body: BossAction,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    battle = db.query(BossBattle).filter(
+    battle = await db.scalar(select(BossBattle).where(
         BossBattle.id == body.battle_id,
         BossBattle.user_id == current_user.id
-    ).first()
+    ))
     
     if not battle or battle.status != "active":
         raise HTTPException(400, "Battle not active or found")
@@ -192,15 +243,19 @@ async def boss_turn(
     is_finished = False
     
     if battle.boss_hp <= 0:
-        battle.status = "won"
-        battle.finished_at = datetime.utcnow()
+        # Only the request that ends the battle awards its XP
+        won = await db.execute(
+            update(BossBattle)
+            .where(BossBattle.id == battle.id, BossBattle.status == "active")
+            .values(status="won", boss_hp=battle.boss_hp, finished_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
         outcome = "won"
         is_finished = True
         message += " You accepted victory!"
-        # Award XP?
-        stats = db.query(UserStats).filter(UserStats.user_id == current_user.id).first()
-        if stats:
-            stats.total_xp += 100 * battle.boss_level
+        if won.rowcount == 1:
+            await award_xp(db, current_user.id, 100 * battle.boss_level, xp.BOSS, ref_id=battle.id, activity=False)
+            await versions.bump_version(db, current_user.id, versions.PROGRESS)
         
     elif battle.player_hp <= 0:
         battle.status = "lost"
@@ -209,7 +264,7 @@ async def boss_turn(
         is_finished = True
         message += " You were defeated..."
         
-    db.commit()
+    await db.commit()
     
     next_q = None
     if not is_finished:
@@ -1,14 +1,20 @@
-from datetime import datetime, date
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from datetime import datetime
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import get_db
+from ..database import get_db, get_session_factory
 from ..models.user import User
 from ..models.lesson import Lesson
-from ..models.progress import UserProgress, UserStats, get_title_for_xp, get_xp_for_level, TITLE_THRESHOLDS
+from ..models.progress import UserProgress, UserStats, get_xp_for_level, TITLE_THRESHOLDS
 from ..schemas.progress import ProgressResponse, DashboardSummary, LevelProgress, RecentActivity
-from ..services.auth import get_current_user
+from ..services.auth import CurrentIdentity, get_current_identity, get_current_user
+from ..services.catalog import get_catalog
+from ..services import prefetch, versions, xp
+from ..services.xp import award_xp
+from .conditional import catalog_version, conditional, user_version
+from ..services.progress_counters import get_module_counters, increment_completed
 
 router = APIRouter()
 
@@ -24,19 +30,38 @@ LEVEL_TITLES = {
 @router.post("/{lesson_id}/complete", response_model=ProgressResponse)
 async def complete_lesson(
     lesson_id: int,
-    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    session_factory = Depends(get_session_factory),
     current_user: User = Depends(get_current_user)
 ):
-    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
+    lesson = await db.get(Lesson, lesson_id)
     if not lesson:
         raise HTTPException(status_code=404, detail="Lesson not found")
     
-    existing = db.query(UserProgress).filter(
-        UserProgress.user_id == current_user.id,
-        UserProgress.lesson_id == lesson_id
-    ).first()
+    xp_earned = get_xp_for_level(lesson.level)
+    now = datetime.utcnow()
+    
+    # Upsert on (user_id, lesson_id) that only fires for a lesson not yet
+    # completed: of two racing requests exactly one gets a row back.
+    insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+    table = UserProgress.__table__
+    completed = await db.scalar(
+        insert(table)
+        .values(user_id=current_user.id, lesson_id=lesson_id, completed=True, completed_at=now, xp_earned=xp_earned)
+        .on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.lesson_id],
+            set_={"completed": True, "completed_at": now, "xp_earned": xp_earned},
+            where=table.c.completed.isnot(True),
+        )
+        .returning(table.c.id)
+    )
     
-    if existing and existing.completed:
+    if completed is None:
+        existing = (await db.execute(select(UserProgress.completed_at, UserProgress.xp_earned).where(
+            UserProgress.user_id == current_user.id,
+            UserProgress.lesson_id == lesson_id
+        ))).one()
         return ProgressResponse(
             lesson_id=lesson_id,
             completed=True,
@@ -44,82 +69,54 @@ async def complete_lesson(
             xp_earned=existing.xp_earned
         )
     
-    xp_earned = get_xp_for_level(lesson.level)
-    now = datetime.utcnow()
-    
-    if existing:
-        existing.completed = True
-        existing.completed_at = now
-        existing.xp_earned = xp_earned
-        progress = existing
-    else:
-        progress = UserProgress(
-            user_id=current_user.id,
-            lesson_id=lesson_id,
-            completed=True,
-            completed_at=now,
-            xp_earned=xp_earned
-        )
-        db.add(progress)
-    
-    stats = db.query(UserStats).filter(UserStats.user_id == current_user.id).first()
-    if not stats:
-        stats = UserStats(user_id=current_user.id)
-        db.add(stats)
-    
-    stats.total_xp += xp_earned
-    stats.current_title = get_title_for_xp(stats.total_xp)
-    
-    today = date.today()
-    if stats.last_activity_at:
-        last_date = stats.last_activity_at.date() if isinstance(stats.last_activity_at, datetime) else stats.last_activity_at
-        if last_date == today:
-            pass
-        elif (today - last_date).days == 1:
-            stats.streak_days += 1
-        else:
-            stats.streak_days = 1
-    else:
-        stats.streak_days = 1
+    await increment_completed(db, current_user.id, lesson.level, lesson.module)
+    await versions.bump_version(db, current_user.id, versions.PROGRESS)
+    await award_xp(db, current_user.id, xp_earned, xp.LESSON, ref_id=lesson_id, now=now)
+    await db.commit()
     
-    stats.last_activity_at = now
-    
-    db.commit()
-    db.refresh(progress)
+    background_tasks.add_task(prefetch.prefetch_quietly, session_factory, lesson_id)
     
     return ProgressResponse(
         lesson_id=lesson_id,
         completed=True,
-        completed_at=progress.completed_at,
+        completed_at=now,
         xp_earned=xp_earned
     )
 
 
-@router.get("/summary", response_model=DashboardSummary)
+@router.get(
+    "/summary",
+    response_model=DashboardSummary,
+    dependencies=[Depends(conditional(catalog_version, user_version(versions.PROGRESS)))],
+)
 async def get_summary(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentIdentity = Depends(get_current_identity)
 ):
-    stats = db.query(UserStats).filter(UserStats.user_id == current_user.id).first()
+    stats = await db.scalar(select(UserStats).where(UserStats.user_id == current_user.id))
     if not stats:
         stats = UserStats(user_id=current_user.id)
         db.add(stats)
-        db.commit()
-        db.refresh(stats)
+        await db.commit()
+        await db.refresh(stats)
     
-    completed_lessons = db.query(UserProgress).filter(
-        UserProgress.user_id == current_user.id,
-        UserProgress.completed == True
-    ).count()
+    catalog = await get_catalog(db)
+    counters = await get_module_counters(db, current_user.id)
+    completed_lessons = sum(counters.values())
     
     level_progress = []
+    modules_completed = 0
+    levels_completed = 0
     for level in range(1, 6):
-        total = db.query(Lesson).filter(Lesson.level == level).count()
-        completed = db.query(UserProgress).join(Lesson).filter(
-            UserProgress.user_id == current_user.id,
-            UserProgress.completed == True,
-            Lesson.level == level
-        ).count()
+        total = catalog.level_totals.get(level, 0)
+        completed = 0
+        for (counter_level, module), completed_in_module in counters.items():
+            if counter_level != level:
+                continue
+            completed += completed_in_module
+            total_in_module = catalog.module_totals.get((level, module), 0)
+            if module in range(1, 4) and total_in_module > 0 and completed_in_module == total_in_module:
+                modules_completed += 1
         
         is_locked = False
         if level > 1:
@@ -127,38 +124,25 @@ async def get_summary(
             if prev_level_progress.progress_percent < 100:
                 is_locked = True
         
+        progress_percent = round((completed / total * 100) if total > 0 else 0, 1)
+        if progress_percent == 100:
+            levels_completed += 1
+        
         level_progress.append(LevelProgress(
             level=level,
             level_title=LEVEL_TITLES.get(level, f"Level {level}"),
             total_lessons=total,
             completed_lessons=completed,
-            progress_percent=round((completed / total * 100) if total > 0 else 0, 1),
+            progress_percent=progress_percent,
             is_locked=is_locked
         ))
     
-    modules_completed = 0
-    levels_completed = 0
-    for lp in level_progress:
-        if lp.progress_percent == 100:
-            levels_completed += 1
-        for module in range(1, 4):
-            total_in_module = db.query(Lesson).filter(
-                Lesson.level == lp.level,
-                Lesson.module == module
-            ).count()
-            completed_in_module = db.query(UserProgress).join(Lesson).filter(
-                UserProgress.user_id == current_user.id,
-                UserProgress.completed == True,
-                Lesson.level == lp.level,
-                Lesson.module == module
-            ).count()
-            if total_in_module > 0 and completed_in_module == total_in_module:
-                modules_completed += 1
-    
-    recent = db.query(UserProgress, Lesson).join(Lesson).filter(
-        UserProgress.user_id == current_user.id,
-        UserProgress.completed == True
-    ).order_by(UserProgress.completed_at.desc()).limit(5).all()
+    recent = (await db.execute(
+        select(UserProgress, Lesson).join(Lesson).where(
+            UserProgress.user_id == current_user.id,
+            UserProgress.completed == True
+        ).order_by(UserProgress.completed_at.desc()).limit(5)
+    )).all()
     
     recent_activity = [
         RecentActivity(
@@ -1,5 +1,6 @@
 from app.database import SessionLocal, engine, Base
 from app.models.lesson import LessonContent
+from app.services import versions
 from sqlalchemy import text
 
 
@@ -7,6 +8,7 @@ def clear_content():
     db = SessionLocal()
     try:
         deleted = db.query(LessonContent).delete()
+        db.execute(versions.shared_version_bump(db.bind.dialect.name, versions.CATALOG))
         db.commit()
         try:
             pass
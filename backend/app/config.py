@@ -12,7 +12,59 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     GEMINI_API_KEY: str = ""
+    GEMINI_MODEL: str = "gemini-1.5-flash"
+    AI_BACKEND: str = "mock"  # mock | gemini
+    AI_TIMEOUT_SECONDS: float = 30.0
+    AI_MAX_CONCURRENCY: int = 8
+    AI_MAX_RETRIES: int = 2
+    # Admission control: calls beyond AI_MAX_CONCURRENCY queue (at most AI_MAX_QUEUE)
+    # and are shed with 503 if they could not start within their lane's deadline
+    AI_MAX_QUEUE: int = 64
+    AI_INTERACTIVE_QUEUE_SECONDS: float = 10.0
+    AI_BULK_QUEUE_SECONDS: float = 120.0
+    # Circuit breaker: open when AI_BREAKER_FAILURE_RATE of the calls in the last
+    # AI_BREAKER_WINDOW_SECONDS failed or took over AI_BREAKER_SLOW_SECONDS, then probe again
+    AI_BREAKER_FAILURE_RATE: float = 0.5
+    AI_BREAKER_MIN_CALLS: int = 5
+    AI_BREAKER_WINDOW_SECONDS: float = 30.0
+    AI_BREAKER_SLOW_SECONDS: float = 10.0
+    AI_BREAKER_OPEN_SECONDS: float = 15.0
+    AI_BREAKER_HALF_OPEN_PROBES: int = 1
+    AI_MOCK_LATENCY_MS: int = 0
+    AI_MOCK_CHUNK_DELAY_MS: int = 0
+    GENERATION_LEASE_SECONDS: int = 120
+    PREFETCH_LOOKAHEAD: int = 2  # next lessons generated in the background; 0 disables
+    # Serialized lesson content responses: in-memory LRU size, and whether to store them in lesson_content
+    CONTENT_CACHE_SIZE: int = 256
+    CONTENT_CACHE_PERSIST: bool = True
+    # Coach prompt size (estimated tokens) and rolling conversation summary
+    COACH_PROMPT_TOKEN_BUDGET: int = 3000
+    COACH_SUMMARY_EVERY_TURNS: int = 4
+    COACH_RECENT_MESSAGES: int = 4
+    COACH_SUMMARY_MAX_TOKENS: int = 300
+    COACH_CONTEXT_SECTIONS: int = 3  # lesson sections retrieved per question
+    JOB_WORKERS: int = 2
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_LEASE_SECONDS: float = 300.0
+    JOB_RETRY_BASE_SECONDS: float = 2.0
+    JOB_POLL_SECONDS: float = 1.0
+    JOB_SWEEP_SECONDS: float = 60.0
+    JOB_RETENTION_DAYS: float = 7.0  # finished jobs are deleted after this long
     CORS_ORIGINS: str = "http://localhost:5173,http://localhost:3000"
+    # Token buckets per endpoint and user: "<endpoint>=<requests>/<seconds>,..."
+    RATE_LIMITS: str = "coach=15/60,regenerate=5/60,life_example=10/60,dictionary=30/60"
+    RATE_LIMIT_BACKEND: str = "memory"  # memory (per process) | database (shared by all workers)
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+    PASSWORD_POOL_WORKERS: int = 2
+    PASSWORD_POOL_QUEUE_LIMIT: int = 32
+    USER_CACHE_SIZE: int = 4096
+    USER_CACHE_TTL_SECONDS: float = 30.0
+    # Put the user's name in access tokens so read-only endpoints can skip the users table
+    TOKEN_IDENTITY_CLAIMS: bool = False
+    # In-memory leaderboards follow the XP ledger; a full reload from the database heals any drift
+    LEADERBOARD_REBUILD_SECONDS: float = 600.0
+    # GET /metrics needs "Authorization: Bearer <METRICS_TOKEN>"; empty disables it
+    METRICS_TOKEN: str = ""
     
     @property
     def cors_origins_list(self) -> list[str]:
@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from .config import get_settings
 
@@ -8,21 +9,41 @@ db_url = settings.DATABASE_URL
 if db_url and db_url.startswith("postgres://"):
     db_url = db_url.replace("postgres://", "postgresql://", 1)
 
+
+def get_async_url(url: str) -> str:
+    """Map a sync database URL onto its asyncio driver (aiosqlite / asyncpg)."""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql:") or url.startswith("postgresql+psycopg2:"):
+        rest = url.split(":", 1)[1]
+        # asyncpg takes `ssl` where libpq takes `sslmode`
+        return "postgresql+asyncpg:" + rest.replace("sslmode=", "ssl=")
+    return url
+
+
 # Determine connection arguments based on database type
 connect_args = {}
 if db_url and "sqlite" in db_url:
     connect_args["check_same_thread"] = False
 
+# Sync engine: Alembic, seed.py and other CLI scripts
 engine = create_engine(db_url, connect_args=connect_args)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine: every API request
+async_engine = create_async_engine(get_async_url(db_url))
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+def get_session_factory() -> async_sessionmaker:
+    """For work that outlives the request and needs its own sessions."""
+    return AsyncSessionLocal
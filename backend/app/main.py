@@ -1,10 +1,22 @@
-from fastapi import FastAPI
+import math
+import secrets
+
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 
 from .config import get_settings
-from .database import engine, Base
+from .database import engine, Base, get_session_factory
 from .api import api_router
+from .services import metrics
+from .services.ai_client import get_ai_client
+from .services import jobs
+from .services.leaderboard import get_leaderboards
+from .services.admission import OverloadedError
+from .services.circuit_breaker import CircuitOpenError
+from .services.http_cache import not_modified
+from .api.conditional import NotModified
 from .models import User, Lesson, LessonContent, UserProgress, UserStats, ChatMessage, RegeneratedContent, DictionaryCache
 
 logging.basicConfig(level=logging.INFO)
@@ -30,6 +42,45 @@ app.add_middleware(
 
 app.include_router(api_router, prefix="/api")
 
+# Sessions for the startup work and the job workers; tests point it at their database
+app.state.session_factory = get_session_factory()
+
+
+@app.exception_handler(NotModified)
+async def conditional_not_modified(request: Request, exc: NotModified):
+    # Raised by api/conditional.py before the endpoint body runs
+    return not_modified(exc.etag)
+
+
+@app.exception_handler(OverloadedError)
+@app.exception_handler(CircuitOpenError)
+async def ai_overloaded(request: Request, exc: OverloadedError):
+    # AI calls shed by admission control or refused by the open circuit
+    # breaker outside api/ai.py (e.g. lesson generation)
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+
+@app.on_event("startup")
+async def start_background_work():
+    session_factory = app.state.session_factory
+    jobs.start_workers(session_factory)
+    try:
+        async with session_factory() as db:
+            await get_leaderboards().rebuild(db)
+    except Exception:
+        # Not fatal: the first leaderboard request loads them instead
+        logger.exception("Loading leaderboards failed")
+
+
+@app.on_event("shutdown")
+async def stop_background_work():
+    await jobs.stop_workers()
+    await get_ai_client().aclose()
+
 
 @app.get("/")
 async def root():
@@ -39,3 +90,17 @@ async def root():
 @app.get("/health")
 async def health():
     return {"status": "healthy"}
+
+
+def require_metrics_token(request: Request) -> None:
+    """Metrics describe internals and traffic: scrapers must present METRICS_TOKEN."""
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
+
+
+@app.get("/metrics", dependencies=[Depends(require_metrics_token)])
+async def get_metrics():
+    return metrics.snapshot()
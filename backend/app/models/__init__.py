@@ -1,14 +1,20 @@
 # Models package
 from .user import User
 from .lesson import Lesson, LessonContent
-from .progress import UserProgress, UserStats
-from .ai_models import ChatMessage, RegeneratedContent, DictionaryCache
+from .progress import UserProgress, UserStats, UserLevelProgress
+from .ai_models import ChatMessage, ConversationSummary, RegeneratedContent, DictionaryCache
 from .gamification import Duel, BudgetScenario, TrapScenario, HabitTracker
 from .boss import BossBattle
+from .lease import Lease
+from .job import Job
+from .rate_limit import RateLimitBucket
+from .version import SharedVersion, UserVersion
+from .xp import XpEvent, XpDaily, XpWeekly
 
 __all__ = [
-    "User", "Lesson", "LessonContent", "UserProgress", "UserStats",
-    "ChatMessage", "RegeneratedContent", "DictionaryCache",
+    "User", "Lesson", "LessonContent", "UserProgress", "UserStats", "UserLevelProgress",
+    "ChatMessage", "ConversationSummary", "RegeneratedContent", "DictionaryCache",
     "Duel", "BudgetScenario", "TrapScenario", "HabitTracker",
-    "BossBattle",
+    "BossBattle", "Lease", "Job", "RateLimitBucket", "UserVersion", "SharedVersion",
+    "XpEvent", "XpDaily", "XpWeekly",
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, ForeignKey, Index, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 from ..database import Base
 
@@ -6,6 +6,10 @@ from ..database import Base
 class ChatMessage(Base):
     """Stores AI coach chat history per user per lesson."""
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # Keyset pagination of one conversation, newest first
+        Index("ix_chat_messages_history", "user_id", "lesson_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
@@ -24,14 +28,38 @@ class ChatMessage(Base):
         return f"<ChatMessage(id={self.id}, user={self.user_id}, lesson={self.lesson_id}, role='{self.role}')>"
 
 
+class ConversationSummary(Base):
+    """Rolling summary of one coach conversation (see services/conversation_memory.py)."""
+    __tablename__ = "conversation_summaries"
+    __table_args__ = (
+        UniqueConstraint("user_id", "lesson_id", name="uq_conversation_summary"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False)
+    summary = Column(Text, nullable=False, default="")
+    summarized_through_id = Column(Integer, nullable=False, default=0)  # last ChatMessage.id folded in
+    messages_summarized = Column(Integer, nullable=False, default=0)
+    prompt_version = Column(String(20), default="summary_v1")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<ConversationSummary(user={self.user_id}, lesson={self.lesson_id}, through={self.summarized_through_id})>"
+
+
 class RegeneratedContent(Base):
     """Caches regenerated lesson variants keyed by params hash."""
     __tablename__ = "regenerated_content"
+    __table_args__ = (
+        # Exact cache lookup; the lesson_id prefix also serves the nearest-level fallback
+        Index("ix_regenerated_content_lookup", "lesson_id", "params_hash", "user_level"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False, index=True)
+    lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False)
     user_level = Column(Integer, nullable=False)
-    params_hash = Column(String(64), nullable=False, index=True)
+    params_hash = Column(String(64), nullable=False)
     content_json = Column(Text, nullable=False)
     prompt_version = Column(String(20), default="v1")
     tokens_used = Column(Integer, default=0)
@@ -46,9 +74,13 @@ class RegeneratedContent(Base):
 class DictionaryCache(Base):
     """Caches AI-generated finance term definitions."""
     __tablename__ = "dictionary_cache"
+    __table_args__ = (
+        # Exact lookup; the term prefix also serves the nearest-level fallback
+        Index("ix_dictionary_cache_lookup", "term", "user_level"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    term = Column(String(200), nullable=False, index=True)
+    term = Column(String(200), nullable=False)
     lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=True)
     user_level = Column(Integer, nullable=False, default=1)
     definition = Column(Text, nullable=False)
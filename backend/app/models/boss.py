@@ -7,7 +7,7 @@ class BossBattle(Base):
     __tablename__ = "boss_battles"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     boss_name = Column(String(100), nullable=False)  # e.g., "Inflation Dragon", "Debt Golem"
     boss_level = Column(Integer, default=1)
     status = Column(String(20), default="active")  # active | won | lost
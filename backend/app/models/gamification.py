@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Float, func
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Float, Index, func
 from sqlalchemy.orm import relationship
 from ..database import Base
 import uuid
@@ -11,6 +11,11 @@ def gen_code():
 class Duel(Base):
     """1-on-1 quiz duel between two users."""
     __tablename__ = "duels"
+    __table_args__ = (
+        # "My duels" is an OR of both sides, newest first: one index per side
+        Index("ix_duels_challenger", "challenger_id", "created_at"),
+        Index("ix_duels_opponent", "opponent_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     invite_code = Column(String(16), unique=True, index=True, default=gen_code)
@@ -34,7 +39,7 @@ class BudgetScenario(Base):
     __tablename__ = "budget_scenarios"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     monthly_income = Column(Float, nullable=False)
     scenario_text = Column(Text, nullable=True)  # AI-generated scenario
     allocations_json = Column(Text, nullable=True)  # user's allocation { category: amount }
@@ -48,7 +53,7 @@ class TrapScenario(Base):
     __tablename__ = "trap_scenarios"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     scenario_type = Column(String(50), nullable=False)  # scam | pyramid | impulse | bad_loan
     scenario_json = Column(Text, nullable=True)  # full scenario tree
     user_choices = Column(Text, nullable=True)  # JSON array of choices
@@ -60,6 +65,10 @@ class TrapScenario(Base):
 class HabitTracker(Base):
     """21-day financial habit tracker."""
     __tablename__ = "habit_trackers"
+    __table_args__ = (
+        # A user's habits, newest first
+        Index("ix_habit_trackers_user", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, DateTime
+from ..database import Base
+
+
+class Lease(Base):
+    """Short-lived cross-worker lock: whoever holds `key` until `expires_at` does the work."""
+    __tablename__ = "leases"
+    
+    key = Column(String(100), primary_key=True)
+    owner = Column(String(100), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f"<Lease(key='{self.key}', owner='{self.owner}')>"
@@ -1,5 +1,5 @@
 from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from ..database import Base
 
 
@@ -32,6 +32,10 @@ class LessonContent(Base):
     flashcards_json = Column(Text, nullable=False)
     quiz_json = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Serialized LessonContentResponse body and its ETag, filled on first read
+    # (services/content_cache.py). Deferred: only the content endpoints need it.
+    response_json = deferred(Column(Text, nullable=True))
+    response_etag = Column(String(64), nullable=True)
     
     lesson = relationship("Lesson", back_populates="content")
     
@@ -1,11 +1,17 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 from ..database import Base
 
 
 class UserProgress(Base):
     __tablename__ = "user_progress"
-    
+    __table_args__ = (
+        # One row per user and lesson; completion is an upsert on this key
+        UniqueConstraint("user_id", "lesson_id", name="uq_user_progress"),
+        # Completed lesson ids of one user, answered from the index alone
+        Index("ix_user_progress_completed", "user_id", "completed", "lesson_id"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False, index=True)
@@ -36,6 +42,27 @@ class UserStats(Base):
         return f"<UserStats(user_id={self.user_id}, xp={self.total_xp}, title='{self.current_title}')>"
 
 
+class UserLevelProgress(Base):
+    """Denormalized completion counter per user per (level, module).
+
+    Maintained in the same transaction as lesson completion so reads never
+    have to recount `user_progress`. Rebuild with `python -m app.reconcile_progress`.
+    """
+    __tablename__ = "user_level_progress"
+    __table_args__ = (
+        UniqueConstraint("user_id", "level", "module", name="uq_user_level_progress"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    level = Column(Integer, nullable=False)
+    module = Column(Integer, nullable=False)
+    completed_count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<UserLevelProgress(user_id={self.user_id}, level={self.level}, module={self.module}, completed={self.completed_count})>"
+
+
 TITLE_THRESHOLDS = [
     (0, "Beginner"),
     (200, "Confident"),
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Float, Index, String
+from ..database import Base
+
+
+class RateLimitBucket(Base):
+    """Shared token bucket (see services/rate_limiter.py). Times are Unix seconds."""
+    __tablename__ = "rate_limit_buckets"
+    __table_args__ = (
+        Index("ix_rate_limit_buckets_expires_at", "expires_at"),
+    )
+    
+    key = Column(String(200), primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)
+    expires_at = Column(Float, nullable=False)  # when the bucket would be full again; safe to delete after
+    
+    def __repr__(self):
+        return f"<RateLimitBucket(key='{self.key}', tokens={self.tokens:.2f})>"
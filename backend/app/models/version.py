@@ -0,0 +1,25 @@
+from sqlalchemy import Column, ForeignKey, Integer, String
+from ..database import Base
+
+
+class UserVersion(Base):
+    """Change counter for one kind of a user's data; feeds ETags (see services/versions.py)."""
+    __tablename__ = "user_versions"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    scope = Column(String(30), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<UserVersion(user_id={self.user_id}, scope='{self.scope}', version={self.version})>"
+
+
+class SharedVersion(Base):
+    """Change counter for data every process caches, e.g. the lesson catalog (see services/versions.py)."""
+    __tablename__ = "shared_versions"
+    
+    scope = Column(String(30), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<SharedVersion(scope='{self.scope}', version={self.version})>"
@@ -0,0 +1,53 @@
+from sqlalchemy import Column, Date, DateTime, ForeignKey, Index, Integer, String
+from ..database import Base
+
+
+class XpEvent(Base):
+    """One XP award. Append-only ledger: rows are never updated (see services/xp.py)."""
+    __tablename__ = "xp_events"
+    __table_args__ = (
+        # The only secondary index: one user's history, for audits
+        Index("ix_xp_events_user", "user_id", "created_at"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    amount = Column(Integer, nullable=False)
+    source = Column(String(16), nullable=False)  # lesson | boss | trap
+    ref_id = Column(Integer, nullable=True)  # id of the lesson, battle or trap scenario
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    
+    def __repr__(self):
+        return f"<XpEvent(user_id={self.user_id}, amount={self.amount}, source='{self.source}')>"
+
+
+class XpDaily(Base):
+    """XP earned per user per UTC day, maintained with every award."""
+    __tablename__ = "xp_daily"
+    __table_args__ = (
+        # Ranking one day
+        Index("ix_xp_daily_day", "day", "xp"),
+    )
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    xp = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<XpDaily(user_id={self.user_id}, day={self.day}, xp={self.xp})>"
+
+
+class XpWeekly(Base):
+    """XP earned per user per ISO week (keyed by its Monday), maintained with every award."""
+    __tablename__ = "xp_weekly"
+    __table_args__ = (
+        # Ranking one week
+        Index("ix_xp_weekly_week", "week", "xp"),
+    )
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    week = Column(Date, primary_key=True)
+    xp = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<XpWeekly(user_id={self.user_id}, week={self.week}, xp={self.xp})>"
@@ -0,0 +1,47 @@
+import argparse
+import asyncio
+import logging
+import sys
+
+from .database import AsyncSessionLocal, async_engine, engine, Base
+from .services.ai_client import get_ai_client
+from .services.pregeneration import pregenerate
+
+Base.metadata.create_all(bind=engine)
+
+DEFAULT_CHECKPOINT = ".pregenerate_checkpoint.json"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.pregenerate",
+        description="Generate content for every lesson that does not have it yet.",
+    )
+    parser.add_argument("--concurrency", type=int, default=4, help="lessons generated at once (default: 4)")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT,
+                        help=f"progress file for resuming, relative to the working directory (default: {DEFAULT_CHECKPOINT}, git-ignored)")
+    parser.add_argument("--retry-failed", action="store_true", help="retry lessons that failed in an earlier run")
+    parser.add_argument("lesson_ids", nargs="*", type=int, help="only these lessons (default: all)")
+    return parser.parse_args(argv)
+
+
+async def run(args) -> int:
+    try:
+        report = await pregenerate(
+            AsyncSessionLocal,
+            concurrency=args.concurrency,
+            checkpoint_path=args.checkpoint,
+            retry_failed=args.retry_failed,
+            lesson_ids=args.lesson_ids or None,
+        )
+    finally:
+        await get_ai_client().aclose()
+        await async_engine.dispose()
+    print(report.summary())
+    return 1 if report.failed or report.deferred else 0
+
+
+if __name__ == "__main__":
+    # Usage: python -m app.pregenerate [--concurrency N] [--checkpoint PATH] [--retry-failed] [lesson_id ...]
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(run(parse_args())))
@@ -0,0 +1,25 @@
+import sys
+
+from .database import SessionLocal, engine, Base
+from .services.progress_counters import rebuild_counters
+from .services.xp import rebuild_xp
+
+Base.metadata.create_all(bind=engine)
+
+
+def reconcile_progress(user_ids=None):
+    db = SessionLocal()
+    try:
+        rows = rebuild_counters(db, user_ids)
+        scope = f"{len(user_ids)} users" if user_ids else "all users"
+        print(f"Rebuilt {rows} progress counters for {scope}.")
+        users = rebuild_xp(db, user_ids)
+        print(f"Rebuilt XP rollups and totals of {users} users from the ledger.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    # Usage: python -m app.reconcile_progress [user_id ...]
+    ids = [int(arg) for arg in sys.argv[1:]] or None
+    reconcile_progress(ids)
@@ -13,6 +13,7 @@ class CoachChatRequest(BaseModel):
 
 
 class ChatMessageResponse(BaseModel):
+    id: Optional[int] = None
     role: str
     content: str
     created_at: Optional[datetime] = None
@@ -23,7 +24,13 @@ class ChatMessageResponse(BaseModel):
 
 class CoachChatResponse(BaseModel):
     reply: str
-    history: List[ChatMessageResponse]
+    messages: List[ChatMessageResponse]  # only this exchange: the user's message and the reply
+    history_cursor: str  # pass as `before` to GET /ai/coach/history for older messages
+
+
+class ChatHistoryResponse(BaseModel):
+    messages: List[ChatMessageResponse]  # oldest first
+    next_cursor: Optional[str] = None  # None when there is nothing older
 
 
 # ─── Lesson Regeneration ─────────────────────────────────────
@@ -45,6 +52,7 @@ class RegenerateResponse(BaseModel):
     flashcards: list
     quiz: list
     from_cache: bool = False
+    stale: bool = False  # served from cache because the model is unavailable
 
 
 # ─── Life Example ─────────────────────────────────────────────
@@ -89,3 +97,4 @@ class DictionaryResponse(BaseModel):
     definition: str
     example: str
     mini_test: List[MiniTestQuestion]
+    stale: bool = False  # cached definition for another level; the model is unavailable
@@ -33,6 +33,7 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     user_id: Optional[int] = None
     email: Optional[str] = None
+    name: Optional[str] = None
 
 
 class RefreshToken(BaseModel):
@@ -1,5 +1,6 @@
 from .database import SessionLocal, engine, Base
 from .models import Lesson
+from .services import versions
 
 Base.metadata.create_all(bind=engine)
 
@@ -189,6 +190,7 @@ def seed_lessons():
                 )
                 db.add(lesson)
         
+        db.execute(versions.shared_version_bump(db.bind.dialect.name, versions.CATALOG))
         db.commit()
         print(f"Successfully processed {len(LESSONS_DATA)} lessons!")
         
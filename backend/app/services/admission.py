@@ -0,0 +1,162 @@
+"""
+Admission control for upstream AI calls.
+
+At most `max_in_flight` calls run at once; the rest wait in per-lane FIFO
+queues, and a freed slot goes to the highest-priority lane first, so
+interactive coach traffic overtakes bulk regeneration. Waiting is bounded
+three ways, and a call that would exceed any of them is shed at once with
+`OverloadedError` (503 + Retry-After) instead of joining a pile-up that
+would time out anyway:
+
+  - the queues hold at most `max_queue` calls in total;
+  - each lane has a wait deadline; a call whose predicted wait (its place
+    in line x the recent average call time / slots) exceeds it is shed
+    before it queues;
+  - a call still queued when its deadline passes is shed then.
+
+Metrics:
+  admission.in_flight / admission.queued         gauges
+  admission.<lane>.wait_ms                       histogram, time spent queued
+  admission.<lane>.shed.<queue_full|predicted|timeout>   counters
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional
+
+from . import metrics
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+
+@dataclass(frozen=True)
+class Lane:
+    priority: int  # higher is served first
+    deadline: float  # longest a call may wait for a slot, in seconds
+
+
+class OverloadedError(Exception):
+    """The call was shed; the caller should retry after `retry_after` seconds."""
+
+    def __init__(self, lane: str, reason: str, retry_after: float):
+        super().__init__(f"AI service is busy ({lane} lane, {reason}); retry in {math.ceil(retry_after)}s")
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    # Weight of the newest sample in the average call time
+    EWMA_ALPHA = 0.2
+
+    def __init__(self, max_in_flight: int, max_queue: Optional[int], lanes: Dict[str, Lane]):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.lanes = lanes
+        # Serve order: highest priority lane first
+        self._order = sorted(lanes, key=lambda name: -lanes[name].priority)
+        self._queues: Dict[str, Deque[asyncio.Future]] = {name: deque() for name in lanes}
+        self._in_flight = 0
+        self._avg_seconds: Optional[float] = None
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _publish(self) -> None:
+        metrics.set_gauge("admission.in_flight", self._in_flight)
+        metrics.set_gauge("admission.queued", self.queued)
+
+    def _ahead_of(self, lane: str) -> int:
+        """Calls that would be served before a new call in `lane`."""
+        priority = self.lanes[lane].priority
+        return sum(len(self._queues[name]) for name in self._order if self.lanes[name].priority >= priority)
+
+    def predicted_wait(self, lane: str) -> float:
+        if self._in_flight < self.max_in_flight and not self._ahead_of(lane):
+            return 0.0
+        if self._avg_seconds is None:
+            return 0.0  # no calls finished yet: nothing to predict from
+        return (self._ahead_of(lane) + 1) * self._avg_seconds / self.max_in_flight
+
+    def check(self, lane: str, deadline: Optional[float] = None) -> None:
+        """Raise OverloadedError if a call in `lane` would be shed right now."""
+        deadline = self.lanes[lane].deadline if deadline is None else deadline
+        if self._in_flight < self.max_in_flight and not self._ahead_of(lane):
+            return
+        if self.max_queue is not None and self.queued >= self.max_queue:
+            self._shed(lane, "queue_full", self._avg_seconds or 1.0)
+        wait = self.predicted_wait(lane)
+        if wait > deadline:
+            self._shed(lane, "predicted", wait)
+
+    def _shed(self, lane: str, reason: str, retry_after: float) -> None:
+        metrics.inc(f"admission.{lane}.shed.{reason}")
+        raise OverloadedError(lane, reason, retry_after)
+
+    @asynccontextmanager
+    async def admit(self, lane: str, deadline: Optional[float] = None):
+        """Hold one slot for the body of the `async with`, or raise OverloadedError."""
+        deadline = self.lanes[lane].deadline if deadline is None else deadline
+        self.check(lane, deadline)
+
+        queued_at = time.perf_counter()
+        if self._in_flight < self.max_in_flight and not self._ahead_of(lane):
+            self._in_flight += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._queues[lane].append(waiter)
+            self._publish()
+            try:
+                # A finished waiter already owns the slot handed over by _release
+                await asyncio.wait_for(waiter, deadline)
+            except asyncio.TimeoutError:
+                self._discard(lane, waiter)
+                self._shed(lane, "timeout", self._avg_seconds or deadline)
+            except BaseException:
+                if waiter.done() and not waiter.cancelled():
+                    self._release()
+                else:
+                    self._discard(lane, waiter)
+                raise
+        metrics.observe(f"admission.{lane}.wait_ms", (time.perf_counter() - queued_at) * 1000)
+        self._publish()
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            if self._avg_seconds is None:
+                self._avg_seconds = elapsed
+            else:
+                self._avg_seconds += self.EWMA_ALPHA * (elapsed - self._avg_seconds)
+            self._release()
+
+    def _discard(self, lane: str, waiter: asyncio.Future) -> None:
+        try:
+            self._queues[lane].remove(waiter)
+        except ValueError:
+            pass
+        self._publish()
+
+    def _release(self) -> None:
+        """Hand the slot to the next waiter, or free it."""
+        for name in self._order:
+            queue = self._queues[name]
+            while queue:
+                waiter = queue.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)
+                    self._publish()
+                    return
+        self._in_flight -= 1
+        self._publish()
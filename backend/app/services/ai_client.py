@@ -0,0 +1,401 @@
+"""
+Async AI client shared by every AI feature.
+
+All model calls go through `get_ai_client().generate(...)` (or `.stream(...)`
+for token-by-token replies), which adds:
+  - a per-call timeout (AI_TIMEOUT_SECONDS, overridable per call); for
+    streams it bounds the wait for each chunk
+  - admission control (services/admission.py): at most AI_MAX_CONCURRENCY
+    calls in flight, a bounded wait queue with priority lanes, and load
+    shedding (OverloadedError) when a call could not start in time
+  - retries with exponential backoff for transient backend errors
+  - a circuit breaker (services/circuit_breaker.py) that refuses calls with
+    CircuitOpenError while the provider is failing or too slow, so callers
+    fall back at once instead of waiting out the timeout
+  - latency / time-to-first-token / timeout / error metrics
+
+The work itself is done by a pluggable backend selected with AI_BACKEND:
+  mock    canned local responses (default; no network, no key)
+  gemini  Gemini REST API over one pooled httpx.AsyncClient
+"""
+import asyncio
+import json
+import logging
+import re
+import time
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Optional, Type
+
+import httpx
+
+from ..config import get_settings
+from . import metrics
+from .admission import BULK, INTERACTIVE, AdmissionController, Lane
+from .circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+
+class AIClientError(Exception):
+    """Base error for AI calls."""
+
+
+class AITimeoutError(AIClientError):
+    """The backend did not answer within the call's timeout."""
+
+
+class AIBackendError(AIClientError):
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+# ─── Backends ────────────────────────────────────────────────
+
+class AIBackend:
+    name = "base"
+
+    async def generate(self, prompt: str, system_instruction: Optional[str] = None) -> str:
+        raise NotImplementedError
+
+    async def stream(self, prompt: str, system_instruction: Optional[str] = None) -> AsyncIterator[str]:
+        """Yield the reply in chunks; backends without streaming send it whole."""
+        yield await self.generate(prompt, system_instruction)
+
+    async def aclose(self) -> None:
+        pass
+
+
+class MockBackend(AIBackend):
+    """Local canned responses (hackathon rules: no external AI calls)."""
+    name = "mock"
+
+    def __init__(self, latency_ms: int = 0, chunk_delay_ms: int = 0):
+        self.latency_ms = latency_ms
+        self.chunk_delay_ms = chunk_delay_ms
+
+    async def stream(self, prompt: str, system_instruction: Optional[str] = None) -> AsyncIterator[str]:
+        """The canned reply, a word at a time."""
+        reply = await self.generate(prompt, system_instruction)
+        for i, chunk in enumerate(re.findall(r"\S+\s*", reply)):
+            if i and self.chunk_delay_ms:
+                await asyncio.sleep(self.chunk_delay_ms / 1000)
+            yield chunk
+
+    async def generate(self, prompt: str, system_instruction: Optional[str] = None) -> str:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+        # Conversation summary (checked first: the transcript contains "Coach:")
+        if "running_summary" in prompt:
+            questions = [line[len("Student: "):] for line in prompt.splitlines() if line.startswith("Student: ")]
+            return "Краткое содержание (Mock): студент спрашивал — " + "; ".join(questions)
+
+        # Coach Chat
+        if system_instruction or "Coach:" in prompt:
+            return "Привет! Я твой встроенный ИИ-тренер (Mock). Я проанализировал твои знания и вот мой совет: всегда откладывай 10% от любого дохода. Как твои успехи сегодня?"
+
+        # Dictionary
+        if "definition" in prompt or "lesson_context" in prompt or "dictionary" in prompt.lower():
+            data = {
+                "definition": "Это важный финансовый термин, помогающий вам сохранить капитал.",
+                "example": "Например: Если вы применяете это правило, вы не потеряете деньги.",
+                "mini_test": [
+                    {
+                        "question": "Применимо ли это в жизни?",
+                        "options": ["Да", "Нет", "Иногда", "Сложно сказать"],
+                        "correct_index": 0
+                    }
+                ]
+            }
+            return json.dumps(data, ensure_ascii=False)
+
+        # Life example
+        if "example_text" in prompt or "income_type" in prompt:
+            data = {
+                "example_text": "Отличный пример: вы заработали деньги на фрилансе и отложили 20%.",
+                "explanation": "Так формируется финансовая подушка безопасности.",
+                "practice_questions": [
+                    {
+                        "question": "Сколько лучше откладывать?",
+                        "options": ["Нисколько", "Всё", "10-20%", "50%"],
+                        "correct_index": 2,
+                        "explanation": "10-20% оптимально!"
+                    }
+                ]
+            }
+            return json.dumps(data, ensure_ascii=False)
+
+        # Regenerate Lesson
+        data = {
+            "lesson_text": "Этот урок был персонально сгенерирован нашим алгоритмом под ваши новые настройки!",
+            "flashcards": [{"question": "В чем суть?", "answer": "В дисциплине."}],
+            "quiz": [{"question": "Это помогает?", "options": ["Да", "Нет", "Не знаю", "Может быть"], "correct_index": 0, "explanation": "Конечно помогает."}]
+        }
+        return json.dumps(data, ensure_ascii=False)
+
+
+class GeminiBackend(AIBackend):
+    """Gemini `generateContent` over HTTP with a shared connection pool."""
+    name = "gemini"
+    BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+
+    def __init__(self, api_key: str, model: str, max_connections: int):
+        self.api_key = api_key
+        self.model = model
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._http: Optional[httpx.AsyncClient] = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        # Created on first use so it binds to the running event loop
+        if self._http is None:
+            # The key goes in a header: httpx logs request URLs at INFO
+            self._http = httpx.AsyncClient(
+                base_url=self.BASE_URL,
+                headers={"x-goog-api-key": self.api_key},
+                limits=self._limits,
+                timeout=None,
+            )
+        return self._http
+
+    @staticmethod
+    def _body(prompt: str, system_instruction: Optional[str]) -> dict:
+        body = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+        if system_instruction:
+            body["systemInstruction"] = {"parts": [{"text": system_instruction}]}
+        return body
+
+    async def generate(self, prompt: str, system_instruction: Optional[str] = None) -> str:
+        try:
+            response = await self.http.post(
+                f"/models/{self.model}:generateContent",
+                json=self._body(prompt, system_instruction),
+            )
+        except httpx.TransportError as e:
+            raise AIBackendError(f"Gemini transport error: {e}", retryable=True) from e
+
+        if response.status_code == 429 or response.status_code >= 500:
+            raise AIBackendError(f"Gemini HTTP {response.status_code}", retryable=True)
+        if response.status_code >= 400:
+            raise AIBackendError(f"Gemini HTTP {response.status_code}: {response.text[:200]}")
+
+        try:
+            parts = response.json()["candidates"][0]["content"]["parts"]
+        except (KeyError, IndexError, ValueError) as e:
+            raise AIBackendError(f"Unexpected Gemini response: {e}") from e
+        return "".join(part.get("text", "") for part in parts)
+
+    async def stream(self, prompt: str, system_instruction: Optional[str] = None) -> AsyncIterator[str]:
+        """`streamGenerateContent` with `alt=sse`: one JSON candidate per `data:` line."""
+        try:
+            async with self.http.stream(
+                "POST",
+                f"/models/{self.model}:streamGenerateContent",
+                params={"alt": "sse"},
+                json=self._body(prompt, system_instruction),
+            ) as response:
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise AIBackendError(f"Gemini HTTP {response.status_code}", retryable=True)
+                if response.status_code >= 400:
+                    await response.aread()
+                    raise AIBackendError(f"Gemini HTTP {response.status_code}: {response.text[:200]}")
+
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    try:
+                        parts = json.loads(line[5:])["candidates"][0]["content"]["parts"]
+                    except (KeyError, IndexError, ValueError) as e:
+                        raise AIBackendError(f"Unexpected Gemini stream chunk: {e}") from e
+                    text = "".join(part.get("text", "") for part in parts)
+                    if text:
+                        yield text
+        except httpx.TransportError as e:
+            raise AIBackendError(f"Gemini transport error: {e}", retryable=True) from e
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+BACKENDS: Dict[str, Type[AIBackend]] = {
+    "mock": MockBackend,
+    "gemini": GeminiBackend,
+}
+
+
+# ─── Client ──────────────────────────────────────────────────
+
+DEFAULT_LANES = {
+    INTERACTIVE: Lane(priority=10, deadline=10.0),
+    BULK: Lane(priority=0, deadline=120.0),
+}
+
+
+class AIClient:
+    def __init__(self, backend: AIBackend, max_concurrency: int, timeout: float,
+                 max_retries: int = 2, retry_backoff: float = 0.5,
+                 max_queue: Optional[int] = None, lanes: Optional[Dict[str, Lane]] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.backend = backend
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.admission = AdmissionController(max_concurrency, max_queue, lanes or DEFAULT_LANES)
+        self.breaker = breaker or CircuitBreaker()
+        self._in_flight = 0
+
+    @staticmethod
+    def _provider_verdict(error: AIClientError) -> Optional[bool]:
+        """What a failed call says about the provider: False if it is unhealthy, None if nothing."""
+        if isinstance(error, AITimeoutError):
+            return False
+        if isinstance(error, AIBackendError) and error.retryable:
+            return False
+        return None  # our request was bad, not the provider
+
+    async def generate(self, prompt: str, system_instruction: Optional[str] = None,
+                       timeout: Optional[float] = None, lane: str = INTERACTIVE) -> str:
+        timeout = timeout or self.timeout
+        probe = self.breaker.acquire()
+        ok, elapsed = None, 0.0
+        try:
+            async with self.admission.admit(lane):
+                self._in_flight += 1
+                metrics.set_gauge("ai_client.in_flight", self._in_flight)
+                start = time.perf_counter()
+                try:
+                    result = await self._generate_with_retries(prompt, system_instruction, timeout)
+                    ok = True
+                    return result
+                except AIClientError as e:
+                    ok = self._provider_verdict(e)
+                    raise
+                finally:
+                    elapsed = time.perf_counter() - start
+                    self._in_flight -= 1
+                    metrics.set_gauge("ai_client.in_flight", self._in_flight)
+                    metrics.observe("ai_client.latency_ms", elapsed * 1000)
+        finally:
+            self.breaker.record(probe, ok, elapsed)
+
+    async def _generate_with_retries(self, prompt: str, system_instruction: Optional[str], timeout: float) -> str:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await asyncio.wait_for(self.backend.generate(prompt, system_instruction), timeout)
+            except asyncio.TimeoutError:
+                metrics.inc("ai_client.timeouts")
+                raise AITimeoutError(f"AI call timed out after {timeout}s")
+            except AIBackendError as e:
+                metrics.inc("ai_client.errors")
+                if not e.retryable or attempt == self.max_retries:
+                    raise
+                delay = self.retry_backoff * (2 ** attempt)
+                logger.warning(f"AI call failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def stream(self, prompt: str, system_instruction: Optional[str] = None,
+                     timeout: Optional[float] = None, lane: str = INTERACTIVE) -> AsyncIterator[str]:
+        """
+        Yield reply chunks as the backend produces them. The concurrency slot
+        is held until the stream ends. Transient errors are retried only
+        before the first chunk; after that the caller has already shown text.
+        """
+        timeout = timeout or self.timeout
+        probe = self.breaker.acquire()
+        ok, ttft = None, 0.0
+        try:
+            async with self.admission.admit(lane):
+                self._in_flight += 1
+                metrics.set_gauge("ai_client.in_flight", self._in_flight)
+                start = time.perf_counter()
+                chunks = None
+                try:
+                    chunks, first = await self._open_stream_with_retries(prompt, system_instruction, timeout)
+                    # The provider answered; how fast is judged by the first chunk
+                    ok, ttft = True, time.perf_counter() - start
+                    if first is None:
+                        return
+                    metrics.observe("ai_client.ttft_ms", ttft * 1000)
+                    yield first
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+                        except StopAsyncIteration:
+                            return
+                        except asyncio.TimeoutError:
+                            metrics.inc("ai_client.timeouts")
+                            raise AITimeoutError(f"AI stream stalled for {timeout}s")
+                        yield chunk
+                except AIClientError as e:
+                    ok = self._provider_verdict(e)
+                    raise
+                finally:
+                    if chunks is not None:
+                        await chunks.aclose()
+                    self._in_flight -= 1
+                    metrics.set_gauge("ai_client.in_flight", self._in_flight)
+                    metrics.observe("ai_client.latency_ms", (time.perf_counter() - start) * 1000)
+        finally:
+            self.breaker.record(probe, ok, ttft)
+
+    async def _open_stream_with_retries(self, prompt: str, system_instruction: Optional[str], timeout: float):
+        """Start a backend stream and wait for its first chunk (None if it is empty)."""
+        for attempt in range(self.max_retries + 1):
+            chunks = self.backend.stream(prompt, system_instruction)
+            try:
+                return chunks, await asyncio.wait_for(chunks.__anext__(), timeout)
+            except StopAsyncIteration:
+                return chunks, None
+            except asyncio.TimeoutError:
+                await chunks.aclose()
+                metrics.inc("ai_client.timeouts")
+                raise AITimeoutError(f"AI stream sent nothing within {timeout}s")
+            except AIBackendError as e:
+                await chunks.aclose()
+                metrics.inc("ai_client.errors")
+                if not e.retryable or attempt == self.max_retries:
+                    raise
+                delay = self.retry_backoff * (2 ** attempt)
+                logger.warning(f"AI stream failed to start ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def aclose(self) -> None:
+        await self.backend.aclose()
+
+
+def _build_backend(name: str) -> AIBackend:
+    settings = get_settings()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown AI_BACKEND '{name}' (expected one of {', '.join(BACKENDS)})")
+    if name == "gemini":
+        return GeminiBackend(settings.GEMINI_API_KEY, settings.GEMINI_MODEL, settings.AI_MAX_CONCURRENCY)
+    return MockBackend(latency_ms=settings.AI_MOCK_LATENCY_MS, chunk_delay_ms=settings.AI_MOCK_CHUNK_DELAY_MS)
+
+
+@lru_cache()
+def get_ai_client() -> AIClient:
+    settings = get_settings()
+    backend = _build_backend(settings.AI_BACKEND)
+    logger.info(f"AI backend: {backend.name}")
+    return AIClient(
+        backend,
+        max_concurrency=settings.AI_MAX_CONCURRENCY,
+        timeout=settings.AI_TIMEOUT_SECONDS,
+        max_retries=settings.AI_MAX_RETRIES,
+        max_queue=settings.AI_MAX_QUEUE,
+        lanes={
+            INTERACTIVE: Lane(priority=10, deadline=settings.AI_INTERACTIVE_QUEUE_SECONDS),
+            BULK: Lane(priority=0, deadline=settings.AI_BULK_QUEUE_SECONDS),
+        },
+        breaker=CircuitBreaker(
+            failure_rate=settings.AI_BREAKER_FAILURE_RATE,
+            min_calls=settings.AI_BREAKER_MIN_CALLS,
+            window_seconds=settings.AI_BREAKER_WINDOW_SECONDS,
+            slow_call_seconds=settings.AI_BREAKER_SLOW_SECONDS,
+            open_seconds=settings.AI_BREAKER_OPEN_SECONDS,
+            half_open_probes=settings.AI_BREAKER_HALF_OPEN_PROBES,
+        ),
+    )
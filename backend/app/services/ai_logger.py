@@ -1,5 +1,5 @@
 """
-Structured logging for AI calls: latency, tokens, errors.
+Structured logging for AI calls: latency, time to first token, tokens, errors.
 """
 import logging
 import time
@@ -18,8 +18,9 @@ def log_ai_call(
     tokens_used: int,
     success: bool,
     error: Optional[str] = None,
+    ttft_ms: Optional[int] = None,
 ):
-    """Log a structured AI call record."""
+    """Log a structured AI call record (`ttft_ms` for streamed replies)."""
     record = {
         "event": "ai_call",
         "endpoint": endpoint,
@@ -29,6 +30,8 @@ def log_ai_call(
         "tokens_used": tokens_used,
         "success": success,
     }
+    if ttft_ms is not None:
+        record["ttft_ms"] = ttft_ms
     if error:
         record["error"] = error
 
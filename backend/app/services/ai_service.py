@@ -7,89 +7,48 @@ AI Service — handles all Gemini-powered features:
 
 All calls go through the backend (secure API keys),
 with retries, caching, logging, and graceful fallbacks.
+When the model is failing or the circuit breaker is open, regeneration
+and dictionary lookups serve the nearest cached answer (marked `stale`)
+and the coach answers with a canned tip, instead of erroring out.
 """
+import base64
 import json
 import hashlib
 import logging
 import time
-from typing import Optional, List
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional, Tuple
 
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from json_repair import repair_json
 
 from ..config import get_settings
 from ..models.lesson import Lesson, LessonContent
 from ..models.ai_models import ChatMessage, RegeneratedContent, DictionaryCache
 from ..schemas.ai_schemas import (
-    CoachChatResponse, ChatMessageResponse,
+    CoachChatResponse, ChatMessageResponse, ChatHistoryResponse,
     RegenerateResponse,
     LifeExampleResponse, PracticeQuestion,
     DictionaryResponse, MiniTestQuestion,
 )
 from .prompt_registry import get_prompt, LEVEL_DESCRIPTIONS
 from .ai_logger import log_ai_call
+from .admission import BULK, INTERACTIVE, OverloadedError
+from .ai_client import AIClientError, get_ai_client
+from .circuit_breaker import CircuitOpenError
+from . import conversation_memory, lesson_index, metrics, rate_limiter
+from .jobs import PRIORITY_BACKGROUND, enqueue_once, job_handler
+from .token_budget import TokenBudget
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
-# ─── Shared Gemini Client ─────────────────────────────────────
+# ─── Shared AI Client ─────────────────────────────────────────
 
-_gemini_model = None
-
-
-def _get_gemini_model():
-    """Returns None - mock mode."""
-    return None
-
-
-def _call_gemini(prompt: str, system_instruction: str = None, max_retries: int = 3, timeout: int = 30) -> str:
-    """
-    Mock Gemini AI response for local hackathon rules compliance.
-    """
-    import json
-    
-    # Coach Chat
-    if system_instruction or "Coach:" in prompt:
-        return "Привет! Я твой встроенный ИИ-тренер (Mock). Я проанализировал твои знания и вот мой совет: всегда откладывай 10% от любого дохода. Как твои успехи сегодня?"
-        
-    # Dictionary
-    if "definition" in prompt or "lesson_context" in prompt or "dictionary" in prompt.lower():
-        data = {
-            "definition": "Это важный финансовый термин, помогающий вам сохранить капитал.",
-            "example": "Например: Если вы применяете это правило, вы не потеряете деньги.",
-            "mini_test": [
-                {
-                    "question": "Применимо ли это в жизни?",
-                    "options": ["Да", "Нет", "Иногда", "Сложно сказать"],
-                    "correct_index": 0
-                }
-            ]
-        }
-        return json.dumps(data, ensure_ascii=False)
-        
-    # Life example
-    if "example_text" in prompt or "income_type" in prompt:
-        data = {
-            "example_text": "Отличный пример: вы заработали деньги на фрилансе и отложили 20%.",
-            "explanation": "Так формируется финансовая подушка безопасности.",
-            "practice_questions": [
-                {
-                    "question": "Сколько лучше откладывать?",
-                    "options": ["Нисколько", "Всё", "10-20%", "50%"],
-                    "correct_index": 2,
-                    "explanation": "10-20% оптимально!"
-                }
-            ]
-        }
-        return json.dumps(data, ensure_ascii=False)
-        
-    # Regenerate Lesson
-    data = {
-        "lesson_text": "Этот урок был персонально сгенерирован нашим алгоритмом под ваши новые настройки!",
-        "flashcards": [{"question": "В чем суть?", "answer": "В дисциплине."}],
-        "quiz": [{"question": "Это помогает?", "options": ["Да", "Нет", "Не знаю", "Может быть"], "correct_index": 0, "explanation": "Конечно помогает."}]
-    }
-    return json.dumps(data, ensure_ascii=False)
+async def _call_gemini(prompt: str, system_instruction: str = None, timeout: float = None, lane: str = INTERACTIVE) -> str:
+    """One model call through the shared async AI client (timeout, admission control, retries)."""
+    return await get_ai_client().generate(prompt, system_instruction=system_instruction, timeout=timeout, lane=lane)
 
 
 def _clean_json(text: str) -> str:
@@ -121,80 +80,73 @@ def _parse_json(text: str) -> dict:
         return json.loads(repaired)
 
 
-# ─── Rate Limiter (in-memory, per-user) ───────────────────────
-
-_rate_limits: dict = {}  # user_id -> list of timestamps
-RATE_LIMIT_WINDOW = 60   # seconds
-RATE_LIMIT_MAX = 15       # max calls per window
-
-
-def _check_rate_limit(user_id: int) -> bool:
-    """Returns True if the user is within rate limits, False if exceeded."""
-    now = time.time()
-    if user_id not in _rate_limits:
-        _rate_limits[user_id] = []
-
-    # Clean old entries
-    _rate_limits[user_id] = [t for t in _rate_limits[user_id] if now - t < RATE_LIMIT_WINDOW]
-
-    if len(_rate_limits[user_id]) >= RATE_LIMIT_MAX:
-        return False
-
-    _rate_limits[user_id].append(now)
-    return True
-
-
 # ═══════════════════════════════════════════════════════════════
 #  1. COACH CHAT
 # ═══════════════════════════════════════════════════════════════
 
-def coach_chat(
-    db: Session,
+@dataclass
+class CoachTurn:
+    """Everything needed to ask the model for one coach reply."""
+    user_id: int
+    lesson_id: int
+    prompt_version: str
+    system_prompt: str
+    conversation: str
+    user_message: ChatMessage
+    summary_due: bool = False
+
+
+COACH_FALLBACK_REPLY = (
+    "I'm having trouble connecting right now. "
+    "Here's a tip: review the lesson content above and try the flashcards — "
+    "they're great for reinforcing key concepts! I'll be back shortly."
+)
+
+
+async def _prepare_coach_turn(
+    db: AsyncSession,
     user_id: int,
     lesson_id: int,
     user_message: str,
     user_level: int = 1,
     recent_quiz_errors: List[str] = None,
-) -> CoachChatResponse:
-    """Process a coach chat message and return AI reply + history."""
+) -> CoachTurn:
+    """Check limits, build the prompt and add (not commit) the user's message."""
 
-    if not _check_rate_limit(user_id):
-        raise ValueError("Rate limit exceeded. Please wait a moment before sending another message.")
+    await rate_limiter.enforce("coach", user_id)
 
     # Get lesson content for context
-    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
+    lesson = await db.get(Lesson, lesson_id)
     if not lesson:
         raise ValueError(f"Lesson {lesson_id} not found")
 
-    lesson_content_obj = db.query(LessonContent).filter(LessonContent.lesson_id == lesson_id).first()
-    lesson_text = lesson_content_obj.lesson_text[:3000] if lesson_content_obj else "No lesson content available."
+    lesson_content_obj = await db.scalar(select(LessonContent).where(LessonContent.lesson_id == lesson_id))
 
     # Build prompt from template
     prompt_data = get_prompt("coach_v1")
-    system_prompt = prompt_data["system"].format(
+    prompt_fields = dict(
         lesson_title=lesson.title,
         level=user_level,
         quiz_errors=", ".join(recent_quiz_errors) if recent_quiz_errors else "None",
         level_desc=LEVEL_DESCRIPTIONS.get(user_level, ""),
-        lesson_content=lesson_text,
     )
 
-    # Get chat history for context (last 10 messages)
-    history = (
-        db.query(ChatMessage)
-        .filter(ChatMessage.user_id == user_id, ChatMessage.lesson_id == lesson_id)
-        .order_by(ChatMessage.created_at.desc())
-        .limit(10)
-        .all()
-    )
-    history.reverse()
+    # Fit the prompt into the token budget: instructions and the new message
+    # always go in, then the conversation memory (up to half of what is left),
+    # then as much lesson text as still fits
+    budget = TokenBudget(settings.COACH_PROMPT_TOKEN_BUDGET)
+    question = f"Student: {user_message}\n\nCoach:"
+    budget.charge(prompt_data["system"].format(lesson_content="", **prompt_fields))
+    budget.charge(question)
+
+    memory = await conversation_memory.load_context(db, user_id, lesson_id)
+    conversation = memory.render(budget, max_tokens=budget.remaining // 2) + question
 
-    # Build conversation string
-    conversation = ""
-    for msg in history:
-        role_label = "Student" if msg.role == "user" else "Coach"
-        conversation += f"{role_label}: {msg.content}\n\n"
-    conversation += f"Student: {user_message}\n\nCoach:"
+    if lesson_content_obj:
+        lesson_text = _lesson_context(lesson_content_obj, user_message, recent_quiz_errors, budget)
+    else:
+        lesson_text = "No lesson content available."
+    system_prompt = prompt_data["system"].format(lesson_content=lesson_text, **prompt_fields)
 
     # Save user message
     user_msg = ChatMessage(
@@ -206,10 +158,59 @@ def coach_chat(
     )
     db.add(user_msg)
 
+    return CoachTurn(
+        user_id=user_id,
+        lesson_id=lesson_id,
+        prompt_version=prompt_data["version"],
+        system_prompt=system_prompt,
+        conversation=conversation,
+        user_message=user_msg,
+        summary_due=memory.summary_due(new_messages=2),  # this message and its reply
+    )
+
+
+def _lesson_context(content: LessonContent, user_message: str, quiz_errors: Optional[List[str]], budget: TokenBudget) -> str:
+    """
+    The lesson sections most relevant to the question (and recent quiz
+    mistakes), in lesson order, as many as fit the remaining budget.
+    """
+    query = " ".join([user_message, *(quiz_errors or [])])
+    ranked = lesson_index.relevant_sections(content.lesson_id, content.lesson_text, query, settings.COACH_CONTEXT_SECTIONS)
+    chosen = []
+    for section in ranked:
+        if budget.fits(section.text + "\n\n"):
+            budget.charge(section.text + "\n\n")
+            chosen.append(section)
+        elif not chosen:
+            # Even the best match is too long: keep its beginning
+            return budget.take(section.text)
+    chosen.sort(key=lambda section: section.position)
+    return "\n\n".join(section.text for section in chosen)
+
+
+async def _schedule_summary(db: AsyncSession, turn: CoachTurn) -> None:
+    """Fold older messages into the conversation summary in the background."""
+    if turn.summary_due:
+        payload = {"user_id": turn.user_id, "lesson_id": turn.lesson_id}
+        await enqueue_once(db, "coach_summary", payload, user_id=turn.user_id, priority=PRIORITY_BACKGROUND)
+
+
+async def coach_chat(
+    db: AsyncSession,
+    user_id: int,
+    lesson_id: int,
+    user_message: str,
+    user_level: int = 1,
+    recent_quiz_errors: List[str] = None,
+) -> CoachChatResponse:
+    """Process a coach chat message and return AI reply + history."""
+
+    turn = await _prepare_coach_turn(db, user_id, lesson_id, user_message, user_level, recent_quiz_errors)
+
     # Call Gemini
     start_time = time.monotonic()
     try:
-        reply_text = _call_gemini(conversation, system_instruction=system_prompt)
+        reply_text = await _call_gemini(turn.conversation, system_instruction=turn.system_prompt)
         latency = int((time.monotonic() - start_time) * 1000)
 
         # Save assistant message
@@ -218,25 +219,24 @@ def coach_chat(
             lesson_id=lesson_id,
             role="assistant",
             content=reply_text,
-            prompt_version=prompt_data["version"],
+            prompt_version=turn.prompt_version,
             latency_ms=latency,
         )
         db.add(assistant_msg)
-        db.commit()
+        await db.commit()
 
-        log_ai_call("coach_chat", user_id, prompt_data["version"], latency, 0, True)
+        log_ai_call("coach_chat", user_id, turn.prompt_version, latency, 0, True)
 
+    except OverloadedError:
+        await db.rollback()  # drop the user's message too; they will resend it
+        raise
     except Exception as e:
-        db.commit()  # still save user message
+        await db.commit()  # still save user message
         latency = int((time.monotonic() - start_time) * 1000)
-        log_ai_call("coach_chat", user_id, prompt_data["version"], latency, 0, False, str(e))
+        log_ai_call("coach_chat", user_id, turn.prompt_version, latency, 0, False, str(e))
 
         # Graceful fallback
-        reply_text = (
-            "I'm having trouble connecting right now. "
-            "Here's a tip: review the lesson content above and try the flashcards — "
-            "they're great for reinforcing key concepts! I'll be back shortly."
-        )
+        reply_text = COACH_FALLBACK_REPLY
         assistant_msg = ChatMessage(
             user_id=user_id,
             lesson_id=lesson_id,
@@ -245,25 +245,157 @@ def coach_chat(
             prompt_version="fallback",
         )
         db.add(assistant_msg)
-        db.commit()
-
-    # Return full history
-    all_messages = (
-        db.query(ChatMessage)
-        .filter(ChatMessage.user_id == user_id, ChatMessage.lesson_id == lesson_id)
-        .order_by(ChatMessage.created_at.asc())
-        .all()
-    )
+        await db.commit()
+
+    # Return just this exchange; older messages are paged via get_chat_history
+    new_messages = [turn.user_message, assistant_msg]
+    for msg in new_messages:
+        await db.refresh(msg)  # server-side created_at
+
+    await _schedule_summary(db, turn)
 
     return CoachChatResponse(
         reply=reply_text,
-        history=[
-            ChatMessageResponse(role=m.role, content=m.content, created_at=m.created_at)
-            for m in all_messages
-        ],
+        messages=[ChatMessageResponse.model_validate(m) for m in new_messages],
+        history_cursor=encode_history_cursor(turn.user_message.id),
     )
 
 
+def encode_history_cursor(message_id: int) -> str:
+    return base64.urlsafe_b64encode(f"msg:{message_id}".encode()).decode()
+
+
+def _decode_history_cursor(cursor: str) -> int:
+    try:
+        prefix, message_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        if prefix != "msg":
+            raise ValueError
+        return int(message_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid history cursor")
+
+
+async def get_chat_history(
+    db: AsyncSession,
+    user_id: int,
+    lesson_id: int,
+    before: Optional[str] = None,
+    limit: int = 20,
+) -> ChatHistoryResponse:
+    """
+    One page of a conversation, walking backwards from `before` (or the
+    newest message). Keyset pagination on (created_at, id): every page is
+    a range scan of ix_chat_messages_history, however long the history.
+    """
+    query = (
+        select(ChatMessage)
+        .where(ChatMessage.user_id == user_id, ChatMessage.lesson_id == lesson_id)
+        .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+        .limit(limit + 1)
+    )
+    if before:
+        anchor_id = _decode_history_cursor(before)
+        # Compare against the stored timestamp so the cursor never has to carry one.
+        # The anchor must be in this thread; one from elsewhere is rejected below.
+        anchor = select(ChatMessage.created_at).where(
+            ChatMessage.id == anchor_id,
+            ChatMessage.user_id == user_id,
+            ChatMessage.lesson_id == lesson_id,
+        )
+        query = query.where(tuple_(ChatMessage.created_at, ChatMessage.id) < tuple_(anchor.scalar_subquery(), anchor_id))
+
+    rows = list((await db.scalars(query)).all())
+    # An empty page is either the start of the thread or a foreign anchor
+    if before and not rows and await db.scalar(anchor) is None:
+        raise ValueError("Invalid history cursor")
+    has_more = len(rows) > limit
+    page = rows[:limit]
+    page.reverse()
+
+    return ChatHistoryResponse(
+        messages=[ChatMessageResponse.model_validate(m) for m in page],
+        next_cursor=encode_history_cursor(page[0].id) if has_more else None,
+    )
+
+
+async def start_coach_stream(
+    db: AsyncSession,
+    user_id: int,
+    lesson_id: int,
+    user_message: str,
+    user_level: int = 1,
+    recent_quiz_errors: List[str] = None,
+) -> CoachTurn:
+    """
+    Validate and store the user's message for a streamed reply. Raises
+    ValueError / OverloadedError up front so the endpoint can answer
+    400/429/503 before the event stream starts.
+    """
+    # Shed now if the model is saturated: once the stream starts, it is too late for a 503
+    get_ai_client().admission.check(INTERACTIVE)
+    turn = await _prepare_coach_turn(db, user_id, lesson_id, user_message, user_level, recent_quiz_errors)
+    await db.commit()
+    return turn
+
+
+def _stream_gemini(prompt: str, system_instruction: str = None) -> AsyncIterator[str]:
+    """Stream one model reply through the shared async AI client."""
+    return get_ai_client().stream(prompt, system_instruction=system_instruction)
+
+
+async def stream_coach_reply(session_factory, turn: CoachTurn) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    Yield ("token", {"text"}) events as the reply arrives, then one
+    ("done", {...}) event once the assistant message is saved. The stream
+    outlives the request's session, so the message is saved through
+    `session_factory`. A failure before the first token streams the
+    fallback reply; a failure mid-reply saves the text sent so far.
+    """
+    start_time = time.monotonic()
+    ttft = None
+    parts: List[str] = []
+    error = None
+    try:
+        async for chunk in _stream_gemini(turn.conversation, system_instruction=turn.system_prompt):
+            if ttft is None:
+                ttft = int((time.monotonic() - start_time) * 1000)
+            parts.append(chunk)
+            yield "token", {"text": chunk}
+    except Exception as e:
+        error = str(e)
+
+    latency = int((time.monotonic() - start_time) * 1000)
+    log_ai_call("coach_chat_stream", turn.user_id, turn.prompt_version, latency, 0, error is None, error, ttft_ms=ttft)
+
+    prompt_version = turn.prompt_version
+    if not parts:
+        prompt_version = "fallback"
+        parts = [COACH_FALLBACK_REPLY]
+        yield "token", {"text": COACH_FALLBACK_REPLY}
+
+    async with session_factory() as db:
+        assistant_msg = ChatMessage(
+            user_id=turn.user_id,
+            lesson_id=turn.lesson_id,
+            role="assistant",
+            content="".join(parts),
+            prompt_version=prompt_version,
+            latency_ms=latency if error is None else 0,
+        )
+        db.add(assistant_msg)
+        await db.commit()
+        await db.refresh(assistant_msg)  # server-side created_at
+        await _schedule_summary(db, turn)
+
+    yield "done", {
+        "message": ChatMessageResponse.model_validate(assistant_msg).model_dump(mode="json"),
+        "history_cursor": encode_history_cursor(turn.user_message.id),
+        "ttft_ms": ttft,
+        "latency_ms": latency,
+        "error": error,
+    }
+
+
 # ═══════════════════════════════════════════════════════════════
 #  2. LESSON REGENERATION
 # ═══════════════════════════════════════════════════════════════
@@ -274,8 +406,8 @@ def _params_hash(lesson_id: int, user_level: int, params: dict) -> str:
     return hashlib.sha256(key.encode()).hexdigest()[:16]
 
 
-def regenerate_lesson(
-    db: Session,
+async def regenerate_lesson(
+    db: AsyncSession,
     user_id: int,
     lesson_id: int,
     difficulty: str = "same",
@@ -283,13 +415,14 @@ def regenerate_lesson(
     more_examples: bool = False,
     topic_focus: Optional[str] = None,
     user_level: int = 1,
+    enforce_rate_limit: bool = True,
 ) -> RegenerateResponse:
     """Regenerate lesson content with custom parameters."""
 
-    if not _check_rate_limit(user_id):
-        raise ValueError("Rate limit exceeded. Please wait before regenerating.")
+    if enforce_rate_limit:
+        await rate_limiter.enforce("regenerate", user_id)
 
-    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
+    lesson = await db.get(Lesson, lesson_id)
     if not lesson:
         raise ValueError(f"Lesson {lesson_id} not found")
 
@@ -297,12 +430,11 @@ def regenerate_lesson(
     params = {"difficulty": difficulty, "length": length, "more_examples": more_examples, "topic_focus": topic_focus}
     cache_hash = _params_hash(lesson_id, user_level, params)
 
-    cached = (
-        db.query(RegeneratedContent)
-        .filter(RegeneratedContent.lesson_id == lesson_id,
-                RegeneratedContent.params_hash == cache_hash,
-                RegeneratedContent.user_level == user_level)
-        .first()
+    cached = await db.scalar(
+        select(RegeneratedContent)
+        .where(RegeneratedContent.lesson_id == lesson_id,
+               RegeneratedContent.params_hash == cache_hash,
+               RegeneratedContent.user_level == user_level)
     )
     if cached:
         data = json.loads(cached.content_json)
@@ -326,7 +458,7 @@ def regenerate_lesson(
 
     start_time = time.monotonic()
     try:
-        response_text = _call_gemini(prompt)
+        response_text = await _call_gemini(prompt, lane=BULK)
         latency = int((time.monotonic() - start_time) * 1000)
         data = _parse_json(response_text)
 
@@ -339,7 +471,7 @@ def regenerate_lesson(
             prompt_version=prompt_data["version"],
         )
         db.add(cache_entry)
-        db.commit()
+        await db.commit()
 
         log_ai_call("regenerate_lesson", user_id, prompt_data["version"], latency, 0, True)
 
@@ -349,18 +481,71 @@ def regenerate_lesson(
             quiz=data.get("quiz", []),
             from_cache=False,
         )
+    except OverloadedError:
+        raise  # shed before reaching the model: the caller answers 503
+    except (AIClientError, CircuitOpenError) as e:
+        latency = int((time.monotonic() - start_time) * 1000)
+        log_ai_call("regenerate_lesson", user_id, prompt_data["version"], latency, 0, False, str(e))
+        stale = await _stale_regeneration(db, lesson_id, user_level)
+        if stale is not None:
+            metrics.inc("ai_service.stale.regenerate")
+            return stale
+        if isinstance(e, CircuitOpenError):
+            raise
+        raise ValueError(f"Regeneration failed: {e}")
     except Exception as e:
         latency = int((time.monotonic() - start_time) * 1000)
         log_ai_call("regenerate_lesson", user_id, prompt_data["version"], latency, 0, False, str(e))
         raise ValueError(f"Regeneration failed: {e}")
 
 
+async def _stale_regeneration(db: AsyncSession, lesson_id: int, user_level: int) -> Optional[RegenerateResponse]:
+    """
+    The nearest thing to a regenerated lesson without the model: any cached
+    variant of the lesson (closest level, newest first), else the base lesson.
+    """
+    variant = await db.scalar(
+        select(RegeneratedContent)
+        .where(RegeneratedContent.lesson_id == lesson_id)
+        .order_by(func.abs(RegeneratedContent.user_level - user_level), RegeneratedContent.created_at.desc())
+        .limit(1)
+    )
+    if variant:
+        data = json.loads(variant.content_json)
+        return RegenerateResponse(
+            lesson_text=data.get("lesson_text", ""),
+            flashcards=data.get("flashcards", []),
+            quiz=data.get("quiz", []),
+            from_cache=True,
+            stale=True,
+        )
+
+    base = await db.scalar(select(LessonContent).where(LessonContent.lesson_id == lesson_id))
+    if base:
+        return RegenerateResponse(
+            lesson_text=base.lesson_text,
+            flashcards=json.loads(base.flashcards_json),
+            quiz=json.loads(base.quiz_json),
+            from_cache=True,
+            stale=True,
+        )
+    return None
+
+
+@job_handler("ai_regenerate")
+async def _regenerate_job(session_factory, payload: dict) -> dict:
+    async with session_factory() as db:
+        # The limit was enforced when the job was accepted
+        response = await regenerate_lesson(db=db, enforce_rate_limit=False, **payload)
+    return response.model_dump(mode="json")
+
+
 # ═══════════════════════════════════════════════════════════════
 #  3. LIFE EXAMPLE
 # ═══════════════════════════════════════════════════════════════
 
-def generate_life_example(
-    db: Session,
+async def generate_life_example(
+    db: AsyncSession,
     user_id: int,
     income_type: str,
     amount: float,
@@ -370,12 +555,11 @@ def generate_life_example(
 ) -> LifeExampleResponse:
     """Generate a personalized financial example."""
 
-    if not _check_rate_limit(user_id):
-        raise ValueError("Rate limit exceeded. Please wait before generating another example.")
+    await rate_limiter.enforce("life_example", user_id)
 
     lesson_topic = "General financial literacy"
     if lesson_id:
-        lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
+        lesson = await db.get(Lesson, lesson_id)
         if lesson:
             lesson_topic = lesson.title
 
@@ -390,7 +574,7 @@ def generate_life_example(
 
     start_time = time.monotonic()
     try:
-        response_text = _call_gemini(prompt)
+        response_text = await _call_gemini(prompt)
         latency = int((time.monotonic() - start_time) * 1000)
         data = _parse_json(response_text)
 
@@ -410,6 +594,8 @@ def generate_life_example(
             explanation=data.get("explanation", ""),
             practice_questions=practice_qs,
         )
+    except (OverloadedError, CircuitOpenError):
+        raise  # nothing cached to fall back on: the caller answers 503
     except Exception as e:
         latency = int((time.monotonic() - start_time) * 1000)
         log_ai_call("life_example", user_id, prompt_data["version"], latency, 0, False, str(e))
@@ -420,8 +606,8 @@ def generate_life_example(
 #  4. DICTIONARY
 # ═══════════════════════════════════════════════════════════════
 
-def dictionary_lookup(
-    db: Session,
+async def dictionary_lookup(
+    db: AsyncSession,
     user_id: int,
     term: str,
     lesson_id: Optional[int] = None,
@@ -430,36 +616,22 @@ def dictionary_lookup(
     """Look up a financial term definition with caching."""
 
     # Check cache first (exact match on term + level)
-    cached = (
-        db.query(DictionaryCache)
-        .filter(
+    cached = await db.scalar(
+        select(DictionaryCache)
+        .where(
             DictionaryCache.term == term.lower().strip(),
             DictionaryCache.user_level == user_level,
         )
-        .first()
     )
     if cached:
-        mini_test = []
-        try:
-            for q in json.loads(cached.mini_test_json):
-                mini_test.append(MiniTestQuestion(**q))
-        except Exception:
-            pass
+        return _cached_definition(cached)
 
-        return DictionaryResponse(
-            term=cached.term,
-            definition=cached.definition,
-            example=cached.example,
-            mini_test=mini_test,
-        )
-
-    if not _check_rate_limit(user_id):
-        raise ValueError("Rate limit exceeded. Please wait before looking up more terms.")
+    await rate_limiter.enforce("dictionary", user_id)
 
     # Get lesson context
     lesson_context = "General financial context"
     if lesson_id:
-        lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
+        lesson = await db.get(Lesson, lesson_id)
         if lesson:
             lesson_context = f"Lesson: {lesson.title} (Level {lesson.level})"
 
@@ -472,7 +644,7 @@ def dictionary_lookup(
 
     start_time = time.monotonic()
     try:
-        response_text = _call_gemini(prompt)
+        response_text = await _call_gemini(prompt)
         latency = int((time.monotonic() - start_time) * 1000)
         data = _parse_json(response_text)
 
@@ -496,7 +668,7 @@ def dictionary_lookup(
             prompt_version=prompt_data["version"],
         )
         db.add(cache_entry)
-        db.commit()
+        await db.commit()
 
         log_ai_call("dictionary_lookup", user_id, prompt_data["version"], latency, 0, True)
 
@@ -506,7 +678,42 @@ def dictionary_lookup(
             example=data.get("example", ""),
             mini_test=mini_test,
         )
+    except OverloadedError:
+        raise  # shed before reaching the model: the caller answers 503
+    except (AIClientError, CircuitOpenError) as e:
+        latency = int((time.monotonic() - start_time) * 1000)
+        log_ai_call("dictionary_lookup", user_id, prompt_data["version"], latency, 0, False, str(e))
+        # The same term explained for another level beats no answer
+        nearest = await db.scalar(
+            select(DictionaryCache)
+            .where(DictionaryCache.term == term.lower().strip())
+            .order_by(func.abs(DictionaryCache.user_level - user_level), DictionaryCache.created_at.desc())
+            .limit(1)
+        )
+        if nearest:
+            metrics.inc("ai_service.stale.dictionary")
+            return _cached_definition(nearest, stale=True)
+        if isinstance(e, CircuitOpenError):
+            raise
+        raise ValueError(f"Dictionary lookup failed: {e}")
     except Exception as e:
         latency = int((time.monotonic() - start_time) * 1000)
         log_ai_call("dictionary_lookup", user_id, prompt_data["version"], latency, 0, False, str(e))
         raise ValueError(f"Dictionary lookup failed: {e}")
+
+
+def _cached_definition(entry: DictionaryCache, stale: bool = False) -> DictionaryResponse:
+    mini_test = []
+    try:
+        for q in json.loads(entry.mini_test_json):
+            mini_test.append(MiniTestQuestion(**q))
+    except Exception:
+        pass
+
+    return DictionaryResponse(
+        term=entry.term,
+        definition=entry.definition,
+        example=entry.example,
+        mini_test=mini_test,
+        stale=stale,
+    )
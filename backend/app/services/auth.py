@@ -1,22 +1,35 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..config import get_settings
 from ..database import get_db
 from ..models.user import User
 from ..models.progress import UserStats
 from ..schemas.user import TokenData
+from . import metrics
+from .identity_cache import get_identity_cache
+from .password_pool import get_password_pool
 
 settings = get_settings()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
 
+@dataclass(frozen=True)
+class CurrentIdentity:
+    """Who is calling: enough for endpoints that only need the user id."""
+    id: int
+    email: str
+    name: str
+
+
 class AuthService:
     @staticmethod
     def hash_password(password: str) -> str:
@@ -26,6 +39,14 @@ class AuthService:
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         return pwd_context.verify(plain_password, hashed_password)
     
+    @staticmethod
+    def identity_claims(user: User) -> dict:
+        """Access token claims for `user`; includes the name when TOKEN_IDENTITY_CLAIMS is on."""
+        claims = {"sub": str(user.id), "email": user.email}
+        if settings.TOKEN_IDENTITY_CLAIMS:
+            claims["name"] = user.name
+        return claims
+    
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
         to_encode = data.copy()
@@ -51,58 +72,95 @@ class AuthService:
             email: str = payload.get("email")
             if user_id is None:
                 return None
-            return TokenData(user_id=user_id, email=email)
+            return TokenData(user_id=user_id, email=email, name=payload.get("name"))
         except JWTError:
             return None
     
     @staticmethod
-    def create_user(db: Session, name: str, email: str, password: str) -> User:
-        hashed_password = AuthService.hash_password(password)
+    async def create_user(db: AsyncSession, name: str, email: str, password: str) -> User:
+        # bcrypt is CPU-bound; keep it off the event loop
+        hashed_password = await get_password_pool().run("hash", AuthService.hash_password, password)
         user = User(name=name, email=email, password_hash=hashed_password)
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.flush()
         
         stats = UserStats(user_id=user.id)
         db.add(stats)
-        db.commit()
+        await db.commit()
+        await db.refresh(user)
         
         return user
     
     @staticmethod
-    def get_user_by_email(db: Session, email: str) -> Optional[User]:
-        return db.query(User).filter(User.email == email).first()
+    async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+        return await db.scalar(select(User).where(User.email == email))
     
     @staticmethod
-    def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
-        return db.query(User).filter(User.id == user_id).first()
+    async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
+        return await db.scalar(select(User).where(User.id == user_id))
     
     @staticmethod
-    def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
-        user = AuthService.get_user_by_email(db, email)
+    async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
+        user = await AuthService.get_user_by_email(db, email)
         if not user:
             return None
-        if not AuthService.verify_password(password, user.password_hash):
+        if not await get_password_pool().run("verify", AuthService.verify_password, password, user.password_hash):
             return None
         return user
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+async def _resolve_user(db: AsyncSession, user_id: int) -> User:
+    """
+    Cached users come back detached: to modify the row, load it with
+    `db.get(User, id)` and call `invalidate_user()` after committing.
+    """
+    cache = get_identity_cache()
+    user = cache.get(user_id)
+    if user is not None:
+        return user
     
+    user = await AuthService.get_user_by_id(db, user_id)
+    if user is None:
+        raise _credentials_exception()
+    cache.put(user)
+    return user
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> User:
     token_data = AuthService.verify_token(credentials.credentials, "access")
     if token_data is None:
-        raise credentials_exception
+        raise _credentials_exception()
     
-    user = AuthService.get_user_by_id(db, token_data.user_id)
-    if user is None:
-        raise credentials_exception
+    return await _resolve_user(db, token_data.user_id)
+
+
+async def get_current_identity(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> CurrentIdentity:
+    """
+    For read-only endpoints. Tokens issued with TOKEN_IDENTITY_CLAIMS carry
+    everything needed, so no query runs; older tokens fall back to the
+    cached user lookup.
+    """
+    token_data = AuthService.verify_token(credentials.credentials, "access")
+    if token_data is None:
+        raise _credentials_exception()
     
-    return user
+    if settings.TOKEN_IDENTITY_CLAIMS and token_data.name is not None:
+        metrics.inc("auth.token_identity")
+        return CurrentIdentity(id=token_data.user_id, email=token_data.email, name=token_data.name)
+    
+    user = await _resolve_user(db, token_data.user_id)
+    return CurrentIdentity(id=user.id, email=user.email, name=user.name)
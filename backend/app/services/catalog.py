@@ -0,0 +1,145 @@
+"""
+In-process lesson catalog.
+
+The lesson tree only changes when seed.py runs or when lesson content is
+generated / deleted, so it is loaded once and shared by every request as
+immutable data. Anything that writes to `lessons` or `lesson_content`
+must bump the shared CATALOG version in the same transaction
+(services/versions.py). Each request reads that counter (one primary-key
+lookup) and rebuilds the catalog when it moved, so writes from other API
+workers, job workers and the CLIs (seed.py, clear_content.py,
+pregeneration) show up everywhere at the next request.
+`invalidate_catalog()` only drops this process's copy.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.lesson import Lesson, LessonContent
+from ..schemas.lesson import LessonResponse
+from . import versions
+
+
+@dataclass(frozen=True)
+class CatalogLesson:
+    """One lesson with its two prebuilt response variants."""
+    id: int
+    level: int
+    module: int
+    lesson_number: int
+    title: str
+    has_content: bool
+    response: LessonResponse
+    completed_response: LessonResponse
+
+    def as_response(self, is_completed: bool) -> LessonResponse:
+        return self.completed_response if is_completed else self.response
+
+
+@dataclass(frozen=True)
+class LessonCatalog:
+    version: int
+    # level -> module -> lessons ordered by lesson_number
+    tree: Mapping[int, Mapping[int, Tuple[CatalogLesson, ...]]]
+    by_id: Mapping[int, CatalogLesson]
+    level_totals: Mapping[int, int]
+    module_totals: Mapping[Tuple[int, int], int]
+
+    def get(self, lesson_id: int) -> Optional[CatalogLesson]:
+        return self.by_id.get(lesson_id)
+
+    def following(self, lesson_id: int, count: int) -> List[CatalogLesson]:
+        """Up to `count` lessons after `lesson_id` in course order (level, module, number)."""
+        entries = [entry for modules in self.tree.values() for lessons in modules.values() for entry in lessons]
+        for i, entry in enumerate(entries):
+            if entry.id == lesson_id:
+                return entries[i + 1:i + 1 + count]
+        return []
+
+    def is_level_locked(self, level: int, completed_per_level: Mapping[int, int]) -> bool:
+        """A level is locked until every lesson of the previous level is completed."""
+        if level <= 1:
+            return False
+        prev_total = self.level_totals.get(level - 1, 0)
+        return prev_total > 0 and completed_per_level.get(level - 1, 0) < prev_total
+
+
+_catalog: Optional[LessonCatalog] = None
+
+
+async def _build_catalog(db: AsyncSession, version: int) -> LessonCatalog:
+    lessons = (await db.scalars(
+        select(Lesson).order_by(Lesson.level, Lesson.module, Lesson.lesson_number)
+    )).all()
+    content_ids = set((await db.scalars(select(LessonContent.lesson_id))).all())
+
+    tree: Dict[int, Dict[int, list]] = {}
+    by_id: Dict[int, CatalogLesson] = {}
+    level_totals: Dict[int, int] = {}
+    module_totals: Dict[Tuple[int, int], int] = {}
+
+    for lesson in lessons:
+        has_content = lesson.id in content_ids
+        base = LessonResponse(
+            id=lesson.id,
+            level=lesson.level,
+            module=lesson.module,
+            lesson_number=lesson.lesson_number,
+            title=lesson.title,
+            topic_key=lesson.topic_key,
+            quest_emoji=lesson.quest_emoji,
+            quest_hook=lesson.quest_hook,
+            has_content=has_content,
+            is_completed=False,
+        )
+        entry = CatalogLesson(
+            id=lesson.id,
+            level=lesson.level,
+            module=lesson.module,
+            lesson_number=lesson.lesson_number,
+            title=lesson.title,
+            has_content=has_content,
+            response=base,
+            completed_response=base.model_copy(update={"is_completed": True}),
+        )
+        by_id[lesson.id] = entry
+        tree.setdefault(lesson.level, {}).setdefault(lesson.module, []).append(entry)
+        level_totals[lesson.level] = level_totals.get(lesson.level, 0) + 1
+        key = (lesson.level, lesson.module)
+        module_totals[key] = module_totals.get(key, 0) + 1
+
+    frozen_tree = {
+        level: {module: tuple(entries) for module, entries in sorted(modules.items())}
+        for level, modules in sorted(tree.items())
+    }
+    return LessonCatalog(
+        version=version,
+        tree=frozen_tree,
+        by_id=by_id,
+        level_totals=level_totals,
+        module_totals=module_totals,
+    )
+
+
+async def get_catalog(db: AsyncSession) -> LessonCatalog:
+    """Return the cached catalog, rebuilding it when the shared version moved."""
+    global _catalog
+    version = await versions.get_shared_version(db, versions.CATALOG)
+    catalog = _catalog
+    if catalog is not None and catalog.version == version:
+        return catalog
+    # The version is read before the rows, so a catalog is never older than
+    # its version says; a write racing the build only causes another rebuild.
+    catalog = await _build_catalog(db, version)
+    current = _catalog
+    if current is None or current.version <= version:
+        _catalog = catalog
+    return catalog
+
+
+def invalidate_catalog() -> None:
+    """Drop this process's copy, e.g. after writing rows without bumping the version."""
+    global _catalog
+    _catalog = None
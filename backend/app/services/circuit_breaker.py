@@ -0,0 +1,138 @@
+"""
+Circuit breaker for the upstream AI provider.
+
+While the provider is healthy the breaker is CLOSED and only watches: every
+finished call is recorded with its outcome, and a call slower than
+`slow_call_seconds` counts as a failure too (a provider that answers in 25s
+is as useless to a student as one that errors). Once at least `min_calls`
+calls in the last `window_seconds` have been seen and the failure rate
+reaches `failure_rate`, the breaker OPENS.
+
+While OPEN every call is refused at once with CircuitOpenError, so callers
+serve a cached or canned answer immediately instead of each waiting out the
+timeout. After `open_seconds` the breaker goes HALF-OPEN and lets up to
+`half_open_probes` calls through: a probe that succeeds closes the breaker
+(with a fresh window), one that fails opens it again. Nobody has to reset
+it by hand.
+
+Metrics:
+  ai_breaker.state                       gauge: 0 closed, 1 half-open, 2 open
+  ai_breaker.opened / ai_breaker.closed  counters, state changes
+  ai_breaker.rejected                    counter, calls refused while open
+"""
+import math
+import time
+from collections import deque
+from typing import Callable, Deque, Optional, Tuple
+
+from . import metrics
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+_STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """The breaker refused the call; the provider is considered down for `retry_after` seconds."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"AI service is unavailable; retry in {math.ceil(retry_after)}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        min_calls: int = 5,
+        window_seconds: float = 30.0,
+        slow_call_seconds: float = 10.0,
+        open_seconds: float = 15.0,
+        half_open_probes: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.clock = clock
+        self.state = CLOSED
+        self._outcomes: Deque[Tuple[float, bool]] = deque()  # (finished at, failed)
+        self._opened_at = 0.0
+        self._probes = 0
+        metrics.set_gauge("ai_breaker.state", _STATE_GAUGE[CLOSED])
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker will let a probe through."""
+        if self.state == OPEN:
+            return max(0.0, self._opened_at + self.open_seconds - self.clock())
+        if self.state == HALF_OPEN:
+            return self.open_seconds
+        return 0.0
+
+    def acquire(self) -> bool:
+        """
+        Ask to make a call. Raises CircuitOpenError if the call must not be
+        made; otherwise returns whether it is a half-open probe, which the
+        caller hands back to `record`.
+        """
+        if self.state == OPEN and self.clock() >= self._opened_at + self.open_seconds:
+            self._set_state(HALF_OPEN)
+            self._probes = 0
+        if self.state == CLOSED:
+            return False
+        if self.state == HALF_OPEN and self._probes < self.half_open_probes:
+            self._probes += 1
+            return True
+        metrics.inc("ai_breaker.rejected")
+        raise CircuitOpenError(max(self.retry_after(), 1.0))
+
+    def record(self, probe: bool, ok: Optional[bool], latency: float = 0.0) -> None:
+        """
+        Report how an acquired call ended: `ok` True or False, or None when it
+        ended without saying anything about the provider (cancelled, shed
+        before it was sent, rejected as a bad request).
+        """
+        failed = ok is False or (ok is True and latency >= self.slow_call_seconds)
+        if probe:
+            if self.state != HALF_OPEN:
+                return
+            self._probes -= 1
+            if ok is None:
+                return
+            if failed:
+                self._open()
+            else:
+                self._outcomes.clear()
+                self._set_state(CLOSED)
+            return
+
+        if ok is None or self.state != CLOSED:
+            return  # a call from before the breaker opened says nothing new
+        now = self.clock()
+        self._outcomes.append((now, failed))
+        while self._outcomes and self._outcomes[0][0] < now - self.window_seconds:
+            self._outcomes.popleft()
+        if len(self._outcomes) >= self.min_calls:
+            failures = sum(1 for _, f in self._outcomes if f)
+            if failures / len(self._outcomes) >= self.failure_rate:
+                self._open()
+
+    def _open(self) -> None:
+        self._opened_at = self.clock()
+        self._outcomes.clear()
+        self._set_state(OPEN)
+
+    def _set_state(self, state: str) -> None:
+        if state == self.state:
+            return
+        self.state = state
+        metrics.set_gauge("ai_breaker.state", _STATE_GAUGE[state])
+        if state == OPEN:
+            metrics.inc("ai_breaker.opened")
+        elif state == CLOSED:
+            metrics.inc("ai_breaker.closed")
@@ -0,0 +1,112 @@
+"""
+Serialized lesson content responses.
+
+Lesson content never changes in place: regeneration deletes the row and
+inserts a new one. So the JSON body of `LessonContentResponse` is built
+once per row (parsing flashcards/quiz JSON, validating, serializing) and
+then reused as bytes:
+
+  - in memory, an LRU of CONTENT_CACHE_SIZE lessons;
+  - with CONTENT_CACHE_PERSIST, in the row itself (`response_json` /
+    `response_etag`), so a restarted or different worker skips the build.
+
+Each entry remembers which row it was built from (id and created_at; ids
+alone can be reused after a delete on SQLite), and a lookup reads those
+first in one indexed query on `lesson_id`, together with the stored ETag,
+which a new row does not have until it is first served. A lesson
+regenerated by another worker therefore never serves the old body, even
+though only this process's `invalidate` drops it from memory.
+
+Metrics:
+  content_cache.hits          served from memory
+  content_cache.stored_hits   served from the persisted column
+  content_cache.builds        serialized from the content row
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
+
+from ..config import get_settings
+from ..models.lesson import LessonContent
+from . import lesson_generation, metrics
+from .http_cache import etag_for
+
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class CachedContent:
+    version: Tuple[int, datetime]  # (content id, created_at) of the row it was built from
+    body: bytes
+    etag: str
+
+
+_entries: "OrderedDict[int, CachedContent]" = OrderedDict()
+
+
+def _remember(lesson_id: int, entry: CachedContent) -> None:
+    _entries[lesson_id] = entry
+    _entries.move_to_end(lesson_id)
+    while len(_entries) > settings.CONTENT_CACHE_SIZE:
+        _entries.popitem(last=False)
+
+
+async def get_content_body(db: AsyncSession, lesson_id: int) -> Optional[CachedContent]:
+    """The lesson's serialized content response, or None if it has no content."""
+    row = (await db.execute(
+        select(LessonContent.id, LessonContent.created_at, LessonContent.response_etag)
+        .where(LessonContent.lesson_id == lesson_id)
+    )).first()
+    if row is None:
+        return None
+    content_id, created_at, stored_etag = row
+
+    entry = _entries.get(lesson_id)
+    if (
+        entry is not None
+        and entry.version == (content_id, created_at)
+        and (stored_etag == entry.etag or not settings.CONTENT_CACHE_PERSIST)
+    ):
+        _entries.move_to_end(lesson_id)
+        metrics.inc("content_cache.hits")
+        return entry
+
+    content = await db.scalar(
+        select(LessonContent)
+        .where(LessonContent.id == content_id)
+        .options(undefer(LessonContent.response_json))
+    )
+    if content is None:
+        return None  # deleted between the two reads
+
+    if content.response_json and content.response_etag:
+        entry = CachedContent((content.id, content.created_at), content.response_json.encode(), content.response_etag)
+        metrics.inc("content_cache.stored_hits")
+    else:
+        body = lesson_generation.content_response(content).model_dump_json().encode()
+        entry = CachedContent((content.id, content.created_at), body, etag_for(body))
+        metrics.inc("content_cache.builds")
+        if settings.CONTENT_CACHE_PERSIST:
+            await db.execute(
+                update(LessonContent)
+                .where(LessonContent.id == content.id)
+                .values(response_json=body.decode(), response_etag=entry.etag)
+            )
+            await db.commit()
+
+    _remember(lesson_id, entry)
+    return entry
+
+
+def invalidate(lesson_id: int) -> None:
+    """Forget the lesson's body after its content was deleted or regenerated."""
+    _entries.pop(lesson_id, None)
+
+
+def clear() -> None:
+    _entries.clear()
@@ -0,0 +1,181 @@
+"""
+Rolling memory for coach conversations.
+
+The coach prompt carries a compact summary of the conversation plus the
+newest messages, instead of a fixed window of raw history. Once
+COACH_SUMMARY_EVERY_TURNS exchanges have accumulated past the summary, a
+background job folds the older ones into it and keeps the newest
+COACH_RECENT_MESSAGES verbatim. The summary row records the last message
+it covers, so each update reads only messages it has not seen yet.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from typing import List
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..models.ai_models import ChatMessage, ConversationSummary
+from .admission import BULK
+from .ai_client import get_ai_client
+from .ai_logger import log_ai_call
+from .jobs import job_handler
+from .prompt_registry import get_prompt
+from .token_budget import TokenBudget, truncate_to_tokens
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def _role_label(message: ChatMessage) -> str:
+    return "Student" if message.role == "user" else "Coach"
+
+
+def _transcript(messages: List[ChatMessage]) -> str:
+    return "".join(f"{_role_label(m)}: {m.content}\n\n" for m in messages)
+
+
+@dataclass
+class ConversationContext:
+    summary: str
+    recent: List[ChatMessage]  # messages after the summary, oldest first
+
+    def summary_due(self, new_messages: int = 0) -> bool:
+        """True once enough messages sit past the summary to fold some in."""
+        pending = len(self.recent) + new_messages
+        return pending >= settings.COACH_SUMMARY_EVERY_TURNS * 2 + settings.COACH_RECENT_MESSAGES
+
+    def render(self, budget: TokenBudget, max_tokens: int) -> str:
+        """
+        The summary plus as many of the newest messages as fit in
+        `max_tokens`, charged to `budget`.
+        """
+        allowance = TokenBudget(min(max_tokens, budget.remaining))
+        header = ""
+        if self.summary:
+            header = f"Summary of the conversation so far: {allowance.take(self.summary)}\n\n"
+            allowance.charge("Summary of the conversation so far: ")
+
+        lines: List[str] = []
+        for message in reversed(self.recent):
+            line = f"{_role_label(message)}: {message.content}\n\n"
+            if not allowance.fits(line):
+                break
+            allowance.charge(line)
+            lines.append(line)
+        lines.reverse()
+
+        text = header + "".join(lines)
+        budget.charge(text)
+        return text
+
+
+async def load_context(db: AsyncSession, user_id: int, lesson_id: int) -> ConversationContext:
+    """The stored summary and the messages that came after it."""
+    row = await db.scalar(
+        select(ConversationSummary)
+        .where(ConversationSummary.user_id == user_id, ConversationSummary.lesson_id == lesson_id)
+    )
+    through = row.summarized_through_id if row else 0
+    # More than this many pending messages means a summary is already due
+    window = settings.COACH_SUMMARY_EVERY_TURNS * 2 + settings.COACH_RECENT_MESSAGES
+    recent = list((await db.scalars(
+        select(ChatMessage)
+        .where(
+            ChatMessage.user_id == user_id,
+            ChatMessage.lesson_id == lesson_id,
+            ChatMessage.id > through,
+        )
+        .order_by(ChatMessage.id.desc())
+        .limit(window)
+    )).all())
+    recent.reverse()
+    return ConversationContext(summary=row.summary if row else "", recent=recent)
+
+
+async def update_summary(db: AsyncSession, user_id: int, lesson_id: int) -> bool:
+    """
+    Fold messages past the summary into it, keeping the newest
+    COACH_RECENT_MESSAGES verbatim. Returns False when there was nothing
+    to do (not due yet, or another worker got there first).
+    """
+    row = await db.scalar(
+        select(ConversationSummary)
+        .where(ConversationSummary.user_id == user_id, ConversationSummary.lesson_id == lesson_id)
+    )
+    previous_through = row.summarized_through_id if row else 0
+
+    pending = list((await db.scalars(
+        select(ChatMessage)
+        .where(
+            ChatMessage.user_id == user_id,
+            ChatMessage.lesson_id == lesson_id,
+            ChatMessage.id > previous_through,
+        )
+        .order_by(ChatMessage.id)
+    )).all())
+    keep = settings.COACH_RECENT_MESSAGES
+    fold = pending[:len(pending) - keep] if keep else pending
+    if len(fold) < settings.COACH_SUMMARY_EVERY_TURNS * 2:
+        await db.rollback()
+        return False
+
+    prompt_data = get_prompt("summary_v1")
+    prompt = prompt_data["template"].format(
+        previous_summary=(row.summary if row else "") or "(none yet)",
+        new_messages=_transcript(fold),
+        max_words=int(settings.COACH_SUMMARY_MAX_TOKENS * 0.6),
+    )
+    row_id = row.id if row else None
+    through_id = fold[-1].id
+    # End the read transaction: nothing stays open (or locked) while the model runs
+    await db.rollback()
+
+    start = time.monotonic()
+    try:
+        text = await get_ai_client().generate(prompt, lane=BULK)
+    except Exception as e:
+        log_ai_call("coach_summary", user_id, prompt_data["version"], int((time.monotonic() - start) * 1000), 0, False, str(e))
+        raise
+    log_ai_call("coach_summary", user_id, prompt_data["version"], int((time.monotonic() - start) * 1000), 0, True)
+
+    summary = truncate_to_tokens(text.strip(), settings.COACH_SUMMARY_MAX_TOKENS)
+    if row_id is None:
+        db.add(ConversationSummary(
+            user_id=user_id,
+            lesson_id=lesson_id,
+            summary=summary,
+            summarized_through_id=through_id,
+            messages_summarized=len(fold),
+            prompt_version=prompt_data["version"],
+        ))
+        updated = True
+    else:
+        # Only if no other worker moved the summary on since we read it
+        result = await db.execute(
+            update(ConversationSummary)
+            .where(ConversationSummary.id == row_id, ConversationSummary.summarized_through_id == previous_through)
+            .values(
+                summary=summary,
+                summarized_through_id=through_id,
+                messages_summarized=ConversationSummary.messages_summarized + len(fold),
+                prompt_version=prompt_data["version"],
+            )
+        )
+        updated = bool(result.rowcount)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent first summary inserted the row; theirs wins
+        await db.rollback()
+        return False
+    return updated
+
+
+@job_handler("coach_summary")
+async def _summary_job(session_factory, payload: dict):
+    async with session_factory() as db:
+        return {"updated": await update_summary(db, payload["user_id"], payload["lesson_id"])}
@@ -2,12 +2,16 @@ import json
 import logging
 import re
 from typing import Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from json_repair import repair_json
 
 from ..config import get_settings
 from ..models.lesson import Lesson, LessonContent
 from ..schemas.lesson import GeneratedContentSchema, FlashcardSchema, QuizQuestionSchema
+from .admission import BULK
+from .ai_client import get_ai_client
+from . import lesson_index, versions
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -112,13 +116,14 @@ Use Markdown:
 
 class GeminiService:
     def __init__(self):
-        self.api_key = None
-        self.model = None
-        logger.info("Using local mock service instead of Gemini API (Hackathon rules)")
+        self.client = get_ai_client()
     
-    def generate_content(self, lesson: Lesson) -> GeneratedContentSchema:
-        logger.info("Generating mock content internally")
-        return self._generate_mock_content(lesson)
+    async def generate_content(self, lesson: Lesson) -> GeneratedContentSchema:
+        if self.client.backend.name == "mock":
+            # Hackathon rules: full lessons come from the local template
+            logger.info("Generating mock content internally")
+            return self._generate_mock_content(lesson)
+        return await self._generate_with_gemini(lesson)
     
     def _clean_json_response(self, response_text: str) -> str:
         text = response_text.strip()
@@ -154,15 +159,14 @@ class GeminiService:
         
         return text
     
-    def _generate_with_gemini(self, lesson: Lesson) -> GeneratedContentSchema:
+    async def _generate_with_gemini(self, lesson: Lesson) -> GeneratedContentSchema:
         prompt = PROMPT_TEMPLATE.format(
             title=lesson.title,
             level=lesson.level,
             module=lesson.module
         )
         
-        response = self.model.generate_content(prompt)
-        response_text = response.text.strip()
+        response_text = (await self.client.generate(prompt, lane=BULK)).strip()
         
         logger.debug(f"Gemini response length: {len(response_text)} chars")
         
@@ -291,7 +295,7 @@ Remember: financial literacy is a skill that develops over time. Keep learning a
             quiz=quiz
         )
     
-    def save_content(self, db: Session, lesson: Lesson, content: GeneratedContentSchema) -> LessonContent:
+    async def save_content(self, db: AsyncSession, lesson: Lesson, content: GeneratedContentSchema) -> LessonContent:
         lesson_content = LessonContent(
             lesson_id=lesson.id,
             lesson_text=content.lesson_text,
@@ -299,9 +303,12 @@ Remember: financial literacy is a skill that develops over time. Keep learning a
             quiz_json=json.dumps([q.model_dump() for q in content.quiz], ensure_ascii=False)
         )
         db.add(lesson_content)
-        db.commit()
-        db.refresh(lesson_content)
+        await versions.bump_shared_version(db, versions.CATALOG)
+        await db.commit()
+        await db.refresh(lesson_content)
+        # Index now so the first coach question doesn't pay for it
+        lesson_index.index_lesson(lesson.id, lesson_content.lesson_text)
         return lesson_content
     
-    def get_content(self, db: Session, lesson_id: int) -> Optional[LessonContent]:
-        return db.query(LessonContent).filter(LessonContent.lesson_id == lesson_id).first()
+    async def get_content(self, db: AsyncSession, lesson_id: int) -> Optional[LessonContent]:
+        return await db.scalar(select(LessonContent).where(LessonContent.lesson_id == lesson_id))
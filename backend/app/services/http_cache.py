@@ -0,0 +1,43 @@
+"""
+HTTP validators: strong ETags and If-None-Match handling.
+
+Responses that carry an ETag are sent with `Cache-Control: private,
+no-cache`: the browser keeps them but revalidates every time, and gets an
+empty 304 when nothing changed.
+"""
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value names `etag` (weak comparison, as RFC 9110 asks)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag.removeprefix("W/"):
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def json_response(request: Optional[Request], body: bytes, etag: str) -> Response:
+    """The body with its ETag, or 304 if the client already has this version."""
+    if request is not None and etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL},
+    )
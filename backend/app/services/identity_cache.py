@@ -0,0 +1,86 @@
+"""
+Short-lived identity cache for `get_current_user`.
+
+Authenticated requests resolve the JWT subject to a user row on every
+call. The row barely changes, so its column values are kept in a bounded
+LRU for USER_CACHE_TTL_SECONDS; a hit skips the SELECT. Only plain column
+values are cached (never the password hash) and each hit gets its own
+detached `User`, so requests cannot leak changes into each other.
+
+Anything that updates a user row must call `invalidate_user()`.
+
+Metrics: identity_cache.hits / misses / evictions / expirations counters,
+identity_cache.hit_rate and identity_cache.size gauges.
+"""
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from ..config import get_settings
+from ..models.user import User
+from . import metrics
+
+CACHED_COLUMNS = ("id", "name", "email", "bio", "avatar_style", "created_at")
+
+
+class IdentityCache:
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._hits = 0
+        self._lookups = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _record(self, hit: bool) -> None:
+        self._lookups += 1
+        if hit:
+            self._hits += 1
+        metrics.inc("identity_cache.hits" if hit else "identity_cache.misses")
+        metrics.set_gauge("identity_cache.hit_rate", round(self._hits / self._lookups, 4))
+
+    def get(self, user_id: int) -> Optional[User]:
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] < time.monotonic():
+            del self._entries[user_id]
+            metrics.inc("identity_cache.expirations")
+            metrics.set_gauge("identity_cache.size", len(self._entries))
+            entry = None
+        self._record(entry is not None)
+        if entry is None:
+            return None
+        self._entries.move_to_end(user_id)
+        return User(**entry[1])
+
+    def put(self, user: User) -> None:
+        values = {column: getattr(user, column) for column in CACHED_COLUMNS}
+        self._entries[user.id] = (time.monotonic() + self.ttl_seconds, values)
+        self._entries.move_to_end(user.id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            metrics.inc("identity_cache.evictions")
+        metrics.set_gauge("identity_cache.size", len(self._entries))
+
+    def invalidate(self, user_id: int) -> None:
+        if self._entries.pop(user_id, None) is not None:
+            metrics.set_gauge("identity_cache.size", len(self._entries))
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._hits = 0
+        self._lookups = 0
+        metrics.set_gauge("identity_cache.size", 0)
+
+
+@lru_cache()
+def get_identity_cache() -> IdentityCache:
+    settings = get_settings()
+    return IdentityCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL_SECONDS)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drop a user's cached identity after their row changed."""
+    get_identity_cache().invalidate(user_id)
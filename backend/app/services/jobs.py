@@ -0,0 +1,404 @@
+"""
+Durable background jobs without an external broker.
+
+Jobs are rows in the `jobs` table; every uvicorn worker runs a small
+asyncio worker pool (JOB_WORKERS tasks) that claims them. Claiming is an
+UPDATE ... WHERE status = 'queued' on one row, so the database decides
+which worker gets a job. Higher `priority` runs first, then FIFO.
+
+A claimed job holds a lease (`locked_until`). A job whose worker died
+mid-run is claimed again once its lease expires; the lost run counts as a
+failed attempt, so a job that keeps killing its worker is marked failed
+at `max_attempts` instead of being reclaimed forever. Failures are retried
+with exponential backoff (JOB_RETRY_BASE_SECONDS * 2^(attempt-1)) up to
+`max_attempts`. ValueError and PermanentJobError fail at once: they mean
+bad input, and retrying will not help.
+
+Every JOB_SWEEP_SECONDS each pool runs `sweep`: it fails the expired jobs
+that have no attempts left and deletes finished jobs older than
+JOB_RETENTION_DAYS, so the table only holds recent history.
+
+Handlers are registered with `@job_handler(kind)` and receive the
+session factory plus the decoded payload. Their return value must be
+JSON-serialisable; it becomes the job's result.
+"""
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..models.job import Job
+from ..schemas.job import JobResponse
+from . import metrics
+from .leases import WORKER_ID
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 10
+PRIORITY_BACKGROUND = 0
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+JobHandler = Callable[[Callable[[], AsyncSession], dict], Awaitable[Any]]
+
+_handlers: Dict[str, JobHandler] = {}
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler for failures that must not be retried."""
+
+
+def job_handler(kind: str):
+    """Register the coroutine that runs jobs of `kind`."""
+    def decorator(func: JobHandler) -> JobHandler:
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+def job_response(job: Job) -> JobResponse:
+    return JobResponse(
+        id=job.id,
+        kind=job.kind,
+        status=job.status,
+        attempts=job.attempts,
+        result=json.loads(job.result_json) if job.result_json else None,
+        error=job.error,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+    )
+
+
+async def enqueue(
+    db: AsyncSession,
+    kind: str,
+    payload: dict,
+    user_id: Optional[int] = None,
+    priority: int = PRIORITY_INTERACTIVE,
+    max_attempts: Optional[int] = None,
+) -> Job:
+    """Insert a queued job, commit, and wake the local workers."""
+    job = Job(
+        kind=kind,
+        payload_json=json.dumps(payload, sort_keys=True),
+        user_id=user_id,
+        status="queued",
+        priority=priority,
+        attempts=0,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_after=datetime.utcnow(),
+    )
+    db.add(job)
+    await db.commit()
+    metrics.inc("jobs.enqueued")
+    if _pool is not None:
+        _pool.wake()
+    return job
+
+
+async def enqueue_once(
+    db: AsyncSession,
+    kind: str,
+    payload: dict,
+    user_id: Optional[int] = None,
+    priority: int = PRIORITY_INTERACTIVE,
+) -> Job:
+    """
+    Like `enqueue`, but return the pending (queued or running) job with the
+    same kind and payload if there is one, so repeated triggers don't pile up.
+    """
+    pending = await db.scalar(
+        select(Job)
+        .where(
+            Job.kind == kind,
+            Job.payload_json == json.dumps(payload, sort_keys=True),
+            Job.status.in_(("queued", "running")),
+        )
+        .limit(1)
+    )
+    if pending is not None:
+        metrics.inc("jobs.deduplicated")
+        return pending
+    return await enqueue(db, kind, payload, user_id=user_id, priority=priority)
+
+
+# ─── Waiting on a job ────────────────────────────────────────
+
+# Local watchers per job id, set when this process changes the job.
+# Jobs finished by another worker are noticed by the periodic re-read.
+_watchers: Dict[int, Set[asyncio.Event]] = {}
+
+WATCH_POLL_SECONDS = 0.5
+
+
+def _notify(job_id: int) -> None:
+    for event in _watchers.get(job_id, ()):
+        event.set()
+
+
+async def wait_for_job(
+    db: AsyncSession,
+    job_id: int,
+    timeout: float,
+    until: Callable[[Job], bool] = lambda job: job.status in TERMINAL_STATUSES,
+) -> Optional[Job]:
+    """
+    Re-read the job until `until(job)` holds or `timeout` passes, and
+    return the last version read (None if the row is gone).
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    event = asyncio.Event()
+    _watchers.setdefault(job_id, set()).add(event)
+    try:
+        while True:
+            await db.rollback()  # end the read transaction so we see other commits
+            job = await db.get(Job, job_id, populate_existing=True)
+            remaining = deadline - loop.time()
+            if job is None or until(job) or remaining <= 0:
+                return job
+            event.clear()
+            try:
+                await asyncio.wait_for(event.wait(), min(remaining, WATCH_POLL_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        watchers = _watchers.get(job_id)
+        if watchers is not None:
+            watchers.discard(event)
+            if not watchers:
+                del _watchers[job_id]
+
+
+# ─── Maintenance ─────────────────────────────────────────────
+
+async def sweep(db: AsyncSession, retention_days: float, now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Fail running jobs whose lease expired on their last attempt and delete
+    terminal jobs that finished more than `retention_days` ago. Commits and
+    returns the number of rows each step touched.
+    """
+    now = now or datetime.utcnow()
+    expired = await db.execute(
+        update(Job)
+        .where(Job.status == "running", Job.locked_until < now, Job.attempts >= Job.max_attempts)
+        .values(
+            status="failed",
+            error="Lease expired on the last attempt (worker died or the job hung)",
+            locked_by=None,
+            locked_until=None,
+            finished_at=now,
+        )
+    )
+    deleted = await db.execute(
+        delete(Job).where(
+            Job.status.in_(TERMINAL_STATUSES),
+            Job.finished_at < now - timedelta(days=retention_days),
+        )
+    )
+    await db.commit()
+    if expired.rowcount:
+        logger.error(f"Failed {expired.rowcount} job(s) whose lease expired on the last attempt")
+        metrics.inc("jobs.failed", expired.rowcount)
+        metrics.inc("jobs.lease_expired", expired.rowcount)
+    if deleted.rowcount:
+        metrics.inc("jobs.deleted", deleted.rowcount)
+    return {"expired": expired.rowcount, "deleted": deleted.rowcount}
+
+
+# ─── Worker pool ─────────────────────────────────────────────
+
+class JobWorkerPool:
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        concurrency: int,
+        poll_seconds: float = 1.0,
+        lease_seconds: float = 300.0,
+        retry_base_seconds: float = 2.0,
+        sweep_seconds: float = 60.0,
+        retention_days: float = 7.0,
+    ):
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.retry_base_seconds = retry_base_seconds
+        self.sweep_seconds = sweep_seconds
+        self.retention_days = retention_days
+        self._tasks: List[asyncio.Task] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._busy = 0
+
+    def start(self) -> None:
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._sweep_periodically()))
+        logger.info(f"Started {self.concurrency} job workers ({WORKER_ID})")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def wake(self) -> None:
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                job = await self._claim()
+            except Exception:
+                logger.exception("Job claim failed")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                continue
+            await self._execute(job)
+
+    async def _sweep_periodically(self) -> None:
+        while True:
+            try:
+                async with self.session_factory() as db:
+                    await sweep(db, self.retention_days)
+            except Exception:
+                logger.exception("Job sweep failed")
+            await asyncio.sleep(self.sweep_seconds)
+
+    def _claimable(self, now: datetime):
+        return or_(
+            and_(Job.status == "queued", Job.run_after <= now),
+            # Running, but the lease ran out (worker died): take it over while
+            # attempts remain; `sweep` fails the rest
+            and_(Job.status == "running", Job.locked_until < now, Job.attempts < Job.max_attempts),
+        )
+
+    async def _claim(self) -> Optional[Job]:
+        async with self.session_factory() as db:
+            while True:
+                now = datetime.utcnow()
+                job_id = await db.scalar(
+                    select(Job.id)
+                    .where(self._claimable(now))
+                    .order_by(Job.priority.desc(), Job.id)
+                    .limit(1)
+                )
+                if job_id is None:
+                    return None
+                claimed = await db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, self._claimable(now))
+                    .values(
+                        status="running",
+                        attempts=Job.attempts + 1,
+                        locked_by=WORKER_ID,
+                        locked_until=now + timedelta(seconds=self.lease_seconds),
+                    )
+                )
+                await db.commit()
+                if claimed.rowcount:
+                    _notify(job_id)
+                    return await db.get(Job, job_id)
+                # Another worker won this one; try the next
+
+    async def _execute(self, job: Job) -> None:
+        self._busy += 1
+        metrics.set_gauge("jobs.busy_workers", self._busy)
+        start = time.perf_counter()
+        try:
+            handler = _handlers.get(job.kind)
+            if handler is None:
+                raise PermanentJobError(f"No handler for job kind '{job.kind}'")
+            result = await asyncio.wait_for(
+                handler(self.session_factory, json.loads(job.payload_json)),
+                self.lease_seconds,
+            )
+        except asyncio.CancelledError:
+            # Shutting down: the lease expires and another worker retries it
+            raise
+        except Exception as e:
+            await self._failed(job, e)
+        else:
+            await self._succeeded(job, result)
+        finally:
+            self._busy -= 1
+            metrics.set_gauge("jobs.busy_workers", self._busy)
+            metrics.observe(f"jobs.{job.kind}.run_ms", (time.perf_counter() - start) * 1000)
+
+    async def _update(self, job: Job, **values) -> None:
+        async with self.session_factory() as db:
+            await db.execute(
+                update(Job)
+                .where(Job.id == job.id, Job.locked_by == WORKER_ID)
+                .values(locked_by=None, locked_until=None, **values)
+            )
+            await db.commit()
+        _notify(job.id)
+
+    async def _succeeded(self, job: Job, result: Any) -> None:
+        await self._update(
+            job,
+            status="succeeded",
+            result_json=json.dumps(result, default=str),
+            error=None,
+            finished_at=datetime.utcnow(),
+        )
+        metrics.inc("jobs.succeeded")
+
+    async def _failed(self, job: Job, error: Exception) -> None:
+        permanent = isinstance(error, (PermanentJobError, ValueError))
+        if permanent or job.attempts >= job.max_attempts:
+            logger.error(f"Job {job.id} ({job.kind}) failed after {job.attempts} attempt(s): {error}")
+            await self._update(job, status="failed", error=str(error), finished_at=datetime.utcnow())
+            metrics.inc("jobs.failed")
+            return
+
+        delay = self.retry_base_seconds * (2 ** (job.attempts - 1))
+        logger.warning(f"Job {job.id} ({job.kind}) attempt {job.attempts} failed, retrying in {delay:.0f}s: {error}")
+        await self._update(
+            job,
+            status="queued",
+            error=str(error),
+            run_after=datetime.utcnow() + timedelta(seconds=delay),
+        )
+        metrics.inc("jobs.retried")
+
+
+_pool: Optional[JobWorkerPool] = None
+
+
+def start_workers(session_factory: Callable[[], AsyncSession]) -> None:
+    """Start this process's job workers (called on app startup)."""
+    global _pool
+    if _pool is not None or settings.JOB_WORKERS <= 0:
+        return
+    _pool = JobWorkerPool(
+        session_factory,
+        concurrency=settings.JOB_WORKERS,
+        poll_seconds=settings.JOB_POLL_SECONDS,
+        lease_seconds=settings.JOB_LEASE_SECONDS,
+        retry_base_seconds=settings.JOB_RETRY_BASE_SECONDS,
+        sweep_seconds=settings.JOB_SWEEP_SECONDS,
+        retention_days=settings.JOB_RETENTION_DAYS,
+    )
+    _pool.start()
+
+
+async def stop_workers() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.stop()
+        _pool = None
@@ -0,0 +1,233 @@
+"""
+In-memory XP leaderboards.
+
+Each board is a RankIndex: a SortedList of (-xp, user_id) keys plus the
+current XP per user, so an update, a user's rank and the page at any
+offset each cost O(log n) (plus the page length), and no view ever sorts
+`user_stats`.
+
+  global   total XP (user_stats.total_xp)
+  weekly   XP this ISO week (xp_weekly), emptied when the week turns
+  level    the global board cut to one title band of TITLE_THRESHOLDS; the
+           band is a contiguous run of the global order, found by bisection
+
+The boards are loaded from the database at startup and follow the
+`xp_events` ledger afterwards: before serving a view, `refresh` applies
+the events past the last id seen, so awards made by any worker show up
+at the next read for one primary-key range query. Every
+LEADERBOARD_REBUILD_SECONDS the boards are reloaded in full, which heals
+anything the ledger tail could miss (e.g. a transaction that committed
+an older event id late).
+"""
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from sortedcontainers import SortedList
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..models.progress import TITLE_THRESHOLDS, UserStats
+from ..models.user import User
+from ..models.xp import XpEvent, XpWeekly
+from . import metrics
+from .xp import week_of
+
+logger = logging.getLogger(__name__)
+
+GLOBAL = "global"
+WEEKLY = "weekly"
+LEVEL = "level"
+
+
+class RankIndex:
+    """Users ordered by XP, highest first; ties go to the lower user id."""
+
+    def __init__(self):
+        self._order = SortedList()
+        self._xp: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._xp)
+
+    def set(self, user_id: int, xp: int) -> None:
+        old = self._xp.get(user_id)
+        if old is not None:
+            self._order.remove((-old, user_id))
+        self._xp[user_id] = xp
+        self._order.add((-xp, user_id))
+
+    def add(self, user_id: int, amount: int) -> None:
+        self.set(user_id, self._xp.get(user_id, 0) + amount)
+
+    def xp(self, user_id: int) -> Optional[int]:
+        return self._xp.get(user_id)
+
+    def position(self, user_id: int) -> Optional[int]:
+        """0-based position of the user, or None if they are not on the board."""
+        xp = self._xp.get(user_id)
+        return None if xp is None else self._order.index((-xp, user_id))
+
+    def count_above(self, xp: int) -> int:
+        """Number of users with more than `xp`."""
+        return self._order.bisect_left((-xp,))
+
+    def slice(self, start: int, stop: int) -> List[Tuple[int, int]]:
+        """(user_id, xp) for positions [start, stop)."""
+        return [(user_id, -neg_xp) for neg_xp, user_id in self._order.islice(start, stop)]
+
+
+def level_band(level: int) -> Tuple[int, Optional[int]]:
+    """XP range [low, high) of a title band, 1-based; high is None for the top band."""
+    low = TITLE_THRESHOLDS[level - 1][0]
+    high = TITLE_THRESHOLDS[level][0] if level < len(TITLE_THRESHOLDS) else None
+    return low, high
+
+
+def level_for_xp(xp: int) -> int:
+    level = 1
+    for i, (threshold, _) in enumerate(TITLE_THRESHOLDS, start=1):
+        if xp >= threshold:
+            level = i
+    return level
+
+
+@dataclass
+class LeaderboardEntry:
+    rank: int
+    user_id: int
+    name: str
+    xp: int
+
+
+@dataclass
+class LeaderboardPage:
+    board: str
+    level: Optional[int]
+    week: Optional[date]
+    total: int  # users on the board
+    entries: List[LeaderboardEntry] = field(default_factory=list)
+    my_rank: Optional[int] = None
+    my_xp: Optional[int] = None
+
+
+class Leaderboards:
+    def __init__(self, rebuild_seconds: float):
+        self.rebuild_seconds = rebuild_seconds
+        self.clear()
+
+    def clear(self) -> None:
+        self.total = RankIndex()
+        self.weekly = RankIndex()
+        self.names: Dict[int, str] = {}
+        self.week = None
+        self.last_event_id = 0
+        self.built_at: Optional[float] = None
+
+    async def rebuild(self, db: AsyncSession) -> None:
+        """Reload every board from the database."""
+        start = time.perf_counter()
+        week = week_of(datetime.utcnow().date())
+        stats = await db.execute(
+            select(UserStats.user_id, UserStats.total_xp, User.name).join(User, User.id == UserStats.user_id)
+        )
+        weekly = await db.execute(select(XpWeekly.user_id, XpWeekly.xp).where(XpWeekly.week == week))
+        # Read last: an award landing between these reads is left out until
+        # the next rebuild rather than counted twice
+        last_event_id = await db.scalar(select(func.max(XpEvent.id))) or 0
+
+        self.clear()
+        for user_id, total_xp, name in stats:
+            self.total.set(user_id, total_xp or 0)
+            self.names[user_id] = name
+        for user_id, xp in weekly:
+            self.weekly.set(user_id, xp)
+        self.week = week
+        self.last_event_id = last_event_id
+        self.built_at = time.monotonic()
+        metrics.inc("leaderboard.rebuilds")
+        metrics.set_gauge("leaderboard.users", len(self.total))
+        metrics.observe("leaderboard.rebuild_ms", (time.perf_counter() - start) * 1000)
+        logger.info(f"Leaderboards loaded: {len(self.total)} users")
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """Bring the boards up to date with the ledger (or reload them when due)."""
+        if (
+            self.built_at is None
+            or time.monotonic() - self.built_at >= self.rebuild_seconds
+            or week_of(datetime.utcnow().date()) != self.week
+        ):
+            await self.rebuild(db)
+            return
+        events = await db.execute(
+            select(XpEvent.id, XpEvent.user_id, XpEvent.amount, XpEvent.created_at, User.name)
+            .join(User, User.id == XpEvent.user_id)
+            .where(XpEvent.id > self.last_event_id)
+            .order_by(XpEvent.id)
+        )
+        applied = 0
+        for event_id, user_id, amount, created_at, name in events:
+            # Another request may have applied these while this one waited on the query
+            if event_id <= self.last_event_id:
+                continue
+            self.total.add(user_id, amount)
+            if week_of(created_at.date()) == self.week:
+                self.weekly.add(user_id, amount)
+            self.names[user_id] = name
+            self.last_event_id = event_id
+            applied += 1
+        if applied:
+            metrics.inc("leaderboard.events_applied", applied)
+            metrics.set_gauge("leaderboard.users", len(self.total))
+
+    def page(
+        self,
+        board: str,
+        user_id: int,
+        level: Optional[int] = None,
+        offset: int = 0,
+        limit: int = 20,
+        around_me: bool = False,
+    ) -> LeaderboardPage:
+        """
+        One page of `board` (GLOBAL, WEEKLY or LEVEL) plus the user's own
+        rank. LEVEL defaults to the user's own title band; `around_me`
+        centres the page on the user instead of starting at `offset`.
+        """
+        index = self.weekly if board == WEEKLY else self.total
+        start, stop = 0, len(index)
+        if board == LEVEL:
+            if level is None:
+                level = level_for_xp(self.total.xp(user_id) or 0)
+            low, high = level_band(level)
+            start = 0 if high is None else index.count_above(high - 1)
+            stop = index.count_above(low - 1)
+
+        result = LeaderboardPage(
+            board=board,
+            level=level if board == LEVEL else None,
+            week=self.week if board == WEEKLY else None,
+            total=stop - start,
+        )
+        position = index.position(user_id)
+        if position is not None and start <= position < stop:
+            result.my_rank = position - start + 1
+            result.my_xp = index.xp(user_id)
+            if around_me:
+                offset = max(0, result.my_rank - 1 - limit // 2)
+
+        first = start + offset
+        for i, (entry_user, xp) in enumerate(index.slice(first, min(first + limit, stop))):
+            result.entries.append(LeaderboardEntry(
+                rank=offset + i + 1, user_id=entry_user, name=self.names.get(entry_user, ""), xp=xp,
+            ))
+        return result
+
+
+@lru_cache()
+def get_leaderboards() -> Leaderboards:
+    return Leaderboards(get_settings().LEADERBOARD_REBUILD_SECONDS)
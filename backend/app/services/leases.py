@@ -0,0 +1,48 @@
+"""
+DB-backed leases: a row in `leases` marks `key` as being worked on by one
+worker until `expires_at`. Works across uvicorn workers and hosts because
+the database arbitrates; an expired lease can be taken over, so a worker
+that dies mid-task only blocks the key for the lease TTL.
+"""
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.lease import Lease
+
+# Identifies this process as a lease owner
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+async def acquire_lease(db: AsyncSession, key: str, ttl_seconds: float, owner: str = WORKER_ID) -> bool:
+    """Take (or renew) the lease on `key`. Commits. Returns False if someone else holds it."""
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl_seconds)
+
+    taken = await db.execute(
+        update(Lease)
+        .where(Lease.key == key, or_(Lease.expires_at < now, Lease.owner == owner))
+        .values(owner=owner, expires_at=expires_at)
+    )
+    if taken.rowcount:
+        await db.commit()
+        return True
+
+    db.add(Lease(key=key, owner=owner, expires_at=expires_at))
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return False
+    return True
+
+
+async def release_lease(db: AsyncSession, key: str, owner: str = WORKER_ID) -> None:
+    """Drop the lease if we still own it. Commits."""
+    await db.execute(delete(Lease).where(Lease.key == key, Lease.owner == owner))
+    await db.commit()
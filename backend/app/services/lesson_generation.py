@@ -0,0 +1,109 @@
+"""
+Deduplicated lesson content generation.
+
+When a lesson unlocks, many users request its content at once. Every
+`generate` / `regenerate` call for a lesson goes through one in-process
+single flight keyed by lesson id, so a worker makes at most one model
+call per lesson at a time; across workers a DB lease on
+`lesson_content:<id>` does the same. A caller that had to wait for
+another worker's lease returns that worker's result instead of
+generating again.
+
+The work runs in its own session (from `session_factory`) because it
+outlives any single request that joined it.
+"""
+import asyncio
+import json
+import logging
+from typing import Callable
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..models.lesson import Lesson, LessonContent
+from ..schemas.lesson import LessonContentResponse, FlashcardSchema, QuizQuestionSchema
+from . import content_cache, metrics, versions
+from .gemini import GeminiService
+from .jobs import job_handler
+from .leases import acquire_lease, release_lease
+from .single_flight import SingleFlight
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+LEASE_POLL_SECONDS = 0.25
+
+_flight = SingleFlight("lesson_generation")
+
+
+def content_response(content: LessonContent) -> LessonContentResponse:
+    return LessonContentResponse(
+        lesson_id=content.lesson_id,
+        lesson_text=content.lesson_text,
+        flashcards=[FlashcardSchema(**fc) for fc in json.loads(content.flashcards_json)],
+        quiz=[QuizQuestionSchema(**q) for q in json.loads(content.quiz_json)],
+        created_at=content.created_at,
+    )
+
+
+async def generate_lesson_content(
+    session_factory: Callable[[], AsyncSession],
+    lesson_id: int,
+    replace: bool = False,
+) -> LessonContentResponse:
+    """
+    Generate and store content for a lesson, or join a generation already
+    running. With `replace`, existing content is regenerated.
+    """
+    return await _flight.do(lesson_id, lambda: _generate(session_factory, lesson_id, replace))
+
+
+def in_flight(lesson_id: int) -> bool:
+    """Whether this process is generating the lesson's content right now."""
+    return _flight.in_flight(lesson_id)
+
+
+@job_handler("lesson_content")
+async def _lesson_content_job(session_factory, payload: dict) -> dict:
+    response = await generate_lesson_content(session_factory, payload["lesson_id"], replace=payload.get("replace", False))
+    return response.model_dump(mode="json")
+
+
+async def _generate(session_factory, lesson_id: int, replace: bool) -> LessonContentResponse:
+    key = f"lesson_content:{lesson_id}"
+    service = GeminiService()
+
+    async with session_factory() as db:
+        waited = False
+        while not await acquire_lease(db, key, settings.GENERATION_LEASE_SECONDS):
+            if not waited:
+                metrics.inc("lesson_generation.lease_waits")
+                waited = True
+            await asyncio.sleep(LEASE_POLL_SECONDS)
+
+        try:
+            existing = await service.get_content(db, lesson_id)
+            # Whoever held the lease before us already (re)generated it
+            if existing and (waited or not replace):
+                return content_response(existing)
+            if existing:
+                await db.delete(existing)
+                await versions.bump_shared_version(db, versions.CATALOG)
+                await db.commit()
+                content_cache.invalidate(lesson_id)
+
+            lesson = await db.get(Lesson, lesson_id)
+            generated = await service.generate_content(lesson)
+            metrics.inc("lesson_generation.generated")
+            try:
+                content = await service.save_content(db, lesson, generated)
+            except IntegrityError:
+                # Someone without the lease (e.g. after it expired) got there first
+                await db.rollback()
+                logger.warning(f"Lesson {lesson_id} content already saved by another worker")
+                content = await service.get_content(db, lesson_id)
+            return content_response(content)
+        finally:
+            await db.rollback()
+            await release_lease(db, key)
@@ -0,0 +1,188 @@
+"""
+Section retrieval for coach context.
+
+Lesson text is split into sections at its Markdown headings. A level-2
+heading (`##`) starts a section; a level-3 heading (`###`) starts a
+sub-section titled "Parent › Child", because generated lessons put the
+whole lesson under one `##` title. Each lesson gets a small BM25 index
+over its sections, so the coach prompt carries the few sections that
+match the student's question instead of the start of the lesson.
+
+Indexing is incremental and in-process:
+  - each section's term counts are cached by the hash of its text, so
+    regenerated content only re-analyses the sections that changed;
+  - each lesson's index is cached against the hash of the full text and
+    rebuilt only when that changes.
+Content is indexed when it is saved (`index_lesson`), and any worker
+that has not seen it yet indexes it lazily on first retrieval.
+"""
+import hashlib
+import math
+import re
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from . import metrics
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Crude stemming: compare words by their first letters, which folds most
+# English suffixes and Russian case endings ("бюджета" -> "бюджет")
+STEM_LENGTH = 6
+SECTION_CACHE_SIZE = 8192
+LESSON_CACHE_SIZE = 512
+
+_HEADING = re.compile(r"^(#{2,3})\s+(.*?)\s*#*\s*$")
+_WORD = re.compile(r"\w+")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from how i if in into is it its me my no not of on or so
+that the their then there these this to was what when where which who why will with you your
+и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по только ее мне было
+вот от меня еще нет о из ему теперь когда даже ну ли если уже или ни быть был него до вас нибудь
+это как мой моя мои что чем где кто зачем почему
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        word[:STEM_LENGTH]
+        for word in _WORD.findall(text.lower())
+        if len(word) > 1 and word not in STOPWORDS and not word.isdigit()
+    ]
+
+
+@dataclass(frozen=True)
+class Section:
+    position: int
+    heading: str
+    body: str
+
+    @property
+    def text(self) -> str:
+        return f"{self.heading}\n{self.body}" if self.heading else self.body
+
+
+def split_sections(lesson_text: str) -> List[Section]:
+    """Split Markdown at `##` / `###` headings; text before the first heading is its own section."""
+    sections: List[Tuple[str, List[str]]] = [("", [])]
+    parent = ""
+    for line in lesson_text.splitlines():
+        match = _HEADING.match(line)
+        if match:
+            level, title = match.groups()
+            if len(level) == 2:
+                parent = title
+                heading = title
+            else:
+                heading = f"{parent} › {title}" if parent else title
+            sections.append((heading, []))
+        else:
+            sections[-1][1].append(line)
+
+    result = []
+    for heading, lines in sections:
+        body = "\n".join(lines).strip()
+        if body or heading:
+            result.append(Section(position=len(result), heading=heading, body=body))
+    return result
+
+
+# ─── Incremental analysis ───────────────────────────────────
+
+_section_terms: "OrderedDict[str, Counter]" = OrderedDict()
+
+
+def _terms(section: Section) -> Counter:
+    """Term counts for a section, reused across re-indexing while its text is unchanged."""
+    key = hashlib.sha1(section.text.encode()).hexdigest()
+    terms = _section_terms.get(key)
+    if terms is not None:
+        _section_terms.move_to_end(key)
+        metrics.inc("lesson_index.sections_reused")
+        return terms
+    # Headings say what a section is about: count them twice
+    terms = Counter(tokenize(section.body) + tokenize(section.heading) * 2)
+    _section_terms[key] = terms
+    metrics.inc("lesson_index.sections_analyzed")
+    if len(_section_terms) > SECTION_CACHE_SIZE:
+        _section_terms.popitem(last=False)
+    return terms
+
+
+class LessonIndex:
+    """BM25 over one lesson's sections."""
+
+    def __init__(self, sections: List[Section]):
+        self.sections = sections
+        self.terms = [_terms(section) for section in sections]
+        self.lengths = [sum(terms.values()) for terms in self.terms]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        document_frequency: Counter = Counter()
+        for terms in self.terms:
+            document_frequency.update(terms.keys())
+        n = len(sections)
+        self.idf: Dict[str, float] = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+
+    def scores(self, query: str) -> List[float]:
+        query_terms = set(tokenize(query))
+        scores = []
+        for terms, length in zip(self.terms, self.lengths):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / self.avg_length) if self.avg_length else BM25_K1
+            score = 0.0
+            for term in query_terms:
+                tf = terms.get(term)
+                if tf:
+                    score += self.idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+            scores.append(score)
+        return scores
+
+    def search(self, query: str, k: int) -> List[Section]:
+        """
+        The `k` best-matching sections, best first. A question that matches
+        nothing (a greeting, say) gets the opening sections instead.
+        """
+        scores = self.scores(query)
+        ranked = sorted(
+            (i for i, score in enumerate(scores) if score > 0),
+            key=lambda i: (-scores[i], i),
+        )
+        if not ranked:
+            metrics.inc("lesson_index.no_match")
+            ranked = list(range(len(self.sections)))
+        return [self.sections[i] for i in ranked[:k]]
+
+
+# ─── Per-lesson cache ───────────────────────────────────────
+
+_indexes: "OrderedDict[int, Tuple[str, LessonIndex]]" = OrderedDict()
+
+
+def index_lesson(lesson_id: int, lesson_text: str) -> LessonIndex:
+    """The index for this version of the lesson text, built only if the text changed."""
+    text_hash = hashlib.sha1(lesson_text.encode()).hexdigest()
+    cached = _indexes.get(lesson_id)
+    if cached is not None and cached[0] == text_hash:
+        _indexes.move_to_end(lesson_id)
+        return cached[1]
+
+    index = LessonIndex(split_sections(lesson_text))
+    _indexes[lesson_id] = (text_hash, index)
+    _indexes.move_to_end(lesson_id)
+    metrics.inc("lesson_index.builds")
+    if len(_indexes) > LESSON_CACHE_SIZE:
+        _indexes.popitem(last=False)
+    return index
+
+
+def relevant_sections(lesson_id: int, lesson_text: str, query: str, k: int) -> List[Section]:
+    return index_lesson(lesson_id, lesson_text).search(query, k)
+
+
+def reset() -> None:
+    _section_terms.clear()
+    _indexes.clear()
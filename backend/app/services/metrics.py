@@ -0,0 +1,91 @@
+"""
+In-process metrics registry: counters, gauges and latency histograms.
+
+Everything lives in module-level dicts of the worker process and is
+served as JSON by `GET /metrics`. Histograms keep a bounded window of
+recent samples for percentiles plus running count / sum / max.
+"""
+from collections import deque
+from typing import Deque, Dict
+
+HISTOGRAM_WINDOW = 1024
+
+
+class Histogram:
+    """Running totals plus the last HISTOGRAM_WINDOW samples."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: Deque[float] = deque(maxlen=HISTOGRAM_WINDOW)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.samples.append(value)
+
+    def percentile(self, pct: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 2) if self.count else 0.0,
+            "p50": round(self.percentile(50), 2),
+            "p95": round(self.percentile(95), 2),
+            "p99": round(self.percentile(99), 2),
+            "max": round(self.max, 2),
+        }
+
+
+_counters: Dict[str, int] = {}
+_gauges: Dict[str, float] = {}
+_histograms: Dict[str, Histogram] = {}
+
+
+def inc(name: str, amount: int = 1) -> None:
+    _counters[name] = _counters.get(name, 0) + amount
+
+
+def set_gauge(name: str, value: float) -> None:
+    _gauges[name] = value
+
+
+def observe(name: str, value: float) -> None:
+    histogram = _histograms.get(name)
+    if histogram is None:
+        histogram = _histograms[name] = Histogram()
+    histogram.observe(value)
+
+
+def get_counter(name: str) -> int:
+    return _counters.get(name, 0)
+
+
+def get_gauge(name: str) -> float:
+    return _gauges.get(name, 0)
+
+
+def get_histogram(name: str) -> Histogram:
+    return _histograms.get(name) or Histogram()
+
+
+def snapshot() -> dict:
+    return {
+        "counters": dict(sorted(_counters.items())),
+        "gauges": dict(sorted(_gauges.items())),
+        "histograms": {name: h.snapshot() for name, h in sorted(_histograms.items())},
+    }
+
+
+def reset() -> None:
+    """Clear every metric (tests)."""
+    _counters.clear()
+    _gauges.clear()
+    _histograms.clear()
@@ -0,0 +1,81 @@
+"""
+Bounded executor for password hashing / verification.
+
+bcrypt costs a few hundred milliseconds of CPU per call. Running it on
+the event loop freezes every in-flight request, so signup and login hand
+it to a small dedicated thread pool instead (the bcrypt C extension
+releases the GIL while hashing, so threads run in parallel).
+
+The pool admits at most `workers + queue_limit` calls at once; anything
+beyond that is rejected immediately with `PasswordPoolSaturated` rather
+than piling up behind a login burst. Metrics:
+
+  password_pool.queue_depth   gauge, calls waiting for a worker
+  password_pool.in_flight     gauge, calls running or waiting
+  password_pool.rejected      counter, fast rejects
+  password_pool.wait_ms       histogram, time spent queued
+  password_pool.<op>_ms       histogram, queue + work time per operation
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, TypeVar
+
+from ..config import get_settings
+from . import metrics
+
+T = TypeVar("T")
+
+
+class PasswordPoolSaturated(Exception):
+    """Raised when the password pool's queue is full."""
+
+
+class PasswordPool:
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+        # Only touched from the event loop thread
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self._in_flight - self.workers)
+
+    def _publish(self) -> None:
+        metrics.set_gauge("password_pool.in_flight", self._in_flight)
+        metrics.set_gauge("password_pool.queue_depth", self.queue_depth)
+
+    async def run(self, op: str, fn: Callable[..., T], *args) -> T:
+        """Run `fn(*args)` on the pool, or raise PasswordPoolSaturated."""
+        if self._in_flight >= self.workers + self.queue_limit:
+            metrics.inc("password_pool.rejected")
+            raise PasswordPoolSaturated(f"Password pool saturated ({self._in_flight} in flight)")
+
+        submitted = time.perf_counter()
+
+        def task():
+            return time.perf_counter(), fn(*args)
+
+        self._in_flight += 1
+        self._publish()
+        try:
+            started, result = await asyncio.get_running_loop().run_in_executor(self._executor, task)
+            metrics.observe("password_pool.wait_ms", (started - submitted) * 1000)
+            return result
+        finally:
+            self._in_flight -= 1
+            self._publish()
+            metrics.observe(f"password_pool.{op}_ms", (time.perf_counter() - submitted) * 1000)
+
+
+@lru_cache()
+def get_password_pool() -> PasswordPool:
+    settings = get_settings()
+    return PasswordPool(settings.PASSWORD_POOL_WORKERS, settings.PASSWORD_POOL_QUEUE_LIMIT)
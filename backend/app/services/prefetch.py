@@ -0,0 +1,117 @@
+"""
+Predictive prefetch of lesson content.
+
+Learners move through the course in order: right after completing a lesson
+(or while reading one) they open the next. `schedule_prefetch` queues
+background `lesson_content` jobs for the next PREFETCH_LOOKAHEAD lessons
+that have no content yet, so the model call happens before anyone waits
+on it. Request handlers hand `prefetch_quietly` to their BackgroundTasks:
+it runs after the response is sent, in a session of its own.
+
+Prefetch only uses spare AI capacity and never races real work:
+  - it is skipped while AI calls are queueing or the circuit breaker is
+    not closed;
+  - jobs run at background priority and their model calls take the bulk
+    admission lane, behind interactive traffic;
+  - `enqueue_once` folds repeated triggers into the pending job, and a
+    lesson already being generated (single flight) is not queued again.
+    A job that still overlaps an on-demand generation joins it through
+    the single flight / DB lease instead of calling the model twice.
+
+Hit rate: prefetched lessons are remembered (per process, bounded) until
+their content is first opened. An open that finds the content ready is a
+hit, one that still finds nothing is late. `prefetch.hit_rate` is hits over
+prefetches scheduled; tune PREFETCH_LOOKAHEAD with it.
+
+Metrics:
+  prefetch.scheduled / prefetch.skipped.busy      counters
+  prefetch.hits / prefetch.late                   counters
+  prefetch.hit_rate                               gauge
+"""
+import logging
+from collections import OrderedDict
+from typing import Callable, List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from . import lesson_generation, metrics
+from .ai_client import get_ai_client
+from .catalog import get_catalog
+from .circuit_breaker import CLOSED
+from .jobs import PRIORITY_BACKGROUND, enqueue_once
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+TRACKED_MAX = 1000
+
+# lesson id -> None, oldest first: prefetched and not opened yet
+_tracked: "OrderedDict[int, None]" = OrderedDict()
+
+
+def _ai_busy() -> bool:
+    client = get_ai_client()
+    admission = client.admission
+    return (
+        client.breaker.state != CLOSED
+        or admission.queued > 0
+        or admission.in_flight >= admission.max_in_flight
+    )
+
+
+async def schedule_prefetch(db: AsyncSession, lesson_id: int) -> List[int]:
+    """Queue generation of the lessons after `lesson_id`; returns the ids queued."""
+    if settings.PREFETCH_LOOKAHEAD <= 0:
+        return []
+    catalog = await get_catalog(db)
+    candidates = [
+        entry.id for entry in catalog.following(lesson_id, settings.PREFETCH_LOOKAHEAD)
+        if not entry.has_content and not lesson_generation.in_flight(entry.id)
+    ]
+    if not candidates:
+        return []
+    if _ai_busy():
+        metrics.inc("prefetch.skipped.busy")
+        return []
+
+    for candidate in candidates:
+        await enqueue_once(db, "lesson_content", {"lesson_id": candidate}, priority=PRIORITY_BACKGROUND)
+        if candidate not in _tracked:
+            metrics.inc("prefetch.scheduled")
+            _tracked[candidate] = None
+            if len(_tracked) > TRACKED_MAX:
+                _tracked.popitem(last=False)
+    _publish_hit_rate()
+    return candidates
+
+
+async def prefetch_quietly(session_factory: Callable[[], AsyncSession], lesson_id: int) -> None:
+    """`schedule_prefetch` as a background task: a failure only costs the prefetch."""
+    try:
+        async with session_factory() as db:
+            await schedule_prefetch(db, lesson_id)
+    except Exception:
+        logger.exception(f"Prefetch after lesson {lesson_id} failed")
+
+
+def record_open(lesson_id: int, has_content: bool) -> None:
+    """Count whether content opened after a prefetch was ready in time."""
+    if lesson_id not in _tracked:
+        return
+    if has_content:
+        del _tracked[lesson_id]
+        metrics.inc("prefetch.hits")
+    else:
+        metrics.inc("prefetch.late")  # still tracked: the job may finish before the next open
+    _publish_hit_rate()
+
+
+def _publish_hit_rate() -> None:
+    scheduled = metrics.get_counter("prefetch.scheduled")
+    if scheduled:
+        metrics.set_gauge("prefetch.hit_rate", metrics.get_counter("prefetch.hits") / scheduled)
+
+
+def reset() -> None:
+    _tracked.clear()
@@ -0,0 +1,238 @@
+"""
+Bulk lesson pre-generation (the `app.pregenerate` CLI).
+
+Lesson content is otherwise generated lazily, so the first learner to open
+each lesson waits for the model. `pregenerate` walks every lesson without
+`LessonContent` in course order and generates it with `concurrency` workers.
+Each lesson goes through `generate_lesson_content`, so a run is safe next to
+live API workers: the single flight and the DB lease keep a lesson from
+being generated twice, and saving the content bumps the shared catalog
+version, so the API workers list the lesson as ready at their next request.
+
+Stored content is read back and validated against GeneratedContentSchema
+(plus: some text, at least one flashcard and one quiz question); content
+that fails is deleted so the lesson is generated again later.
+
+Failures are either transient (the model is shedding load, the breaker is
+open, a call timed out or the provider answered 5xx / 429) or permanent
+(bad output, content that fails validation). A transient failure is
+retried up to TRANSIENT_RETRIES times after the delay the error asks for;
+if it still fails the lesson is deferred: left pending, so the next run
+picks it up. Only permanent failures are checkpointed.
+
+Progress is checkpointed to a JSON file after every lesson. Finished
+lessons are known from the database anyway; the checkpoint remembers which
+lessons failed permanently, so a resumed run skips them unless asked to
+retry, and carries the totals across runs.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.lesson import Lesson, LessonContent
+from ..schemas.lesson import GeneratedContentSchema
+from . import metrics, versions
+from .admission import OverloadedError
+from .ai_client import AIBackendError, AITimeoutError
+from .circuit_breaker import CircuitOpenError
+from .lesson_generation import generate_lesson_content
+
+logger = logging.getLogger(__name__)
+
+TRANSIENT_RETRIES = 2
+# Wait before retrying a transient failure that names no retry_after, and the cap on one that does
+RETRY_DELAY_SECONDS = 5.0
+MAX_RETRY_DELAY_SECONDS = 60.0
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether the same lesson is likely to succeed if tried again later."""
+    if isinstance(error, (OverloadedError, CircuitOpenError, AITimeoutError)):
+        return True
+    return isinstance(error, AIBackendError) and error.retryable
+
+
+@dataclass
+class Checkpoint:
+    path: Optional[str]
+    completed: List[int] = field(default_factory=list)
+    failed: Dict[int, str] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: Optional[str]) -> "Checkpoint":
+        if not path or not os.path.exists(path):
+            return cls(path)
+        with open(path) as f:
+            data = json.load(f)
+        return cls(
+            path,
+            completed=list(data.get("completed", [])),
+            failed={int(lesson_id): error for lesson_id, error in data.get("failed", {}).items()},
+        )
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        # Write aside and rename, so an interrupted write never leaves half a file
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"completed": self.completed, "failed": self.failed}, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def mark_completed(self, lesson_id: int) -> None:
+        self.failed.pop(lesson_id, None)
+        if lesson_id not in self.completed:
+            self.completed.append(lesson_id)
+        self.save()
+
+    def mark_failed(self, lesson_id: int, error: str) -> None:
+        self.failed[lesson_id] = error
+        self.save()
+
+
+@dataclass
+class PregenerationReport:
+    pending: int = 0
+    generated: int = 0
+    skipped_failed: int = 0  # failed in an earlier run and not retried
+    failed: Dict[int, str] = field(default_factory=dict)
+    deferred: Dict[int, str] = field(default_factory=dict)  # transient failures, still pending
+    elapsed_seconds: float = 0.0
+    lesson_seconds: List[float] = field(default_factory=list)
+
+    @property
+    def lessons_per_minute(self) -> float:
+        return self.generated / self.elapsed_seconds * 60 if self.elapsed_seconds else 0.0
+
+    def summary(self) -> str:
+        lines = [
+            f"Generated {self.generated}/{self.pending} lessons in {self.elapsed_seconds:.1f}s "
+            f"({self.lessons_per_minute:.1f} lessons/min)",
+        ]
+        if self.lesson_seconds:
+            ordered = sorted(self.lesson_seconds)
+            lines.append(
+                f"Per lesson: mean {sum(ordered) / len(ordered):.2f}s, "
+                f"p50 {ordered[len(ordered) // 2]:.2f}s, max {ordered[-1]:.2f}s"
+            )
+        if self.skipped_failed:
+            lines.append(f"Skipped {self.skipped_failed} lessons that failed before (use --retry-failed)")
+        for lesson_id, error in sorted(self.failed.items()):
+            lines.append(f"FAILED lesson {lesson_id}: {error}")
+        for lesson_id, error in sorted(self.deferred.items()):
+            lines.append(f"DEFERRED lesson {lesson_id} (run again to retry): {error}")
+        return "\n".join(lines)
+
+
+async def lessons_without_content(db: AsyncSession, lesson_ids: Optional[Iterable[int]] = None) -> List[int]:
+    """Ids of lessons with no stored content, in course order."""
+    query = (
+        select(Lesson.id)
+        .where(~select(LessonContent.id).where(LessonContent.lesson_id == Lesson.id).exists())
+        .order_by(Lesson.level, Lesson.module, Lesson.lesson_number)
+    )
+    if lesson_ids is not None:
+        query = query.where(Lesson.id.in_(list(lesson_ids)))
+    return list((await db.scalars(query)).all())
+
+
+def validate_content(content) -> None:
+    """Raise ValueError unless stored content is complete and matches GeneratedContentSchema."""
+    try:
+        parsed = GeneratedContentSchema.model_validate(content.model_dump())
+    except ValidationError as e:
+        raise ValueError(f"invalid content: {e.error_count()} schema errors") from e
+    if not parsed.lesson_text.strip():
+        raise ValueError("invalid content: empty lesson text")
+    if not parsed.flashcards:
+        raise ValueError("invalid content: no flashcards")
+    if not parsed.quiz:
+        raise ValueError("invalid content: no quiz questions")
+
+
+async def _discard_content(session_factory, lesson_id: int) -> None:
+    async with session_factory() as db:
+        await db.execute(delete(LessonContent).where(LessonContent.lesson_id == lesson_id))
+        await versions.bump_shared_version(db, versions.CATALOG)
+        await db.commit()
+
+
+async def _generate_with_retries(session_factory, lesson_id: int):
+    for attempt in range(TRANSIENT_RETRIES + 1):
+        try:
+            return await generate_lesson_content(session_factory, lesson_id)
+        except Exception as e:
+            if not is_transient(e) or attempt == TRANSIENT_RETRIES:
+                raise
+            delay = min(getattr(e, "retry_after", RETRY_DELAY_SECONDS), MAX_RETRY_DELAY_SECONDS)
+            logger.info(f"Lesson {lesson_id}: {e}; retrying in {delay:.1f}s")
+            metrics.inc("pregenerate.retries")
+            await asyncio.sleep(delay)
+
+
+async def pregenerate(
+    session_factory: Callable[[], AsyncSession],
+    concurrency: int = 4,
+    checkpoint_path: Optional[str] = None,
+    retry_failed: bool = False,
+    lesson_ids: Optional[Iterable[int]] = None,
+) -> PregenerationReport:
+    """Generate content for every lesson that lacks it. See the module docstring."""
+    checkpoint = Checkpoint.load(checkpoint_path)
+    async with session_factory() as db:
+        missing = await lessons_without_content(db, lesson_ids)
+
+    report = PregenerationReport()
+    queue: asyncio.Queue = asyncio.Queue()
+    for lesson_id in missing:
+        if lesson_id in checkpoint.failed and not retry_failed:
+            report.skipped_failed += 1
+            continue
+        queue.put_nowait(lesson_id)
+    report.pending = queue.qsize()
+
+    async def worker():
+        while True:
+            try:
+                lesson_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            try:
+                content = await _generate_with_retries(session_factory, lesson_id)
+                try:
+                    validate_content(content)
+                except ValueError:
+                    await _discard_content(session_factory, lesson_id)
+                    raise
+            except Exception as e:
+                if is_transient(e):
+                    logger.warning(f"Lesson {lesson_id} deferred: {e}")
+                    metrics.inc("pregenerate.deferred")
+                    report.deferred[lesson_id] = str(e)
+                    continue
+                logger.warning(f"Lesson {lesson_id} failed: {e}")
+                metrics.inc("pregenerate.failed")
+                report.failed[lesson_id] = str(e)
+                checkpoint.mark_failed(lesson_id, str(e))
+            else:
+                seconds = time.perf_counter() - start
+                metrics.inc("pregenerate.generated")
+                metrics.observe("pregenerate.lesson_ms", seconds * 1000)
+                report.generated += 1
+                report.lesson_seconds.append(seconds)
+                checkpoint.mark_completed(lesson_id)
+                logger.info(f"Lesson {lesson_id} generated in {seconds:.2f}s ({report.generated}/{report.pending})")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    report.elapsed_seconds = time.perf_counter() - start
+    return report
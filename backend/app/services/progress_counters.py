@@ -0,0 +1,95 @@
+"""
+Per-user completion counters (`user_level_progress`).
+
+`complete_lesson` bumps one counter row per completion in its own
+transaction; readers fetch all of a user's counters with one indexed query
+and combine them with lesson totals from the in-process catalog.
+`rebuild_counters` is the bulk repair path used by the
+`app.reconcile_progress` CLI and runs on a sync session.
+"""
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models.lesson import Lesson
+from ..models.progress import UserProgress, UserLevelProgress
+
+ModuleKey = Tuple[int, int]
+
+
+async def increment_completed(db: AsyncSession, user_id: int, level: int, module: int) -> None:
+    """Add one completion to the user's (level, module) counter. Does not commit."""
+    # One upsert: two first completions in the same module can't both insert
+    upsert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+    table = UserLevelProgress.__table__
+    await db.execute(
+        upsert(table)
+        .values(user_id=user_id, level=level, module=module, completed_count=1)
+        .on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.level, table.c.module],
+            set_={"completed_count": table.c.completed_count + 1},
+        )
+    )
+
+
+async def get_module_counters(db: AsyncSession, user_id: int) -> Dict[ModuleKey, int]:
+    """Completed lessons per (level, module) for one user."""
+    rows = await db.execute(
+        select(UserLevelProgress.level, UserLevelProgress.module, UserLevelProgress.completed_count)
+        .where(UserLevelProgress.user_id == user_id)
+    )
+    return {(level, module): count for level, module, count in rows}
+
+
+def per_level(counters: Mapping[ModuleKey, int]) -> Dict[int, int]:
+    """Collapse (level, module) counters into per-level totals."""
+    levels: Dict[int, int] = {}
+    for (level, _), count in counters.items():
+        levels[level] = levels.get(level, 0) + count
+    return levels
+
+
+async def total_completed(db: AsyncSession, user_id: int) -> int:
+    """Total completed lessons for one user."""
+    total = await db.scalar(
+        select(func.sum(UserLevelProgress.completed_count))
+        .where(UserLevelProgress.user_id == user_id)
+    )
+    return total or 0
+
+
+def rebuild_counters(db: Session, user_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recompute counters from `user_progress` in bulk with a single
+    INSERT ... SELECT ... GROUP BY. Rebuilds every user unless `user_ids`
+    is given. Commits and returns the number of counter rows written.
+    """
+    user_ids = list(user_ids) if user_ids is not None else None
+
+    clear = delete(UserLevelProgress)
+    aggregate = (
+        select(
+            UserProgress.user_id,
+            Lesson.level,
+            Lesson.module,
+            func.count(UserProgress.id),
+        )
+        .join(Lesson, Lesson.id == UserProgress.lesson_id)
+        .where(UserProgress.completed == True)
+        .group_by(UserProgress.user_id, Lesson.level, Lesson.module)
+    )
+    if user_ids is not None:
+        clear = clear.where(UserLevelProgress.user_id.in_(user_ids))
+        aggregate = aggregate.where(UserProgress.user_id.in_(user_ids))
+
+    db.execute(clear)
+    result = db.execute(
+        insert(UserLevelProgress).from_select(
+            ["user_id", "level", "module", "completed_count"], aggregate
+        )
+    )
+    db.commit()
+    return result.rowcount
@@ -28,6 +28,23 @@ PROMPTS = {
 8. Do NOT use markdown headers — use plain text with occasional **bold** for key terms.""",
     },
 
+    "summary_v1": {
+        "version": "summary_v1",
+        "template": """You maintain the running_summary of a tutoring chat between a student and a financial literacy coach.
+
+## CURRENT SUMMARY
+{previous_summary}
+
+## NEW MESSAGES
+{new_messages}
+
+## TASK
+Rewrite the summary so it also covers the new messages. Keep what the student asked,
+what they struggled with or misunderstood, what the coach already explained, and any
+personal details they shared (goals, income, plans). Drop greetings and filler.
+Plain text, at most {max_words} words. Reply with the summary only.""",
+    },
+
     "regenerate_v1": {
         "version": "regenerate_v1",
         "template": """You are an experienced financial literacy expert creating educational content.
@@ -0,0 +1,210 @@
+"""
+Token-bucket rate limiting per (endpoint, user).
+
+Each bucket holds up to `capacity` tokens and refills continuously at
+capacity / period tokens per second; a request spends one token. Checks
+are O(1): a bucket stores only its token count and the time it was last
+updated, and the refill since then is computed on the spot.
+
+Limits come from RATE_LIMITS ("coach=15/60,..."). Backends (RATE_LIMIT_BACKEND):
+  memory    buckets in this process. Idle buckets are evicted once they
+            would have refilled completely (a full bucket and a missing
+            one behave the same). Past RATE_LIMIT_MAX_KEYS every full
+            bucket is dropped, not just the least recently used ones. A
+            bucket still refilling is never dropped, since that would give
+            its user a fresh burst, so the cap is soft: what stays is
+            bounded by the users active within one refill period.
+  database  buckets in the `rate_limit_buckets` table, updated with one
+            atomic upsert per check, so every uvicorn worker and host
+            shares them. Full buckets are swept periodically.
+
+A rejected request gets the seconds until the next token, for a
+`Retry-After` header.
+"""
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy import case, delete, literal
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..models.rate_limit import RateLimitBucket
+from . import metrics
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    capacity: int
+    period: float  # seconds to refill an empty bucket
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.period
+
+
+class RateLimitExceeded(ValueError):
+    """The caller is out of tokens; retry after `retry_after` seconds."""
+
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"Rate limit exceeded for {endpoint}. Please wait {math.ceil(retry_after)}s before trying again.")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+def parse_limits(spec: str) -> Dict[str, RateLimit]:
+    """Parse "coach=15/60,dictionary=30/60" into limits by endpoint name."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            name, value = item.split("=")
+            capacity, period = value.split("/")
+            limits[name.strip()] = RateLimit(int(capacity), float(period))
+        except ValueError:
+            raise ValueError(f"Invalid RATE_LIMITS entry '{item}' (expected name=requests/seconds)")
+    return limits
+
+
+# ─── Backends ────────────────────────────────────────────────
+
+class MemoryRateLimiter:
+    """Buckets in an LRU-ordered dict: key -> (tokens, updated_at, expires_at)."""
+
+    # Over max_keys, search all buckets for full ones at most this often
+    FULL_SWEEP_INTERVAL_SECONDS = 1.0
+
+    def __init__(self, max_keys: int = 100_000, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float, float]]" = OrderedDict()
+        self._last_full_sweep: Optional[float] = None
+
+    def check(self, key: str, limit: RateLimit) -> float:
+        """Spend a token. Returns 0 if allowed, else seconds until one is available."""
+        now = self.clock()
+        self._evict(now)
+
+        bucket = self._buckets.get(key)
+        tokens = limit.capacity if bucket is None else min(limit.capacity, bucket[0] + (now - bucket[1]) * limit.rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now, bucket[2])
+            self._buckets.move_to_end(key)
+            return (1 - tokens) / limit.rate
+
+        tokens -= 1
+        self._buckets[key] = (tokens, now, now + (limit.capacity - tokens) / limit.rate)
+        self._buckets.move_to_end(key)
+        return 0.0
+
+    async def acquire(self, key: str, limit: RateLimit) -> float:
+        return self.check(key, limit)
+
+    def _evict(self, now: float) -> None:
+        # Least recently used first; stop at the first bucket still refilling
+        while self._buckets:
+            key, (_, _, expires_at) = next(iter(self._buckets.items()))
+            if expires_at > now:
+                break
+            del self._buckets[key]
+            metrics.inc("rate_limit.evicted")
+
+        # Buckets of different limits refill at different speeds, so full
+        # ones can sit behind a refilling one
+        if len(self._buckets) < self.max_keys:
+            return
+        if self._last_full_sweep is not None and now - self._last_full_sweep < self.FULL_SWEEP_INTERVAL_SECONDS:
+            return
+        self._last_full_sweep = now
+        full = [key for key, (_, _, expires_at) in self._buckets.items() if expires_at <= now]
+        for key in full:
+            del self._buckets[key]
+        if full:
+            metrics.inc("rate_limit.evicted", len(full))
+        if len(self._buckets) >= self.max_keys:
+            metrics.inc("rate_limit.over_max_keys")
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class DatabaseRateLimiter:
+    """Buckets shared through the database; one upsert per check."""
+
+    SWEEP_INTERVAL_SECONDS = 60.0
+
+    def __init__(self, session_factory: Callable[[], AsyncSession], clock: Callable[[], float] = time.time):
+        self.session_factory = session_factory
+        self.clock = clock
+        self._last_sweep = 0.0
+
+    async def acquire(self, key: str, limit: RateLimit) -> float:
+        now = self.clock()
+        async with self.session_factory() as db:
+            insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+            table = RateLimitBucket.__table__
+            refilled = table.c.tokens + (literal(now) - table.c.updated_at) * limit.rate
+            available = case((refilled > limit.capacity, literal(float(limit.capacity))), else_=refilled)
+
+            statement = insert(table).values(
+                key=key,
+                tokens=limit.capacity - 1,
+                updated_at=now,
+                expires_at=now + 1 / limit.rate,
+            )
+            statement = statement.on_conflict_do_update(
+                index_elements=[table.c.key],
+                set_={
+                    "tokens": available - 1,
+                    "updated_at": now,
+                    "expires_at": now + (limit.capacity - (available - 1)) / limit.rate,
+                },
+                where=available >= 1,
+            ).returning(table.c.tokens)
+            spent = (await db.execute(statement)).first()
+
+            retry_after = 0.0
+            if spent is None:
+                bucket = await db.get(RateLimitBucket, key)
+                tokens = min(limit.capacity, bucket.tokens + (now - bucket.updated_at) * limit.rate)
+                retry_after = max((1 - tokens) / limit.rate, 0.0)
+
+            if now - self._last_sweep > self.SWEEP_INTERVAL_SECONDS:
+                self._last_sweep = now
+                await db.execute(delete(RateLimitBucket).where(RateLimitBucket.expires_at < now))
+            await db.commit()
+        return retry_after
+
+
+# ─── Entry point ─────────────────────────────────────────────
+
+@lru_cache()
+def get_limits() -> Dict[str, RateLimit]:
+    return parse_limits(get_settings().RATE_LIMITS)
+
+
+@lru_cache()
+def get_rate_limiter():
+    settings = get_settings()
+    if settings.RATE_LIMIT_BACKEND == "database":
+        from ..database import get_session_factory
+        return DatabaseRateLimiter(get_session_factory())
+    if settings.RATE_LIMIT_BACKEND != "memory":
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND '{settings.RATE_LIMIT_BACKEND}' (expected memory or database)")
+    return MemoryRateLimiter(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+
+
+async def enforce(endpoint: str, user_id: int, limiter: Optional[object] = None) -> None:
+    """Spend one of the user's tokens for `endpoint`, or raise RateLimitExceeded."""
+    limit = get_limits()[endpoint]
+    retry_after = await (limiter or get_rate_limiter()).acquire(f"{endpoint}:{user_id}", limit)
+    if retry_after:
+        metrics.inc(f"rate_limit.{endpoint}.rejected")
+        raise RateLimitExceeded(endpoint, retry_after)
+    metrics.inc(f"rate_limit.{endpoint}.allowed")
@@ -0,0 +1,53 @@
+"""
+In-process request coalescing ("single flight").
+
+`SingleFlight.do(key, fn)` runs `fn()` once per key at a time: the first
+caller starts it, later callers await the same task. The task is
+shielded, so a caller that disconnects does not cancel the work for
+everyone else. Metrics, prefixed with the flight's name:
+
+  <name>.coalesced   counter, callers that joined an in-flight call
+  <name>.waiters     gauge, callers currently waiting on someone else's call
+  <name>.in_flight   gauge, keys currently running
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+from . import metrics
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._waiters = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is not None:
+            metrics.inc(f"{self.name}.coalesced")
+            self._waiters += 1
+            metrics.set_gauge(f"{self.name}.waiters", self._waiters)
+            try:
+                return await asyncio.shield(task)
+            finally:
+                self._waiters -= 1
+                metrics.set_gauge(f"{self.name}.waiters", self._waiters)
+
+        task = asyncio.ensure_future(fn())
+        self._calls[key] = task
+        metrics.set_gauge(f"{self.name}.in_flight", len(self._calls))
+        task.add_done_callback(lambda _: self._forget(key, task))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # callers get it; don't warn if they all went away
+        metrics.set_gauge(f"{self.name}.in_flight", len(self._calls))
@@ -0,0 +1,25 @@
+"""
+Server-Sent Events helpers.
+"""
+import json
+from typing import Any, Optional
+
+SSE_MEDIA_TYPE = "text/event-stream"
+# Keep proxies from buffering the stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(data: Any, event: Optional[str] = None, event_id: Optional[str] = None) -> str:
+    """Format one SSE frame; `data` is JSON-encoded unless it is already a string."""
+    payload = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False, default=str)
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.extend(f"data: {line}" for line in payload.split("\n"))
+    return "\n".join(lines) + "\n\n"
+
+
+def sse_comment(text: str = "keep-alive") -> str:
+    return f": {text}\n\n"
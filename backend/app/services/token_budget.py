@@ -0,0 +1,64 @@
+"""
+Token estimation for prompt budgets.
+
+We have no tokenizer for the hosted model, so counts are estimates: about
+four characters per token for Latin text, closer to two for Cyrillic, and
+at least one token per word or punctuation mark. The estimate errs high,
+so a prompt that fits the budget here fits the real limit too.
+"""
+import re
+
+_PIECE = re.compile(r"\w+|[^\w\s]")
+_CYRILLIC = re.compile(r"[Ѐ-ӿ]")
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    cyrillic = len(_CYRILLIC.findall(text))
+    by_chars = (len(text) - cyrillic) / 4 + cyrillic / 2
+    return max(int(by_chars) + 1, len(_PIECE.findall(text)))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of `text` (cut at a word boundary) that fits `max_tokens`."""
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    cut = text[:low]
+    space = cut.rfind(" ")
+    return cut[:space] if space > 0 else cut
+
+
+class TokenBudget:
+    """A running allowance that prompt parts are charged against."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.used = 0
+
+    @property
+    def remaining(self) -> int:
+        return max(self.total - self.used, 0)
+
+    def charge(self, text: str) -> None:
+        """Count a part that must be included whatever it costs."""
+        self.used += estimate_tokens(text)
+
+    def fits(self, text: str) -> bool:
+        return estimate_tokens(text) <= self.remaining
+
+    def take(self, text: str, limit: int = None) -> str:
+        """Include as much of `text` as fits (and at most `limit` tokens)."""
+        allowance = self.remaining if limit is None else min(limit, self.remaining)
+        text = truncate_to_tokens(text, allowance)
+        self.charge(text)
+        return text
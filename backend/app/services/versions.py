@@ -0,0 +1,86 @@
+"""
+Per-user version counters.
+
+Read endpoints derive their ETags from cheap counters instead of hashing
+the response (see api/conditional.py). Each scope is one integer per user,
+bumped in the same transaction as any write that changes what the scope's
+endpoints return:
+
+  progress   lesson completions and XP: /lessons, /lessons/{id}, /progress/summary
+  habits     habit create / check-in / delete: /game/habits
+
+Shared versions are the same idea for data every process caches in
+memory, one integer per scope in `shared_versions`:
+
+  catalog    the `lessons` / `lesson_content` rows behind services/catalog.py
+
+Whatever writes that data (the API, the job workers, seed.py,
+clear_content.py, the pregeneration CLI) bumps the counter in its own
+transaction; a process compares it with the version its copy was built
+from, so a change made anywhere is seen by every worker at its next
+request. A session reads a shared version once and remembers it in
+`db.info` (the request's session serves several lookups), unless it bumps
+the counter itself.
+
+A missing row reads as version 0.
+"""
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.version import SharedVersion, UserVersion
+
+PROGRESS = "progress"
+HABITS = "habits"
+
+CATALOG = "catalog"
+
+
+async def get_version(db: AsyncSession, user_id: int, scope: str) -> int:
+    version = await db.scalar(
+        select(UserVersion.version).where(UserVersion.user_id == user_id, UserVersion.scope == scope)
+    )
+    return version or 0
+
+
+async def bump_version(db: AsyncSession, user_id: int, scope: str) -> None:
+    """Increment the user's counter for `scope`. Does not commit."""
+    insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+    table = UserVersion.__table__
+    await db.execute(
+        insert(table)
+        .values(user_id=user_id, scope=scope, version=1)
+        .on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.scope],
+            set_={"version": table.c.version + 1},
+        )
+    )
+
+
+def _shared_key(scope: str) -> str:
+    return f"shared_version:{scope}"
+
+
+async def get_shared_version(db: AsyncSession, scope: str) -> int:
+    key = _shared_key(scope)
+    if key not in db.info:
+        version = await db.scalar(select(SharedVersion.version).where(SharedVersion.scope == scope))
+        db.info[key] = version or 0
+    return db.info[key]
+
+
+def shared_version_bump(dialect: str, scope: str):
+    """The upsert incrementing a shared counter; sync sessions execute it directly."""
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    table = SharedVersion.__table__
+    return (
+        insert(table)
+        .values(scope=scope, version=1)
+        .on_conflict_do_update(index_elements=[table.c.scope], set_={"version": table.c.version + 1})
+    )
+
+
+async def bump_shared_version(db: AsyncSession, scope: str) -> None:
+    """Increment the shared counter for `scope`. Does not commit."""
+    await db.execute(shared_version_bump(db.bind.dialect.name, scope))
+    db.info.pop(_shared_key(scope), None)
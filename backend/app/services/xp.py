@@ -0,0 +1,157 @@
+"""
+XP awards.
+
+Every XP grant goes through `award_xp`, which in the caller's transaction:
+
+  1. appends a row to the `xp_events` ledger (who, how much, for what);
+  2. adds the amount to the user's `xp_daily` and `xp_weekly` rollup rows;
+  3. upserts `user_stats`: adds the XP, recomputes the title and advances
+     the daily streak in SQL, returning the new values.
+
+Every step is an insert or an in-place `x = x + :amount` upsert, so two
+awards racing each other (a double tap, two tabs) both land and nothing
+has to be read first. The ledger is append-only and carries a single
+secondary index, keeping award writes cheap; time-windowed questions
+("XP this week") read the rollups instead of scanning it, and `total_xp`
+is the ledger's running sum. `rebuild_xp` recomputes rollups and totals
+from the ledger (`python -m app.reconcile_progress`).
+
+Days are UTC calendar days and weeks are ISO weeks keyed by their Monday.
+Activity on the day after the last one extends the streak, a longer gap
+restarts it at 1.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models.progress import TITLE_THRESHOLDS, UserStats, get_title_for_xp
+from ..models.xp import XpDaily, XpEvent, XpWeekly
+
+LESSON = "lesson"
+BOSS = "boss"
+TRAP = "trap"
+
+
+@dataclass
+class XpAward:
+    total_xp: int
+    current_title: str
+    streak_days: int
+
+
+def _title_for(total_xp):
+    """SQL version of get_title_for_xp."""
+    return case(
+        *[(total_xp >= threshold, title) for threshold, title in reversed(TITLE_THRESHOLDS)],
+        else_=TITLE_THRESHOLDS[0][1],
+    )
+
+
+def week_of(day: date) -> date:
+    """The Monday that keys `day`'s week in xp_weekly."""
+    return day - timedelta(days=day.weekday())
+
+
+async def award_xp(
+    db: AsyncSession,
+    user_id: int,
+    amount: int,
+    source: str,
+    ref_id: Optional[int] = None,
+    now: Optional[datetime] = None,
+    activity: bool = True,
+) -> XpAward:
+    """
+    Record `amount` XP for `source` (LESSON, BOSS or TRAP; `ref_id` is the
+    lesson, battle or scenario) and add it to the rollups and the user's
+    stats, creating rows as needed. With `activity` the award also counts
+    as today's activity for the streak. Does not commit.
+    """
+    now = now or datetime.utcnow()
+    today = datetime.combine(now.date(), time.min)
+    insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+
+    await db.execute(
+        XpEvent.__table__.insert().values(user_id=user_id, amount=amount, source=source, ref_id=ref_id, created_at=now)
+    )
+    for rollup, key, value in ((XpDaily, "day", now.date()), (XpWeekly, "week", week_of(now.date()))):
+        rollup_table = rollup.__table__
+        await db.execute(
+            insert(rollup_table)
+            .values({"user_id": user_id, key: value, "xp": amount})
+            .on_conflict_do_update(
+                index_elements=[rollup_table.c.user_id, rollup_table.c[key]],
+                set_={"xp": rollup_table.c.xp + amount},
+            )
+        )
+
+    table = UserStats.__table__
+    total = func.coalesce(table.c.total_xp, 0) + amount
+    streak = func.coalesce(table.c.streak_days, 0)
+
+    updates = {"total_xp": total, "current_title": _title_for(total)}
+    if activity:
+        updates["streak_days"] = case(
+            (table.c.last_activity_at >= today, streak),
+            (table.c.last_activity_at >= today - timedelta(days=1), streak + 1),
+            else_=1,
+        )
+        updates["last_activity_at"] = now
+
+    row = (await db.execute(
+        insert(table)
+        .values(
+            user_id=user_id,
+            total_xp=amount,
+            current_title=get_title_for_xp(amount),
+            streak_days=1 if activity else 0,
+            last_activity_at=now if activity else None,
+        )
+        .on_conflict_do_update(index_elements=[table.c.user_id], set_=updates)
+        .returning(table.c.total_xp, table.c.current_title, table.c.streak_days)
+    )).one()
+    return XpAward(total_xp=row.total_xp, current_title=row.current_title, streak_days=row.streak_days)
+
+
+def rebuild_xp(db: Session, user_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recompute the daily and weekly rollups and `user_stats` totals and
+    titles from the ledger. Rebuilds every user unless `user_ids` is given.
+    Commits and returns the number of users whose stats were rewritten.
+    """
+    user_ids = list(user_ids) if user_ids is not None else None
+
+    daily: Dict[Tuple[int, date], int] = defaultdict(int)
+    weekly: Dict[Tuple[int, date], int] = defaultdict(int)
+    events = select(XpEvent.user_id, XpEvent.amount, XpEvent.created_at)
+    if user_ids is not None:
+        events = events.where(XpEvent.user_id.in_(user_ids))
+    for user_id, amount, created_at in db.execute(events.execution_options(yield_per=1000)):
+        daily[(user_id, created_at.date())] += amount
+        weekly[(user_id, week_of(created_at.date()))] += amount
+
+    for rollup, key, sums in ((XpDaily, "day", daily), (XpWeekly, "week", weekly)):
+        clear = delete(rollup)
+        if user_ids is not None:
+            clear = clear.where(rollup.user_id.in_(user_ids))
+        db.execute(clear)
+        if sums:
+            db.execute(rollup.__table__.insert(), [{"user_id": u, key: k, "xp": xp} for (u, k), xp in sums.items()])
+
+    total = (
+        select(func.coalesce(func.sum(XpEvent.amount), 0))
+        .where(XpEvent.user_id == UserStats.user_id)
+        .scalar_subquery()
+    )
+    totals = update(UserStats).values(total_xp=total, current_title=_title_for(total))
+    if user_ids is not None:
+        totals = totals.where(UserStats.user_id.in_(user_ids))
+    result = db.execute(totals.execution_options(synchronize_session=False))
+    db.commit()
+    return result.rowcount
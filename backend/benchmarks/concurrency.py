@@ -0,0 +1,108 @@
+"""
+Concurrency benchmark — latency percentiles under N parallel clients.
+
+Start the API first (with lessons seeded), then run:
+
+    python -m benchmarks.concurrency --url http://127.0.0.1:8000 --clients 200 --requests 10
+
+Each client signs in as its own user and repeatedly fetches the lesson
+catalog, the dashboard summary and the profile. Per-request latency is
+collected across all clients and summarised as p50/p95/p99/max plus
+overall throughput.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+ENDPOINTS = ["/api/lessons", "/api/progress/summary", "/api/social/me"]
+
+
+async def _signup(client: httpx.AsyncClient, run_id: str, index: int):
+    try:
+        response = await client.post("/api/auth/signup", json={
+            "name": f"Bench {index}",
+            "email": f"bench-{run_id}-{index}@example.com",
+            "password": "benchpassword",
+        })
+    except httpx.HTTPError:
+        return None
+    if response.status_code != 201:
+        return None
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def _client_loop(client: httpx.AsyncClient, headers: dict, requests: int, latencies: list, errors: list):
+    for i in range(requests):
+        path = ENDPOINTS[i % len(ENDPOINTS)]
+        start = time.perf_counter()
+        try:
+            response = await client.get(path, headers=headers)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run(url: str, clients: int, requests: int, timeout: float, setup_batch: int = 10) -> dict:
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+        run_id = uuid.uuid4().hex[:8]
+        headers = []
+        # Sign up in small batches; the setup phase is not measured
+        for batch_start in range(0, clients, setup_batch):
+            batch = range(batch_start, min(clients, batch_start + setup_batch))
+            headers.extend(await asyncio.gather(*(_signup(client, run_id, i) for i in batch)))
+
+        signed_in = [h for h in headers if h is not None]
+
+        latencies: list = []
+        errors: list = []
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            _client_loop(client, h, requests, latencies, errors) for h in signed_in
+        ))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "clients": len(signed_in),
+        "signup_failures": clients - len(signed_in),
+        "requests": len(latencies),
+        "errors": len(errors),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 50), 1),
+        "p95_ms": round(_percentile(latencies, 95), 1),
+        "p99_ms": round(_percentile(latencies, 99), 1),
+        "max_ms": round(latencies[-1], 1) if latencies else 0.0,
+        "mean_ms": round(statistics.fmean(latencies), 1) if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=10, help="requests per client")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.url, args.clients, args.requests, args.timeout))
+    for key, value in result.items():
+        print(f"{key:>15}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,17 +4,28 @@ Test configuration — fixtures for backend tests.
 import sys
 import os
 import pytest
+import pytest_asyncio
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 # Add backend directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
-from app.database import Base, get_db
+# Background job workers poll the database; tests that need them start them explicitly
+os.environ["JOB_WORKERS"] = "0"
+
+from app.database import Base, get_db, get_session_factory
 from app.main import app
 from app.models import User
 from app.services.auth import AuthService
+from app.services import content_cache
+from app.services.catalog import invalidate_catalog
+from app.services.identity_cache import get_identity_cache
+from app.services.leaderboard import get_leaderboards
+from app.services.rate_limiter import get_rate_limiter
 
 
 # In-memory SQLite for tests
@@ -23,32 +34,61 @@ SQLALCHEMY_TEST_URL = "sqlite:///./test_finance.db"
 engine = create_engine(SQLALCHEMY_TEST_URL, connect_args={"check_same_thread": False})
 TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The API runs on the async engine; fixtures seed data through the sync one.
+# NullPool keeps no connection open across tests (or event loops).
+async_engine = create_async_engine("sqlite+aiosqlite:///./test_finance.db", poolclass=NullPool)
+TestAsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 
 @pytest.fixture(scope="function")
 def db_session():
     """Create a fresh database for each test."""
     Base.metadata.create_all(bind=engine)
+    invalidate_catalog()
+    content_cache.clear()
+    get_identity_cache().clear()
+    get_leaderboards().clear()
+    get_rate_limiter().clear()
     session = TestSessionLocal()
     try:
         yield session
     finally:
         session.close()
         Base.metadata.drop_all(bind=engine)
+        invalidate_catalog()
+        content_cache.clear()
+        get_identity_cache().clear()
+        get_leaderboards().clear()
+        get_rate_limiter().clear()
 
 
 @pytest.fixture(scope="function")
 def test_client(db_session):
     """FastAPI test client with overridden DB dependency."""
-    def override_get_db():
-        try:
-            yield db_session
-        finally:
-            pass
+    async def override_get_db():
+        async with TestAsyncSessionLocal() as session:
+            yield session
 
     app.dependency_overrides[get_db] = override_get_db
-    client = TestClient(app)
-    yield client
+    app.dependency_overrides[get_session_factory] = lambda: TestAsyncSessionLocal
+    app.state.session_factory = TestAsyncSessionLocal
+    with TestClient(app) as client:
+        yield client
     app.dependency_overrides.clear()
+    app.state.session_factory = get_session_factory()
+
+
+@pytest.fixture
+def async_session_factory(db_session):
+    """Session factory for services that open their own sessions."""
+    return TestAsyncSessionLocal
+
+
+@pytest_asyncio.fixture
+async def async_db_session(db_session):
+    """AsyncSession on the test database, for calling async services directly."""
+    async with TestAsyncSessionLocal() as session:
+        yield session
 
 
 @pytest.fixture
@@ -101,3 +141,39 @@ def test_lesson(db_session):
     db_session.commit()
 
     return lesson
+
+
+@pytest.fixture
+def lesson_tree(db_session):
+    """Three levels x two modules x two lessons, without content."""
+    from app.models import Lesson
+
+    lessons = []
+    for level in range(1, 4):
+        for module in range(1, 3):
+            for number in range(1, 3):
+                lessons.append(Lesson(
+                    level=level,
+                    module=module,
+                    lesson_number=number,
+                    title=f"Lesson {level}.{module}.{number}",
+                    topic_key=f"l{level}m{module}-{number}",
+                ))
+    db_session.add_all(lessons)
+    db_session.commit()
+    return lessons
+
+
+@pytest.fixture
+def query_counter():
+    """Collect SQL statements the API executes against the test database."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
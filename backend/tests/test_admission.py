@@ -0,0 +1,154 @@
+"""
+Tests for AI admission control: slots, priority lanes and load shedding.
+"""
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.models import ChatMessage
+from app.services import metrics
+from app.services.admission import BULK, INTERACTIVE, AdmissionController, Lane, OverloadedError
+from app.services.ai_client import get_ai_client
+
+LANES = {INTERACTIVE: Lane(priority=10, deadline=5.0), BULK: Lane(priority=0, deadline=5.0)}
+
+
+async def _hold(controller, lane, started, release, order=None, deadline=None):
+    async with controller.admit(lane, deadline):
+        if order is not None:
+            order.append(lane)
+        started.set()
+        await release.wait()
+
+
+class TestAdmissionController:
+    """Slot accounting, lanes and shedding."""
+
+    def setup_method(self):
+        metrics.reset()
+
+    @pytest.mark.asyncio
+    async def test_interactive_overtakes_bulk(self):
+        controller = AdmissionController(max_in_flight=1, max_queue=10, lanes=LANES)
+        release = asyncio.Event()
+        first = asyncio.Event()
+        order = []
+
+        holder = asyncio.create_task(_hold(controller, BULK, first, release))
+        await first.wait()
+        waiters = [
+            asyncio.create_task(_hold(controller, BULK, asyncio.Event(), release, order)),
+            asyncio.create_task(_hold(controller, INTERACTIVE, asyncio.Event(), release, order)),
+        ]
+        await asyncio.sleep(0)
+        assert controller.queued == 2
+
+        release.set()
+        await asyncio.gather(holder, *waiters)
+        assert order == [INTERACTIVE, BULK]
+        assert controller.in_flight == 0
+        assert metrics.get_histogram("admission.interactive.wait_ms").count == 1
+
+    @pytest.mark.asyncio
+    async def test_full_queue_sheds(self):
+        controller = AdmissionController(max_in_flight=1, max_queue=1, lanes=LANES)
+        release = asyncio.Event()
+        started = asyncio.Event()
+        tasks = [asyncio.create_task(_hold(controller, INTERACTIVE, started, release))]
+        await started.wait()
+        tasks.append(asyncio.create_task(_hold(controller, INTERACTIVE, asyncio.Event(), release)))
+        await asyncio.sleep(0)
+
+        with pytest.raises(OverloadedError) as exc:
+            async with controller.admit(INTERACTIVE):
+                pass
+        assert exc.value.reason == "queue_full"
+        assert metrics.get_counter("admission.interactive.shed.queue_full") == 1
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert controller.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_predicted_wait_past_deadline_sheds_without_queueing(self):
+        controller = AdmissionController(max_in_flight=1, max_queue=10, lanes=LANES)
+        async with controller.admit(INTERACTIVE):
+            await asyncio.sleep(0.05)  # teaches the controller a call takes ~50ms
+
+        release = asyncio.Event()
+        started = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, INTERACTIVE, started, release))
+        await started.wait()
+
+        with pytest.raises(OverloadedError) as exc:
+            async with controller.admit(INTERACTIVE, deadline=0.01):
+                pass
+        assert exc.value.reason == "predicted"
+        assert exc.value.retry_after >= 0.05
+        assert controller.queued == 0
+
+        release.set()
+        await holder
+
+    @pytest.mark.asyncio
+    async def test_queued_call_times_out(self):
+        controller = AdmissionController(max_in_flight=1, max_queue=10, lanes=LANES)
+        release = asyncio.Event()
+        started = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, BULK, started, release))
+        await started.wait()
+
+        with pytest.raises(OverloadedError) as exc:
+            async with controller.admit(BULK, deadline=0.05):
+                pass
+        assert exc.value.reason == "timeout"
+        assert controller.queued == 0
+
+        release.set()
+        await holder
+        assert controller.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_leak_slot(self):
+        controller = AdmissionController(max_in_flight=1, max_queue=10, lanes=LANES)
+        release = asyncio.Event()
+        started = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, BULK, started, release))
+        await started.wait()
+
+        waiter = asyncio.create_task(_hold(controller, INTERACTIVE, asyncio.Event(), release))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        release.set()
+        await asyncio.gather(holder, waiter, return_exceptions=True)
+        assert controller.in_flight == 0
+        assert controller.queued == 0
+
+
+class TestSheddingEndpoints:
+    """Shed calls answer 503 with Retry-After."""
+
+    @patch("app.services.ai_service._call_gemini")
+    def test_coach_returns_503_and_keeps_no_message(self, mock_gemini, test_client, auth_headers, test_lesson, db_session):
+        mock_gemini.side_effect = OverloadedError(INTERACTIVE, "queue_full", 2.5)
+        response = test_client.post("/api/ai/coach", json={
+            "lesson_id": test_lesson.id,
+            "user_message": "Hi",
+        }, headers=auth_headers)
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "3"
+        assert db_session.query(ChatMessage).count() == 0
+
+    def test_stream_is_shed_before_it_starts(self, test_client, auth_headers, test_lesson, monkeypatch):
+        def saturated(lane, deadline=None):
+            raise OverloadedError(lane, "predicted", 4)
+        monkeypatch.setattr(get_ai_client().admission, "check", saturated)
+
+        response = test_client.post("/api/ai/coach/stream", json={
+            "lesson_id": test_lesson.id,
+            "user_message": "Hi",
+        }, headers=auth_headers)
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "4"
@@ -0,0 +1,195 @@
+"""
+Tests for the async AI client layer.
+"""
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from app.services import metrics
+from app.services.ai_client import (
+    AIBackend, AIBackendError, AIClient, AITimeoutError, GeminiBackend, MockBackend,
+)
+
+
+class SlowBackend(AIBackend):
+    """Sleeps, and records how many calls overlapped."""
+    name = "slow"
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+
+    async def generate(self, prompt, system_instruction=None):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            return prompt
+        finally:
+            self.active -= 1
+
+
+class FlakyBackend(AIBackend):
+    name = "flaky"
+
+    def __init__(self, failures: int, retryable: bool = True):
+        self.failures = failures
+        self.retryable = retryable
+        self.calls = 0
+
+    async def generate(self, prompt, system_instruction=None):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise AIBackendError("boom", retryable=self.retryable)
+        return "ok"
+
+
+class ChunkedBackend(AIBackend):
+    """Streams fixed chunks; can fail before the first one or stall mid-way."""
+    name = "chunked"
+
+    def __init__(self, chunks, failures: int = 0, stall_after: int = None):
+        self.chunks = chunks
+        self.failures = failures
+        self.stall_after = stall_after
+        self.calls = 0
+
+    async def stream(self, prompt, system_instruction=None):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise AIBackendError("busy", retryable=True)
+        for i, chunk in enumerate(self.chunks):
+            if i == self.stall_after:
+                await asyncio.sleep(10)
+            yield chunk
+
+
+class TestAIClient:
+    """Timeouts, the concurrency cap and retries."""
+
+    def setup_method(self):
+        metrics.reset()
+
+    @pytest.mark.asyncio
+    async def test_calls_run_concurrently(self):
+        client = AIClient(SlowBackend(0.2), max_concurrency=10, timeout=5)
+        start = time.perf_counter()
+        results = await asyncio.gather(*(client.generate(f"p{i}") for i in range(5)))
+        assert results == [f"p{i}" for i in range(5)]
+        assert time.perf_counter() - start < 0.6
+
+    @pytest.mark.asyncio
+    async def test_semaphore_caps_concurrency(self):
+        backend = SlowBackend(0.05)
+        client = AIClient(backend, max_concurrency=2, timeout=5)
+        await asyncio.gather(*(client.generate("p") for _ in range(6)))
+        assert backend.peak == 2
+        assert metrics.get_histogram("ai_client.latency_ms").count == 6
+
+    @pytest.mark.asyncio
+    async def test_timeout(self):
+        client = AIClient(SlowBackend(1.0), max_concurrency=1, timeout=5)
+        with pytest.raises(AITimeoutError):
+            await client.generate("p", timeout=0.05)
+        assert metrics.get_counter("ai_client.timeouts") == 1
+
+    @pytest.mark.asyncio
+    async def test_retries_transient_errors(self):
+        backend = FlakyBackend(failures=2)
+        client = AIClient(backend, max_concurrency=1, timeout=5, max_retries=2, retry_backoff=0)
+        assert await client.generate("p") == "ok"
+        assert backend.calls == 3
+
+    @pytest.mark.asyncio
+    async def test_does_not_retry_permanent_errors(self):
+        backend = FlakyBackend(failures=1, retryable=False)
+        client = AIClient(backend, max_concurrency=1, timeout=5, max_retries=2, retry_backoff=0)
+        with pytest.raises(AIBackendError):
+            await client.generate("p")
+        assert backend.calls == 1
+
+
+class TestAIClientStream:
+    """Streaming: first-chunk retries, per-chunk timeout, TTFT."""
+
+    def setup_method(self):
+        metrics.reset()
+
+    @pytest.mark.asyncio
+    async def test_yields_chunks_and_records_ttft(self):
+        client = AIClient(ChunkedBackend(["Hel", "lo"]), max_concurrency=1, timeout=5)
+        assert [c async for c in client.stream("p")] == ["Hel", "lo"]
+        assert metrics.get_histogram("ai_client.ttft_ms").count == 1
+        assert metrics.get_gauge("ai_client.in_flight") == 0
+
+    @pytest.mark.asyncio
+    async def test_retries_before_first_chunk(self):
+        backend = ChunkedBackend(["ok"], failures=1)
+        client = AIClient(backend, max_concurrency=1, timeout=5, retry_backoff=0)
+        assert [c async for c in client.stream("p")] == ["ok"]
+        assert backend.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_stalled_stream_times_out(self):
+        client = AIClient(ChunkedBackend(["a", "b"], stall_after=1), max_concurrency=1, timeout=0.05)
+        received = []
+        with pytest.raises(AITimeoutError):
+            async for chunk in client.stream("p"):
+                received.append(chunk)
+        assert received == ["a"]
+
+    @pytest.mark.asyncio
+    async def test_default_stream_sends_whole_reply(self):
+        client = AIClient(SlowBackend(0), max_concurrency=1, timeout=5)
+        assert [c async for c in client.stream("whole")] == ["whole"]
+
+
+class TestMockBackend:
+    """The local backend keeps the canned responses."""
+
+    @pytest.mark.asyncio
+    async def test_coach_reply_is_text(self):
+        reply = await MockBackend().generate("Student: hi\n\nCoach:", system_instruction="sys")
+        assert "Mock" in reply
+
+    @pytest.mark.asyncio
+    async def test_dictionary_reply_is_json(self):
+        data = json.loads(await MockBackend().generate("term: budget, lesson_context: intro"))
+        assert "definition" in data
+
+    @pytest.mark.asyncio
+    async def test_stream_is_chunked(self):
+        backend = MockBackend()
+        chunks = [c async for c in backend.stream("Student: hi\n\nCoach:", system_instruction="sys")]
+        assert len(chunks) > 1
+        assert "".join(chunks) == await backend.generate("Student: hi\n\nCoach:", system_instruction="sys")
+
+
+class TestGeminiBackend:
+    """Requests sent to the Gemini API."""
+
+    @pytest.mark.asyncio
+    async def test_api_key_in_header_not_url(self):
+        seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(request)
+            if request.url.params.get("alt") == "sse":
+                return httpx.Response(200, text='data: {"candidates": [{"content": {"parts": [{"text": "hi"}]}}]}\n\n')
+            return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": "hi"}]}}]})
+
+        backend = GeminiBackend("secret-key", "gemini-test", max_connections=1)
+        backend.http._transport = httpx.MockTransport(handler)
+        try:
+            assert await backend.generate("prompt") == "hi"
+            assert [chunk async for chunk in backend.stream("prompt")] == ["hi"]
+        finally:
+            await backend.http.aclose()
+
+        for request in seen:
+            assert request.headers["x-goog-api-key"] == "secret-key"
+            assert "secret-key" not in str(request.url)
@@ -30,8 +30,8 @@ class TestCoachEndpoint:
         assert response.status_code == 200
         data = response.json()
         assert "reply" in data
-        assert "history" in data
-        assert len(data["history"]) >= 2
+        assert len(data["messages"]) == 2
+        assert "history_cursor" in data
 
     def test_coach_invalid_lesson(self, test_client, auth_headers):
         response = test_client.post("/api/ai/coach", json={
@@ -48,6 +48,116 @@ class TestCoachEndpoint:
         assert response.status_code == 422  # Pydantic validation
 
 
+def _sse_events(response):
+    """Parse an SSE body into (event, data) pairs."""
+    events = []
+    for frame in response.text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in frame.split("\n") if not line.startswith(":"))
+        events.append((fields.get("event"), json.loads(fields["data"])))
+    return events
+
+
+class TestCoachHistoryEndpoint:
+    """Test GET /ai/coach/history."""
+
+    @patch("app.services.ai_service._call_gemini")
+    def test_reply_cursor_pages_older_messages(self, mock_gemini, test_client, auth_headers, test_lesson):
+        mock_gemini.return_value = "Reply"
+
+        for text in ["first", "second"]:
+            reply = test_client.post("/api/ai/coach", json={
+                "lesson_id": test_lesson.id,
+                "user_message": text,
+            }, headers=auth_headers).json()
+
+        older = test_client.get("/api/ai/coach/history", params={
+            "lesson_id": test_lesson.id,
+            "before": reply["history_cursor"],
+        }, headers=auth_headers)
+        assert older.status_code == 200
+        assert [m["content"] for m in older.json()["messages"]] == ["first", "Reply"]
+        assert older.json()["next_cursor"] is None
+
+        latest = test_client.get("/api/ai/coach/history", params={
+            "lesson_id": test_lesson.id,
+            "limit": 2,
+        }, headers=auth_headers).json()
+        assert [m["content"] for m in latest["messages"]] == ["second", "Reply"]
+        assert latest["next_cursor"] is not None
+
+    def test_bad_cursor_is_400(self, test_client, auth_headers, test_lesson):
+        response = test_client.get("/api/ai/coach/history", params={
+            "lesson_id": test_lesson.id,
+            "before": "???",
+        }, headers=auth_headers)
+        assert response.status_code == 400
+
+
+class TestCoachStreamEndpoint:
+    """Test POST /ai/coach/stream (server-sent events)."""
+
+    @patch("app.services.ai_service._stream_gemini")
+    def test_streams_tokens_then_saves_message(self, mock_stream, test_client, auth_headers, test_lesson, db_session, caplog):
+        async def chunks(*args, **kwargs):
+            for chunk in ["Budgeting ", "is ", "planning."]:
+                yield chunk
+        mock_stream.side_effect = chunks
+
+        with caplog.at_level("INFO", logger="ai_metrics"):
+            response = test_client.post("/api/ai/coach/stream", json={
+                "lesson_id": test_lesson.id,
+                "user_message": "What is budgeting?",
+            }, headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = _sse_events(response)
+        assert [e for e, _ in events] == ["token", "token", "token", "done"]
+        assert "".join(d["text"] for e, d in events if e == "token") == "Budgeting is planning."
+        assert events[-1][1]["message"]["content"] == "Budgeting is planning."
+        assert events[-1][1]["ttft_ms"] is not None
+        assert "'ttft_ms'" in caplog.text
+
+        from app.models import ChatMessage
+        saved = db_session.query(ChatMessage).order_by(ChatMessage.id).all()
+        assert [(m.role, m.content) for m in saved] == [
+            ("user", "What is budgeting?"),
+            ("assistant", "Budgeting is planning."),
+        ]
+
+    @patch("app.services.ai_service._stream_gemini")
+    def test_failure_before_first_token_streams_fallback(self, mock_stream, test_client, auth_headers, test_lesson):
+        async def broken(*args, **kwargs):
+            raise RuntimeError("API DOWN")
+            yield
+        mock_stream.side_effect = broken
+
+        response = test_client.post("/api/ai/coach/stream", json={
+            "lesson_id": test_lesson.id,
+            "user_message": "Help",
+        }, headers=auth_headers)
+
+        events = _sse_events(response)
+        assert "trouble connecting" in events[0][1]["text"]
+        assert events[-1][1]["error"] == "API DOWN"
+
+    def test_mock_backend_streams(self, test_client, auth_headers, test_lesson):
+        response = test_client.post("/api/ai/coach/stream", json={
+            "lesson_id": test_lesson.id,
+            "user_message": "Hi",
+        }, headers=auth_headers)
+        events = _sse_events(response)
+        assert len([e for e, _ in events if e == "token"]) > 1
+        assert events[-1][0] == "done"
+
+    def test_invalid_lesson_fails_before_stream(self, test_client, auth_headers):
+        response = test_client.post("/api/ai/coach/stream", json={
+            "lesson_id": 99999,
+            "user_message": "Hello",
+        }, headers=auth_headers)
+        assert response.status_code == 400
+
+
 class TestRegenerateEndpoint:
     """Test POST /ai/lesson-regenerate endpoint."""
 
@@ -2,23 +2,28 @@
 Tests for the AI service layer — prompt construction, caching, rate limiting.
 """
 import json
+from datetime import datetime
+
 import pytest
+from sqlalchemy import text
 from unittest.mock import patch, MagicMock
 
 from app.services.ai_service import (
     _params_hash,
     _clean_json,
     _parse_json,
-    _check_rate_limit,
-    _rate_limits,
-    RATE_LIMIT_MAX,
     coach_chat,
+    encode_history_cursor,
+    get_chat_history,
     regenerate_lesson,
     generate_life_example,
     dictionary_lookup,
 )
+from app.services import rate_limiter
 from app.services.prompt_registry import get_prompt, PROMPTS, LEVEL_DESCRIPTIONS
-from app.models.ai_models import DictionaryCache
+from app.services.rate_limiter import MemoryRateLimiter, RateLimitExceeded
+from app.models.ai_models import ChatMessage, DictionaryCache
+from app.models.lesson import Lesson
 
 
 class TestPromptRegistry:
@@ -103,42 +108,49 @@ class TestCacheHashing:
 
 
 class TestRateLimiter:
-    """Test rate limiting behavior."""
-
-    def setup_method(self):
-        """Clear rate limit state before each test."""
-        _rate_limits.clear()
-
-    def test_allows_first_call(self):
-        assert _check_rate_limit(user_id=999) is True
-
-    def test_allows_multiple_under_limit(self):
-        for _ in range(RATE_LIMIT_MAX - 1):
-            assert _check_rate_limit(user_id=998) is True
-
-    def test_blocks_when_exceeded(self):
-        for _ in range(RATE_LIMIT_MAX):
-            _check_rate_limit(user_id=997)
-        assert _check_rate_limit(user_id=997) is False
-
-    def test_different_users_independent(self):
-        for _ in range(RATE_LIMIT_MAX):
-            _check_rate_limit(user_id=996)
-        assert _check_rate_limit(user_id=996) is False
-        assert _check_rate_limit(user_id=995) is True  # different user
+    """Test the coach limit as the service enforces it."""
+
+    @pytest.fixture
+    def limiter(self):
+        return MemoryRateLimiter()
+
+    @pytest.fixture
+    def coach_limit(self):
+        return rate_limiter.get_limits()["coach"].capacity
+
+    @pytest.mark.asyncio
+    async def test_allows_up_to_capacity(self, limiter, coach_limit):
+        for _ in range(coach_limit):
+            await rate_limiter.enforce("coach", 998, limiter)
+
+    @pytest.mark.asyncio
+    async def test_blocks_when_exceeded(self, limiter, coach_limit):
+        for _ in range(coach_limit):
+            await rate_limiter.enforce("coach", 997, limiter)
+        with pytest.raises(RateLimitExceeded) as exc:
+            await rate_limiter.enforce("coach", 997, limiter)
+        assert exc.value.retry_after > 0
+
+    @pytest.mark.asyncio
+    async def test_different_users_independent(self, limiter, coach_limit):
+        for _ in range(coach_limit):
+            await rate_limiter.enforce("coach", 996, limiter)
+        with pytest.raises(RateLimitExceeded):
+            await rate_limiter.enforce("coach", 996, limiter)
+        await rate_limiter.enforce("coach", 995, limiter)  # different user
 
 
 class TestCoachChat:
     """Test coach chat service with mocked Gemini."""
 
+    @pytest.mark.asyncio
     @patch("app.services.ai_service._call_gemini")
-    def test_coach_chat_success(self, mock_gemini, db_session, test_user, test_lesson):
+    async def test_coach_chat_success(self, mock_gemini, async_db_session, test_user, test_lesson):
         mock_gemini.return_value = "Great question! Budgeting helps you track where your money goes."
-        _rate_limits.clear()
 
         user, _ = test_user
-        result = coach_chat(
-            db=db_session,
+        result = await coach_chat(
+            db=async_db_session,
             user_id=user.id,
             lesson_id=test_lesson.id,
             user_message="What is budgeting?",
@@ -147,18 +159,20 @@ class TestCoachChat:
         )
 
         assert result.reply == "Great question! Budgeting helps you track where your money goes."
-        assert len(result.history) >= 2  # user msg + assistant msg
-        assert result.history[-2].role == "user"
-        assert result.history[-1].role == "assistant"
+        # Only this exchange comes back; older messages are paged separately
+        assert [m.role for m in result.messages] == ["user", "assistant"]
+        assert result.messages[1].content == result.reply
+        assert result.messages[0].created_at is not None
+        assert result.history_cursor
 
+    @pytest.mark.asyncio
     @patch("app.services.ai_service._call_gemini")
-    def test_coach_chat_fallback_on_error(self, mock_gemini, db_session, test_user, test_lesson):
+    async def test_coach_chat_fallback_on_error(self, mock_gemini, async_db_session, test_user, test_lesson):
         mock_gemini.side_effect = RuntimeError("API DOWN")
-        _rate_limits.clear()
 
         user, _ = test_user
-        result = coach_chat(
-            db=db_session,
+        result = await coach_chat(
+            db=async_db_session,
             user_id=user.id,
             lesson_id=test_lesson.id,
             user_message="Help me",
@@ -168,23 +182,86 @@ class TestCoachChat:
         # Should return graceful fallback, not raise
         assert "trouble connecting" in result.reply.lower() or len(result.reply) > 0
 
-    def test_coach_chat_invalid_lesson(self, db_session, test_user):
-        _rate_limits.clear()
+    @pytest.mark.asyncio
+    async def test_coach_chat_invalid_lesson(self, async_db_session, test_user):
         user, _ = test_user
         with pytest.raises(ValueError, match="not found"):
-            coach_chat(
-                db=db_session,
+            await coach_chat(
+                db=async_db_session,
                 user_id=user.id,
                 lesson_id=99999,
                 user_message="Hi",
             )
 
 
+class TestChatHistory:
+    """Keyset pagination of coach history."""
+
+    @pytest.fixture
+    def conversation(self, db_session, test_user, test_lesson):
+        user, _ = test_user
+        # Same timestamp for every row: the id must break ties
+        created_at = datetime(2026, 1, 1, 12, 0, 0)
+        db_session.add_all([
+            ChatMessage(user_id=user.id, lesson_id=test_lesson.id, role="user" if i % 2 == 0 else "assistant",
+                        content=f"m{i}", created_at=created_at)
+            for i in range(25)
+        ])
+        db_session.commit()
+        return user, test_lesson
+
+    @pytest.mark.asyncio
+    async def test_pages_walk_back_without_gaps(self, async_db_session, conversation):
+        user, lesson = conversation
+        seen = []
+        cursor = None
+        while True:
+            page = await get_chat_history(async_db_session, user.id, lesson.id, before=cursor, limit=10)
+            seen = [m.content for m in page.messages] + seen
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        assert seen == [f"m{i}" for i in range(25)]
+
+    @pytest.mark.asyncio
+    async def test_first_page_is_newest(self, async_db_session, conversation):
+        user, lesson = conversation
+        page = await get_chat_history(async_db_session, user.id, lesson.id, limit=3)
+        assert [m.content for m in page.messages] == ["m22", "m23", "m24"]
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor(self, async_db_session, conversation):
+        user, lesson = conversation
+        with pytest.raises(ValueError, match="cursor"):
+            await get_chat_history(async_db_session, user.id, lesson.id, before="not-a-cursor")
+
+    @pytest.mark.asyncio
+    async def test_cursor_from_another_lesson_is_rejected(self, async_db_session, db_session, conversation):
+        user, lesson = conversation
+        other = Lesson(level=1, module=1, lesson_number=2, title="Saving Basics", topic_key="saving_basics")
+        db_session.add(other)
+        db_session.commit()
+        db_session.add(ChatMessage(user_id=user.id, lesson_id=other.id, role="user", content="elsewhere"))
+        db_session.commit()
+
+        foreign = encode_history_cursor(db_session.query(ChatMessage).filter(ChatMessage.lesson_id == other.id).one().id)
+        with pytest.raises(ValueError, match="cursor"):
+            await get_chat_history(async_db_session, user.id, lesson.id, before=foreign)
+
+    def test_query_uses_history_index(self, db_session):
+        plan = db_session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM chat_messages WHERE user_id = 1 AND lesson_id = 1 "
+            "ORDER BY created_at DESC, id DESC LIMIT 21"
+        )).fetchall()
+        assert "ix_chat_messages_history" in str(plan)
+
+
 class TestDictionaryLookup:
     """Test dictionary lookup with caching."""
 
+    @pytest.mark.asyncio
     @patch("app.services.ai_service._call_gemini")
-    def test_dictionary_caches_result(self, mock_gemini, db_session, test_user, test_lesson):
+    async def test_dictionary_caches_result(self, mock_gemini, async_db_session, test_user, test_lesson):
         mock_gemini.return_value = json.dumps({
             "definition": "A budget is a financial plan",
             "example": "Making a monthly plan for income and expenses",
@@ -192,11 +269,10 @@ class TestDictionaryLookup:
                 {"question": "What is a budget?", "options": ["A plan", "A tax", "A loan", "A stock"], "correct_index": 0}
             ],
         })
-        _rate_limits.clear()
 
         user, _ = test_user
-        result = dictionary_lookup(
-            db=db_session,
+        result = await dictionary_lookup(
+            db=async_db_session,
             user_id=user.id,
             term="budget",
             lesson_id=test_lesson.id,
@@ -209,8 +285,8 @@ class TestDictionaryLookup:
 
         # Second call should use cache (not call Gemini)
         mock_gemini.reset_mock()
-        result2 = dictionary_lookup(
-            db=db_session,
+        result2 = await dictionary_lookup(
+            db=async_db_session,
             user_id=user.id,
             term="budget",
             lesson_id=test_lesson.id,
@@ -0,0 +1,204 @@
+"""
+Tests for the AI circuit breaker and the stale-content fallbacks it triggers.
+"""
+import json
+
+import pytest
+
+from app.models import DictionaryCache, RegeneratedContent
+from app.services import metrics
+from app.services.ai_client import AIBackend, AIBackendError, AIClient, get_ai_client
+from app.services.ai_service import COACH_FALLBACK_REPLY
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _breaker(clock, **kwargs):
+    options = dict(failure_rate=0.5, min_calls=4, window_seconds=30, slow_call_seconds=5, open_seconds=10)
+    options.update(kwargs)
+    return CircuitBreaker(clock=clock, **options)
+
+
+def _open_breaker():
+    breaker = CircuitBreaker(min_calls=1, open_seconds=60)
+    breaker.record(breaker.acquire(), False)
+    assert breaker.state == OPEN
+    return breaker
+
+
+class TestCircuitBreaker:
+    """State changes: closed -> open -> half-open -> closed/open."""
+
+    def setup_method(self):
+        metrics.reset()
+
+    def test_opens_on_failure_rate(self):
+        breaker = _breaker(FakeClock())
+        for ok in (True, False, True):
+            breaker.record(breaker.acquire(), ok)
+        assert breaker.state == CLOSED  # too few calls to judge
+
+        breaker.record(breaker.acquire(), False)
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError) as exc:
+            breaker.acquire()
+        assert exc.value.retry_after == 10
+        assert metrics.get_counter("ai_breaker.rejected") == 1
+        assert metrics.get_gauge("ai_breaker.state") == 2
+
+    def test_slow_calls_count_as_failures(self):
+        breaker = _breaker(FakeClock())
+        for _ in range(4):
+            breaker.record(breaker.acquire(), True, latency=6)
+        assert breaker.state == OPEN
+
+    def test_old_outcomes_leave_the_window(self):
+        clock = FakeClock()
+        breaker = _breaker(clock)
+        for _ in range(3):
+            breaker.record(breaker.acquire(), False)
+        clock.now += 31
+        breaker.record(breaker.acquire(), False)
+        assert breaker.state == CLOSED
+
+    def test_successful_probe_closes(self):
+        clock = FakeClock()
+        breaker = _breaker(clock, min_calls=1)
+        breaker.record(breaker.acquire(), False)
+        clock.now += 10
+
+        probe = breaker.acquire()
+        assert probe is True and breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.acquire()  # one probe at a time
+
+        breaker.record(probe, True, latency=0.1)
+        assert breaker.state == CLOSED
+        assert breaker.acquire() is False
+        assert metrics.get_counter("ai_breaker.closed") == 1
+
+    def test_failed_probe_reopens(self):
+        clock = FakeClock()
+        breaker = _breaker(clock, min_calls=1)
+        breaker.record(breaker.acquire(), False)
+        clock.now += 10
+        breaker.record(breaker.acquire(), False)
+        assert breaker.state == OPEN
+        assert breaker.retry_after() == 10
+        assert metrics.get_counter("ai_breaker.opened") == 2
+
+    def test_probe_without_verdict_frees_the_slot(self):
+        clock = FakeClock()
+        breaker = _breaker(clock, min_calls=1)
+        breaker.record(breaker.acquire(), False)
+        clock.now += 10
+        breaker.record(breaker.acquire(), None)
+        assert breaker.state == HALF_OPEN
+        assert breaker.acquire() is True
+
+
+class DownBackend(AIBackend):
+    name = "down"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def generate(self, prompt, system_instruction=None):
+        self.calls += 1
+        raise AIBackendError("HTTP 503", retryable=True)
+
+
+class TestAIClientBreaker:
+    """The client stops calling a failing provider."""
+
+    @pytest.mark.asyncio
+    async def test_open_breaker_skips_the_backend(self):
+        backend = DownBackend()
+        client = AIClient(backend, max_concurrency=2, timeout=5, max_retries=0,
+                          breaker=CircuitBreaker(min_calls=3))
+        for _ in range(3):
+            with pytest.raises(AIBackendError):
+                await client.generate("p")
+
+        with pytest.raises(CircuitOpenError):
+            await client.generate("p")
+        with pytest.raises(CircuitOpenError):
+            [c async for c in client.stream("p")]
+        assert backend.calls == 3
+
+    @pytest.mark.asyncio
+    async def test_bad_requests_do_not_open_it(self):
+        class RejectingBackend(AIBackend):
+            async def generate(self, prompt, system_instruction=None):
+                raise AIBackendError("HTTP 400")
+
+        client = AIClient(RejectingBackend(), max_concurrency=1, timeout=5, breaker=CircuitBreaker(min_calls=1))
+        with pytest.raises(AIBackendError):
+            await client.generate("p")
+        assert client.breaker.state == CLOSED
+
+
+class TestStaleFallbacks:
+    """While the breaker is open, endpoints serve the nearest cached artifact."""
+
+    @pytest.fixture(autouse=True)
+    def open_circuit(self, monkeypatch):
+        metrics.reset()
+        monkeypatch.setattr(get_ai_client(), "breaker", _open_breaker())
+
+    def _regenerate(self, client, headers, lesson_id):
+        return client.post("/api/ai/lesson-regenerate", json={
+            "lesson_id": lesson_id,
+            "params": {"difficulty": "easier"},
+        }, headers=headers)
+
+    def test_regenerate_serves_cached_variant(self, test_client, auth_headers, test_lesson, db_session):
+        db_session.add(RegeneratedContent(
+            lesson_id=test_lesson.id, user_level=2, params_hash="other",
+            content_json=json.dumps({"lesson_text": "Older variant", "flashcards": [], "quiz": []}),
+        ))
+        db_session.commit()
+
+        response = self._regenerate(test_client, auth_headers, test_lesson.id)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["lesson_text"] == "Older variant"
+        assert data["stale"] is True
+        assert metrics.get_counter("ai_service.stale.regenerate") == 1
+
+    def test_regenerate_falls_back_to_base_lesson(self, test_client, auth_headers, test_lesson):
+        response = self._regenerate(test_client, auth_headers, test_lesson.id)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["lesson_text"].startswith("# Budgeting Basics")
+        assert data["flashcards"][0]["question"] == "What is a budget?"
+        assert data["stale"] is True
+
+    def test_regenerate_without_any_content_is_503(self, test_client, auth_headers, lesson_tree):
+        response = self._regenerate(test_client, auth_headers, lesson_tree[0].id)
+        assert response.status_code == 503
+        assert "retry-after" in response.headers
+
+    def test_dictionary_serves_other_level(self, test_client, auth_headers, db_session):
+        db_session.add(DictionaryCache(term="budget", user_level=3, definition="A plan", example="Rent first"))
+        db_session.commit()
+
+        response = test_client.post("/api/ai/dictionary", json={"term": "Budget", "user_level": 1}, headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["definition"] == "A plan"
+        assert response.json()["stale"] is True
+
+    def test_coach_answers_with_fallback_at_once(self, test_client, auth_headers, test_lesson):
+        response = test_client.post("/api/ai/coach", json={
+            "lesson_id": test_lesson.id,
+            "user_message": "Hi",
+        }, headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["reply"] == COACH_FALLBACK_REPLY
@@ -0,0 +1,75 @@
+"""
+Tests for conditional GET (ETag / If-None-Match) on read endpoints.
+"""
+from app.models import User
+from app.services import catalog, metrics, versions
+from app.services.auth import AuthService
+
+
+def _revalidate(client, headers, url, etag):
+    return client.get(url, headers={**headers, "If-None-Match": etag})
+
+
+class TestConditionalGet:
+    """Validators come from version counters; a match skips the handler."""
+
+    def setup_method(self):
+        metrics.reset()
+
+    def test_lessons_change_with_progress_and_catalog(self, test_client, auth_headers, lesson_tree, test_lesson):
+        first = test_client.get("/api/lessons", headers=auth_headers)
+        etag = first.headers["etag"]
+        assert first.headers["cache-control"] == "private, no-cache"
+
+        unchanged = _revalidate(test_client, auth_headers, "/api/lessons", etag)
+        assert unchanged.status_code == 304
+        assert unchanged.content == b""
+        assert metrics.get_counter("http_cache.not_modified") == 1
+
+        test_client.post(f"/api/progress/{lesson_tree[0].id}/complete", headers=auth_headers)
+        after_progress = _revalidate(test_client, auth_headers, "/api/lessons", etag)
+        assert after_progress.status_code == 200
+        etag = after_progress.headers["etag"]
+
+        test_client.delete(f"/api/lessons/{test_lesson.id}/content", headers=auth_headers)
+        assert _revalidate(test_client, auth_headers, "/api/lessons", etag).status_code == 200
+
+    def test_catalog_etag_is_shared_across_processes(self, test_client, auth_headers, lesson_tree, db_session):
+        etag = test_client.get("/api/lessons", headers=auth_headers).headers["etag"]
+
+        # A fresh worker computes the same ETag without loading the catalog
+        catalog.invalidate_catalog()
+        assert _revalidate(test_client, auth_headers, "/api/lessons", etag).status_code == 304
+
+        # A write elsewhere (a CLI, another worker) only moves the shared version
+        db_session.execute(versions.shared_version_bump(db_session.bind.dialect.name, versions.CATALOG))
+        db_session.commit()
+        assert _revalidate(test_client, auth_headers, "/api/lessons", etag).status_code == 200
+
+    def test_summary(self, test_client, auth_headers, lesson_tree):
+        etag = test_client.get("/api/progress/summary", headers=auth_headers).headers["etag"]
+        assert _revalidate(test_client, auth_headers, "/api/progress/summary", etag).status_code == 304
+
+        test_client.post(f"/api/progress/{lesson_tree[0].id}/complete", headers=auth_headers)
+        changed = _revalidate(test_client, auth_headers, "/api/progress/summary", etag)
+        assert changed.status_code == 200
+        assert changed.json()["lessons_completed"] == 1
+
+    def test_habits_and_static_data(self, test_client, auth_headers):
+        etag = test_client.get("/api/game/habits", headers=auth_headers).headers["etag"]
+        assert _revalidate(test_client, auth_headers, "/api/game/habits", etag).status_code == 304
+
+        test_client.post("/api/game/habits", json={"habit_name": "Save"}, headers=auth_headers)
+        assert _revalidate(test_client, auth_headers, "/api/game/habits", etag).status_code == 200
+
+        types = test_client.get("/api/game/traps/types", headers=auth_headers)
+        assert _revalidate(test_client, auth_headers, "/api/game/traps/types", types.headers["etag"]).status_code == 304
+
+    def test_etag_is_per_user(self, test_client, auth_headers, lesson_tree, db_session):
+        etag = test_client.get("/api/lessons", headers=auth_headers).headers["etag"]
+
+        other_user = User(name="Other", email="other@example.com", password_hash="x")
+        db_session.add(other_user)
+        db_session.commit()
+        other = {"Authorization": f"Bearer {AuthService().create_access_token({'sub': str(other_user.id)})}"}
+        assert _revalidate(test_client, other, "/api/lessons", etag).status_code == 200
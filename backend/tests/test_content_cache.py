@@ -0,0 +1,83 @@
+"""
+Tests for the serialized lesson content cache and its ETags.
+"""
+from app.models import LessonContent
+from app.services import content_cache, metrics
+from app.services.http_cache import etag_matches
+
+
+class TestEtagMatching:
+    def test_if_none_match_forms(self):
+        assert etag_matches('"abc"', '"abc"')
+        assert etag_matches('W/"abc"', '"abc"')
+        assert etag_matches('"x", "abc"', '"abc"')
+        assert etag_matches("*", '"abc"')
+        assert not etag_matches('"x"', '"abc"')
+        assert not etag_matches(None, '"abc"')
+
+
+class TestLessonContentCache:
+    """GET /lessons/{id}/content serves prebuilt bytes with an ETag."""
+
+    def setup_method(self):
+        metrics.reset()
+
+    def _get(self, client, headers, lesson_id, etag=None):
+        if etag:
+            headers = {**headers, "If-None-Match": etag}
+        return client.get(f"/api/lessons/{lesson_id}/content", headers=headers)
+
+    def test_body_is_built_once_and_revalidates(self, test_client, auth_headers, test_lesson):
+        first = self._get(test_client, auth_headers, test_lesson.id)
+        assert first.status_code == 200
+        assert first.json()["flashcards"][0]["question"] == "What is a budget?"
+        assert first.headers["cache-control"] == "private, no-cache"
+        etag = first.headers["etag"]
+
+        second = self._get(test_client, auth_headers, test_lesson.id)
+        assert second.content == first.content
+        assert metrics.get_counter("content_cache.builds") == 1
+        assert metrics.get_counter("content_cache.hits") == 1
+
+        unchanged = self._get(test_client, auth_headers, test_lesson.id, etag=etag)
+        assert unchanged.status_code == 304
+        assert unchanged.content == b""
+        assert unchanged.headers["etag"] == etag
+
+    def test_body_is_persisted_for_other_workers(self, test_client, auth_headers, test_lesson, db_session):
+        first = self._get(test_client, auth_headers, test_lesson.id)
+        db_session.expire_all()
+        row = db_session.query(LessonContent).filter_by(lesson_id=test_lesson.id).one()
+        assert row.response_etag == first.headers["etag"]
+
+        content_cache.clear()  # a fresh worker
+        again = self._get(test_client, auth_headers, test_lesson.id)
+        assert again.content == first.content
+        assert metrics.get_counter("content_cache.stored_hits") == 1
+
+    def test_regenerate_and_delete_invalidate(self, test_client, auth_headers, test_lesson):
+        etag = self._get(test_client, auth_headers, test_lesson.id).headers["etag"]
+
+        test_client.post(f"/api/lessons/{test_lesson.id}/regenerate", headers=auth_headers)
+        regenerated = self._get(test_client, auth_headers, test_lesson.id, etag=etag)
+        assert regenerated.status_code == 200
+        assert regenerated.headers["etag"] != etag
+
+        test_client.delete(f"/api/lessons/{test_lesson.id}/content", headers=auth_headers)
+        assert self._get(test_client, auth_headers, test_lesson.id).status_code == 404
+
+    def test_change_by_another_worker_is_noticed(self, test_client, auth_headers, test_lesson, db_session):
+        self._get(test_client, auth_headers, test_lesson.id)
+
+        # Replaced without this process's invalidate(); SQLite may even reuse the id
+        db_session.query(LessonContent).filter_by(lesson_id=test_lesson.id).delete()
+        db_session.add(LessonContent(lesson_id=test_lesson.id, lesson_text="New text", flashcards_json="[]", quiz_json="[]"))
+        db_session.commit()
+
+        assert self._get(test_client, auth_headers, test_lesson.id).json()["lesson_text"] == "New text"
+
+    def test_generate_returns_cached_body(self, test_client, auth_headers, test_lesson):
+        content = self._get(test_client, auth_headers, test_lesson.id)
+        generated = test_client.post(f"/api/lessons/{test_lesson.id}/generate", headers=auth_headers)
+        assert generated.status_code == 200
+        assert generated.content == content.content
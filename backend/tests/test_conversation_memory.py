@@ -0,0 +1,148 @@
+"""
+Tests for the token estimator and rolling coach conversation summaries.
+"""
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import select
+
+from app.config import get_settings
+from app.models import ChatMessage, ConversationSummary, Job, LessonContent
+from app.services import conversation_memory
+from app.services.ai_service import coach_chat
+from app.services.token_budget import TokenBudget, estimate_tokens, truncate_to_tokens
+
+settings = get_settings()
+
+
+class TestTokenBudget:
+    """Estimates and truncation."""
+
+    def test_estimate_grows_with_text(self):
+        assert estimate_tokens("") == 0
+        assert 0 < estimate_tokens("budget") < estimate_tokens("budget " * 20)
+
+    def test_cyrillic_costs_more_per_character(self):
+        assert estimate_tokens("бюджет" * 10) > estimate_tokens("budget" * 10)
+
+    def test_truncate_fits_and_cuts_at_word(self):
+        text = "save ten percent of every paycheck " * 50
+        cut = truncate_to_tokens(text, 20)
+        assert estimate_tokens(cut) <= 20
+        assert text.startswith(cut)
+        assert not cut.endswith(" ")
+
+    def test_take_charges_budget(self):
+        budget = TokenBudget(30)
+        budget.charge("fixed instructions")
+        taken = budget.take("word " * 100)
+        assert budget.used <= 30
+        assert taken and budget.remaining <= 1
+
+
+def _add_messages(db_session, user_id, lesson_id, count):
+    for i in range(count):
+        db_session.add(ChatMessage(
+            user_id=user_id, lesson_id=lesson_id,
+            role="user" if i % 2 == 0 else "assistant",
+            content=f"question {i}" if i % 2 == 0 else f"answer {i}",
+        ))
+    db_session.commit()
+
+
+class TestConversationMemory:
+    """Loading, summarizing and rendering conversation context."""
+
+    @pytest.mark.asyncio
+    async def test_summary_folds_old_messages_and_keeps_recent(self, async_db_session, db_session, test_user, test_lesson):
+        user, _ = test_user
+        due_at = settings.COACH_SUMMARY_EVERY_TURNS * 2 + settings.COACH_RECENT_MESSAGES
+        _add_messages(db_session, user.id, test_lesson.id, due_at - 1)
+
+        context = await conversation_memory.load_context(async_db_session, user.id, test_lesson.id)
+        assert not context.summary_due()
+        assert context.summary_due(new_messages=1)
+        assert not await conversation_memory.update_summary(async_db_session, user.id, test_lesson.id)
+
+        _add_messages(db_session, user.id, test_lesson.id, 1)
+        assert await conversation_memory.update_summary(async_db_session, user.id, test_lesson.id)
+
+        context = await conversation_memory.load_context(async_db_session, user.id, test_lesson.id)
+        assert "question 0" in context.summary
+        assert len(context.recent) == settings.COACH_RECENT_MESSAGES
+        assert not context.summary_due()
+
+        row = await async_db_session.scalar(select(ConversationSummary))
+        assert row.messages_summarized == due_at - settings.COACH_RECENT_MESSAGES
+
+    @pytest.mark.asyncio
+    async def test_no_transaction_is_held_during_the_model_call(
+        self, async_db_session, async_session_factory, db_session, test_user, test_lesson
+    ):
+        user, _ = test_user
+        _add_messages(db_session, user.id, test_lesson.id, settings.COACH_SUMMARY_EVERY_TURNS * 2 + settings.COACH_RECENT_MESSAGES)
+
+        class SlowModel:
+            async def generate(self, prompt, lane):
+                assert not async_db_session.in_transaction()
+                # Other writers (chat, progress, jobs) carry on meanwhile
+                async with async_session_factory() as other:
+                    other.add(ChatMessage(user_id=user.id, lesson_id=test_lesson.id, role="user", content="meanwhile"))
+                    await other.commit()
+                return "Summary so far"
+
+        with patch.object(conversation_memory, "get_ai_client", lambda: SlowModel()):
+            assert await conversation_memory.update_summary(async_db_session, user.id, test_lesson.id)
+
+        row = await async_db_session.scalar(select(ConversationSummary))
+        assert row.summary == "Summary so far"
+
+    @pytest.mark.asyncio
+    async def test_render_respects_limit(self, async_db_session, db_session, test_user, test_lesson):
+        user, _ = test_user
+        _add_messages(db_session, user.id, test_lesson.id, 6)
+        context = await conversation_memory.load_context(async_db_session, user.id, test_lesson.id)
+
+        budget = TokenBudget(1000)
+        text = context.render(budget, max_tokens=8)
+        assert estimate_tokens(text) <= 8
+        assert budget.used == estimate_tokens(text)
+        # Newest messages win
+        assert "answer 5" in text and "question 0" not in text
+
+
+class TestCoachPromptBudget:
+    """coach_chat keeps its prompt in budget and schedules summaries."""
+
+    @pytest.mark.asyncio
+    @patch("app.services.ai_service._call_gemini")
+    async def test_prompt_fits_budget(self, mock_gemini, async_db_session, db_session, test_user, test_lesson):
+        mock_gemini.return_value = "ok"
+        user, _ = test_user
+        content = db_session.query(LessonContent).filter_by(lesson_id=test_lesson.id).one()
+        content.lesson_text = "Budgeting means planning every dollar. " * 2000
+        db_session.commit()
+        _add_messages(db_session, user.id, test_lesson.id, 6)
+
+        await coach_chat(db=async_db_session, user_id=user.id, lesson_id=test_lesson.id, user_message="How do I start?")
+
+        conversation = mock_gemini.call_args.args[0]
+        system_prompt = mock_gemini.call_args.kwargs["system_instruction"]
+        assert estimate_tokens(conversation) + estimate_tokens(system_prompt) <= settings.COACH_PROMPT_TOKEN_BUDGET
+        assert conversation.endswith("Student: How do I start?\n\nCoach:")
+        assert "answer 5" in conversation
+
+    @pytest.mark.asyncio
+    @patch("app.services.ai_service._call_gemini")
+    async def test_summary_job_is_enqueued_once_when_due(self, mock_gemini, async_db_session, db_session, test_user, test_lesson):
+        mock_gemini.return_value = "ok"
+        user, _ = test_user
+        due_at = settings.COACH_SUMMARY_EVERY_TURNS * 2 + settings.COACH_RECENT_MESSAGES
+        _add_messages(db_session, user.id, test_lesson.id, due_at - 2)
+
+        for _ in range(2):
+            await coach_chat(db=async_db_session, user_id=user.id, lesson_id=test_lesson.id, user_message="More?")
+
+        jobs = (await async_db_session.scalars(select(Job).where(Job.kind == "coach_summary"))).all()
+        assert len(jobs) == 1
+        assert jobs[0].status == "queued"
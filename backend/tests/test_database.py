@@ -0,0 +1,21 @@
+"""
+Tests for the async database URL mapping.
+"""
+from app.database import get_async_url
+
+
+class TestAsyncUrl:
+    """Sync URLs map onto their asyncio drivers."""
+
+    def test_sqlite_uses_aiosqlite(self):
+        assert get_async_url("sqlite:///./finance.db") == "sqlite+aiosqlite:///./finance.db"
+
+    def test_postgres_uses_asyncpg(self):
+        assert get_async_url("postgresql://u:p@host/db") == "postgresql+asyncpg://u:p@host/db"
+
+    def test_postgres_sslmode_becomes_ssl(self):
+        url = get_async_url("postgresql://u:p@host/db?sslmode=require")
+        assert url == "postgresql+asyncpg://u:p@host/db?ssl=require"
+
+    def test_async_url_unchanged(self):
+        assert get_async_url("sqlite+aiosqlite:///x.db") == "sqlite+aiosqlite:///x.db"
@@ -0,0 +1,68 @@
+"""
+Tests for duel endpoints — listings, summaries and the detail view.
+"""
+from app.models import Duel, User
+from app.services.auth import AuthService
+
+
+def _add_user(db_session, name):
+    user = User(name=name, email=f"{name.lower()}@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.commit()
+    return user, {"Authorization": f"Bearer {AuthService().create_access_token({'sub': str(user.id)})}"}
+
+
+class TestDuelListings:
+    """Test /game/duels/my and /game/duels/my/summary."""
+
+    def test_names_and_questions(self, test_client, auth_headers, db_session):
+        _, rival_headers = _add_user(db_session, "Rival")
+        code = test_client.post("/api/game/duels/create", json={"level": 2}, headers=auth_headers).json()["invite_code"]
+        joined = test_client.post("/api/game/duels/join", json={"invite_code": code}, headers=rival_headers).json()
+        assert (joined["challenger_name"], joined["opponent_name"]) == ("Test User", "Rival")
+
+        full = test_client.get("/api/game/duels/my", headers=auth_headers).json()
+        assert full[0]["opponent_name"] == "Rival"
+        assert full[0]["questions_json"]
+
+        summary = test_client.get("/api/game/duels/my/summary", headers=rival_headers).json()
+        assert summary[0]["challenger_name"] == "Test User"
+        assert "questions_json" not in summary[0]
+
+    def test_query_count_does_not_grow_with_duels(self, test_client, auth_headers, test_user, db_session, query_counter):
+        user, _ = test_user
+        rival, _ = _add_user(db_session, "Rival")
+
+        def count_queries(path):
+            query_counter.clear()
+            assert test_client.get(path, headers=auth_headers).status_code == 200
+            return len(query_counter)
+
+        db_session.add(Duel(challenger_id=user.id, opponent_id=rival.id, status="active", questions_json="[]"))
+        db_session.commit()
+        test_client.get("/api/game/duels/my", headers=auth_headers)  # warm the identity cache
+        assert count_queries("/api/game/duels/my") == 1
+
+        db_session.add_all([
+            Duel(challenger_id=rival.id, opponent_id=user.id, status="active", questions_json="[]") for _ in range(9)
+        ])
+        db_session.commit()
+        assert count_queries("/api/game/duels/my") == 1
+        assert count_queries("/api/game/duels/my/summary") == 1
+
+
+class TestDuelDetail:
+    """Test GET /game/duels/{id}."""
+
+    def test_participants_get_questions(self, test_client, auth_headers, db_session):
+        duel = test_client.post("/api/game/duels/create", json={"level": 1}, headers=auth_headers).json()
+
+        response = test_client.get(f"/api/game/duels/{duel['id']}", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["questions_json"] == duel["questions_json"]
+
+        _, stranger_headers = _add_user(db_session, "Stranger")
+        assert test_client.get(f"/api/game/duels/{duel['id']}", headers=stranger_headers).status_code == 403
+
+    def test_missing_duel(self, test_client, auth_headers):
+        assert test_client.get("/api/game/duels/999", headers=auth_headers).status_code == 404
@@ -0,0 +1,99 @@
+"""
+Tests for the identity cache and token-carried identity claims.
+"""
+import time
+from unittest.mock import patch
+
+from app.models import User
+from app.services import metrics
+from app.services.auth import AuthService
+from app.services.identity_cache import IdentityCache
+
+
+def _user(user_id: int, name: str = "Cached") -> User:
+    return User(id=user_id, name=name, email=f"u{user_id}@example.com", bio=None, avatar_style="default")
+
+
+class TestIdentityCache:
+    """LRU / TTL behaviour of the cache itself."""
+
+    def setup_method(self):
+        metrics.reset()
+
+    def test_hit_returns_detached_copy(self):
+        cache = IdentityCache(max_size=4, ttl_seconds=60)
+        cache.put(_user(1))
+
+        first = cache.get(1)
+        first.bio = "changed"
+        assert cache.get(1).bio is None
+        assert metrics.get_counter("identity_cache.hits") == 2
+        assert metrics.get_gauge("identity_cache.hit_rate") == 1.0
+
+    def test_lru_eviction(self):
+        cache = IdentityCache(max_size=2, ttl_seconds=60)
+        cache.put(_user(1))
+        cache.put(_user(2))
+        cache.get(1)  # 2 is now least recently used
+        cache.put(_user(3))
+
+        assert cache.get(2) is None
+        assert cache.get(1) is not None
+        assert metrics.get_counter("identity_cache.evictions") == 1
+
+    def test_ttl_expiry(self):
+        cache = IdentityCache(max_size=4, ttl_seconds=30)
+        cache.put(_user(1))
+        with patch("app.services.identity_cache.time.monotonic", return_value=time.monotonic() + 31):
+            assert cache.get(1) is None
+        assert metrics.get_counter("identity_cache.expirations") == 1
+        assert len(cache) == 0
+
+
+class TestCurrentUserCaching:
+    """get_current_user skips the users query on a warm cache."""
+
+    def test_second_request_skips_user_query(self, test_client, auth_headers, query_counter):
+        test_client.get("/api/auth/me", headers=auth_headers)
+        query_counter.clear()
+
+        response = test_client.get("/api/auth/me", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["email"] == "test@example.com"
+        assert query_counter == []
+
+    def test_update_profile_invalidates(self, test_client, auth_headers):
+        assert test_client.get("/api/social/me", headers=auth_headers).json()["bio"] is None
+
+        response = test_client.patch("/api/social/me", json={"bio": "Saving up"}, headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["bio"] == "Saving up"
+
+        assert test_client.get("/api/social/me", headers=auth_headers).json()["bio"] == "Saving up"
+
+
+class TestTokenIdentityClaims:
+    """With TOKEN_IDENTITY_CLAIMS, read-only endpoints never touch users."""
+
+    def test_read_only_endpoint_skips_users(self, test_client, test_user, lesson_tree, query_counter):
+        user, _ = test_user
+        with patch("app.services.auth.settings.TOKEN_IDENTITY_CLAIMS", True):
+            token = AuthService.create_access_token(AuthService.identity_claims(user))
+            headers = {"Authorization": f"Bearer {token}"}
+            query_counter.clear()
+
+            response = test_client.get("/api/lessons", headers=headers)
+
+        assert response.status_code == 200
+        assert not any("FROM users" in statement for statement in query_counter)
+
+    def test_claims_ignored_when_disabled(self, test_client, test_user, lesson_tree, query_counter):
+        user, _ = test_user
+        with patch("app.services.auth.settings.TOKEN_IDENTITY_CLAIMS", True):
+            token = AuthService.create_access_token(AuthService.identity_claims(user))
+        query_counter.clear()
+
+        response = test_client.get("/api/lessons", headers={"Authorization": f"Bearer {token}"})
+
+        assert response.status_code == 200
+        assert any("FROM users" in statement for statement in query_counter)
@@ -0,0 +1,212 @@
+"""
+Tests for the durable job queue, 202 responses and job status endpoints.
+"""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.models import Job, LessonContent, User
+from app.services import jobs, metrics
+from app.services.auth import AuthService
+
+
+async def _run_until_done(pool, db, job_ids, timeout=5.0):
+    pool.start()
+    try:
+        for job_id in job_ids:
+            await jobs.wait_for_job(db, job_id, timeout)
+    finally:
+        await pool.stop()
+
+
+@pytest.fixture
+def pool(async_session_factory):
+    return jobs.JobWorkerPool(async_session_factory, concurrency=1, poll_seconds=0.05, retry_base_seconds=0.05)
+
+
+@pytest.fixture
+def job_workers(monkeypatch):
+    """Let the app start its job workers (tests run without them by default)."""
+    monkeypatch.setattr(jobs.settings, "JOB_WORKERS", 2)
+    monkeypatch.setattr(jobs.settings, "JOB_POLL_SECONDS", 0.05)
+
+
+class TestJobWorkerPool:
+    """Claiming, retries and lease recovery."""
+
+    def setup_method(self):
+        metrics.reset()
+
+    @pytest.mark.asyncio
+    async def test_higher_priority_runs_first(self, pool, async_db_session):
+        order = []
+
+        @jobs.job_handler("test_record")
+        async def record(session_factory, payload):
+            order.append(payload["name"])
+            return payload["name"]
+
+        low = (await jobs.enqueue(async_db_session, "test_record", {"name": "low"}, priority=jobs.PRIORITY_BACKGROUND)).id
+        high = (await jobs.enqueue(async_db_session, "test_record", {"name": "high"})).id
+
+        await _run_until_done(pool, async_db_session, [low, high])
+
+        assert order == ["high", "low"]
+        done = await jobs.wait_for_job(async_db_session, low, 0)
+        assert done.status == "succeeded"
+        assert json.loads(done.result_json) == "low"
+        assert done.locked_by is None
+
+    @pytest.mark.asyncio
+    async def test_transient_failures_are_retried_with_backoff(self, pool, async_db_session):
+        calls = []
+
+        @jobs.job_handler("test_flaky")
+        async def flaky(session_factory, payload):
+            calls.append(datetime.utcnow())
+            if len(calls) < 3:
+                raise RuntimeError("model busy")
+            return {"ok": True}
+
+        job = await jobs.enqueue(async_db_session, "test_flaky", {})
+        await _run_until_done(pool, async_db_session, [job.id])
+
+        done = await jobs.wait_for_job(async_db_session, job.id, 0)
+        assert done.status == "succeeded"
+        assert done.attempts == 3
+        assert metrics.get_counter("jobs.retried") == 2
+        # Second retry waits twice as long as the first
+        assert calls[2] - calls[1] >= timedelta(seconds=0.1)
+
+    @pytest.mark.asyncio
+    async def test_value_errors_fail_without_retry(self, pool, async_db_session):
+        @jobs.job_handler("test_bad_input")
+        async def bad_input(session_factory, payload):
+            raise ValueError("Lesson 99 not found")
+
+        job = await jobs.enqueue(async_db_session, "test_bad_input", {})
+        await _run_until_done(pool, async_db_session, [job.id])
+
+        done = await jobs.wait_for_job(async_db_session, job.id, 0)
+        assert done.status == "failed"
+        assert done.attempts == 1
+        assert done.error == "Lesson 99 not found"
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_is_reclaimed(self, pool, async_db_session):
+        @jobs.job_handler("test_orphan")
+        async def orphan(session_factory, payload):
+            return "recovered"
+
+        job = Job(
+            kind="test_orphan", payload_json="{}", status="running", priority=0,
+            attempts=1, max_attempts=3, run_after=datetime.utcnow(),
+            locked_by="dead-worker", locked_until=datetime.utcnow() - timedelta(seconds=1),
+        )
+        async_db_session.add(job)
+        await async_db_session.commit()
+
+        await _run_until_done(pool, async_db_session, [job.id])
+
+        done = await jobs.wait_for_job(async_db_session, job.id, 0)
+        assert done.status == "succeeded"
+        assert done.attempts == 2
+
+    @pytest.mark.asyncio
+    async def test_expired_last_attempt_fails(self, pool, async_db_session):
+        job = Job(
+            kind="test_orphan", payload_json="{}", status="running", priority=0,
+            attempts=3, max_attempts=3, run_after=datetime.utcnow(),
+            locked_by="dead-worker", locked_until=datetime.utcnow() - timedelta(seconds=1),
+        )
+        async_db_session.add(job)
+        await async_db_session.commit()
+
+        assert await pool._claim() is None
+        assert await jobs.sweep(async_db_session, retention_days=7) == {"expired": 1, "deleted": 0}
+
+        done = await jobs.wait_for_job(async_db_session, job.id, 0)
+        assert (done.status, done.attempts, done.locked_by) == ("failed", 3, None)
+        assert metrics.get_counter("jobs.lease_expired") == 1
+
+    @pytest.mark.asyncio
+    async def test_sweep_deletes_old_finished_jobs(self, async_db_session):
+        now = datetime.utcnow()
+
+        def job(status, finished_days_ago):
+            finished = now - timedelta(days=finished_days_ago) if finished_days_ago is not None else None
+            return Job(kind="test_old", payload_json="{}", status=status, run_after=now, finished_at=finished)
+
+        old_done, old_failed, recent, queued = job("succeeded", 10), job("failed", 8), job("succeeded", 1), job("queued", None)
+        async_db_session.add_all([old_done, old_failed, recent, queued])
+        await async_db_session.commit()
+
+        assert await jobs.sweep(async_db_session, retention_days=7, now=now) == {"expired": 0, "deleted": 2}
+        remaining = {j.id for j in (await async_db_session.scalars(select(Job))).all()}
+        assert remaining == {recent.id, queued.id}
+
+
+class TestJobEndpoints:
+    """Prefer: respond-async, long-poll and SSE."""
+
+    def test_generate_returns_202_and_long_poll_sees_result(self, job_workers, test_client, auth_headers, lesson_tree, db_session):
+        lesson_id = lesson_tree[0].id
+        response = test_client.post(
+            f"/api/lessons/{lesson_id}/generate",
+            headers={**auth_headers, "Prefer": "respond-async"},
+        )
+        assert response.status_code == 202
+        body = response.json()
+        assert response.headers["location"] == body["status_url"]
+
+        status = test_client.get(f"{body['status_url']}?wait=5", headers=auth_headers).json()
+        assert status["status"] == "succeeded"
+        assert status["result"]["lesson_id"] == lesson_id
+        assert db_session.query(LessonContent).filter_by(lesson_id=lesson_id).count() == 1
+
+        # With content in place the preference is ignored
+        again = test_client.post(
+            f"/api/lessons/{lesson_id}/generate",
+            headers={**auth_headers, "Prefer": "respond-async"},
+        )
+        assert again.status_code == 200
+
+    def test_without_prefer_header_stays_synchronous(self, test_client, auth_headers, lesson_tree):
+        response = test_client.post(f"/api/lessons/{lesson_tree[0].id}/generate", headers=auth_headers)
+        assert response.status_code == 200
+        assert "lesson_text" in response.json()
+
+    def test_events_stream_ends_with_final_status(self, job_workers, test_client, auth_headers, lesson_tree):
+        lesson_id = lesson_tree[0].id
+        body = test_client.post(
+            f"/api/lessons/{lesson_id}/regenerate",
+            headers={**auth_headers, "Prefer": "respond-async"},
+        ).json()
+
+        with test_client.stream("GET", body["events_url"], headers=auth_headers) as stream:
+            assert stream.headers["content-type"].startswith("text/event-stream")
+            events = [
+                json.loads(line[len("data: "):])
+                for line in stream.iter_lines()
+                if line.startswith("data: ")
+            ]
+
+        assert events[-1]["status"] == "succeeded"
+        assert events[-1]["result"]["lesson_id"] == lesson_id
+
+    def test_other_users_cannot_see_job(self, test_client, auth_headers, lesson_tree, db_session):
+        body = test_client.post(
+            f"/api/lessons/{lesson_tree[0].id}/generate",
+            headers={**auth_headers, "Prefer": "respond-async"},
+        ).json()
+
+        auth_service = AuthService()
+        other = User(name="Other", email="other@example.com", password_hash="x")
+        db_session.add(other)
+        db_session.commit()
+        other_headers = {"Authorization": f"Bearer {auth_service.create_access_token({'sub': str(other.id)})}"}
+
+        assert test_client.get(body["status_url"], headers=other_headers).status_code == 404
+        assert test_client.get(body["status_url"], headers=auth_headers).json()["status"] == "queued"
@@ -0,0 +1,136 @@
+"""
+Tests for the in-memory leaderboards and GET /social/leaderboard.
+"""
+from datetime import datetime
+
+import pytest
+
+from app.models import User, UserStats
+from app.services import metrics, xp
+from app.services.auth import AuthService
+from app.services.leaderboard import Leaderboards, RankIndex
+from app.services.xp import award_xp
+
+
+def _add_user(db_session, name, total_xp):
+    user = User(name=name, email=f"{name.lower()}@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.flush()
+    db_session.add(UserStats(user_id=user.id, total_xp=total_xp))
+    db_session.commit()
+    return user
+
+
+def _headers(user):
+    return {"Authorization": f"Bearer {AuthService().create_access_token({'sub': str(user.id)})}"}
+
+
+class TestRankIndex:
+    """Order-statistics operations."""
+
+    def test_orders_by_xp_then_id(self):
+        index = RankIndex()
+        for user_id, points in [(1, 50), (2, 300), (3, 50), (4, 120)]:
+            index.set(user_id, points)
+
+        assert index.slice(0, 4) == [(2, 300), (4, 120), (1, 50), (3, 50)]
+        assert index.position(3) == 3
+        assert index.position(99) is None
+
+    def test_updates_move_users(self):
+        index = RankIndex()
+        index.set(1, 10)
+        index.set(2, 20)
+        index.add(1, 15)
+
+        assert index.position(1) == 0
+        assert index.xp(1) == 25
+        assert len(index) == 2
+
+    def test_count_above(self):
+        index = RankIndex()
+        for user_id, points in [(1, 500), (2, 200), (3, 199), (4, 0)]:
+            index.set(user_id, points)
+
+        assert index.count_above(199) == 2
+        assert index.count_above(-1) == 4
+
+
+class TestLeaderboardEndpoint:
+    """Test GET /social/leaderboard."""
+
+    @pytest.fixture
+    def players(self, db_session):
+        """Users with XP; list it before test_client so the startup load sees them."""
+        return {name: _add_user(db_session, name, points) for name, points in [
+            ("Ann", 1500), ("Ben", 900), ("Cat", 450), ("Dan", 300), ("Eve", 250), ("Fox", 100),
+        ]}
+
+    def test_global_board_and_my_rank(self, players, test_client):
+        response = test_client.get("/api/social/leaderboard?limit=3", headers=_headers(players["Dan"]))
+        assert response.status_code == 200
+        data = response.json()
+        assert data["board"] == "global"
+        assert data["total"] == 6
+        assert [(e["rank"], e["name"], e["xp"]) for e in data["entries"]] == [
+            (1, "Ann", 1500), (2, "Ben", 900), (3, "Cat", 450),
+        ]
+        assert (data["my_rank"], data["my_xp"]) == (4, 300)
+
+    def test_around_me_pages_to_own_rank(self, players, test_client):
+        data = test_client.get(
+            "/api/social/leaderboard?limit=3&around_me=true", headers=_headers(players["Eve"])
+        ).json()
+        assert [e["name"] for e in data["entries"]] == ["Dan", "Eve", "Fox"]
+        assert [e["rank"] for e in data["entries"]] == [4, 5, 6]
+
+    def test_level_board_is_the_users_title_band(self, players, test_client):
+        data = test_client.get("/api/social/leaderboard?board=level", headers=_headers(players["Eve"])).json()
+        # "Confident" band: 200 <= xp < 500
+        assert data["level"] == 2
+        assert [(e["rank"], e["name"]) for e in data["entries"]] == [(1, "Cat"), (2, "Dan"), (3, "Eve")]
+        assert data["my_rank"] == 3
+
+        top = test_client.get("/api/social/leaderboard?board=level&level=5", headers=_headers(players["Eve"])).json()
+        assert [e["name"] for e in top["entries"]] == ["Ann"]
+        assert top["my_rank"] is None
+
+    def test_awards_show_up_on_next_read(self, players, test_client, async_session_factory):
+        headers = _headers(players["Fox"])
+        assert test_client.get("/api/social/leaderboard?board=weekly", headers=headers).json()["total"] == 0
+
+        async def award():
+            async with async_session_factory() as db:
+                await award_xp(db, players["Fox"].id, 1000, xp.LESSON)
+                await db.commit()
+
+        test_client.portal.call(award)
+        metrics.reset()
+
+        weekly = test_client.get("/api/social/leaderboard?board=weekly", headers=headers).json()
+        assert [(e["name"], e["xp"]) for e in weekly["entries"]] == [("Fox", 1000)]
+        overall = test_client.get("/api/social/leaderboard", headers=headers).json()
+        assert (overall["my_rank"], overall["my_xp"]) == (2, 1100)
+        assert metrics.get_counter("leaderboard.events_applied") == 1
+        assert metrics.get_counter("leaderboard.rebuilds") == 0
+
+    def test_rejects_unknown_board(self, players, test_client):
+        response = test_client.get("/api/social/leaderboard?board=monthly", headers=_headers(players["Ann"]))
+        assert response.status_code == 422
+
+
+class TestRebuild:
+    """Full reloads."""
+
+    @pytest.mark.asyncio
+    async def test_rebuild_when_due(self, async_db_session, db_session):
+        user = _add_user(db_session, "Ann", 40)
+        boards = Leaderboards(rebuild_seconds=0)
+        await boards.refresh(async_db_session)
+        db_session.query(UserStats).update({"total_xp": 75})
+        db_session.commit()
+
+        await boards.refresh(async_db_session)
+        assert boards.total.xp(user.id) == 75
+        assert boards.week is not None and boards.week.weekday() == 0
+        assert boards.week <= datetime.utcnow().date()
@@ -0,0 +1,134 @@
+"""
+Tests for deduplicated lesson generation (single flight + DB lease).
+"""
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import select
+
+from app.models import LessonContent, Lease
+from app.services import metrics
+from app.services.gemini import GeminiService
+from app.services.leases import acquire_lease, release_lease
+from app.services.lesson_generation import generate_lesson_content
+from app.services.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """Coalescing of concurrent calls."""
+
+    def setup_method(self):
+        metrics.reset()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_run(self):
+        flight = SingleFlight("test_flight")
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "done"
+
+        results = await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+
+        assert results == ["done"] * 5
+        assert calls == 1
+        assert metrics.get_counter("test_flight.coalesced") == 4
+        assert not flight.in_flight("k")
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_waiter(self):
+        flight = SingleFlight("test_flight")
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("model down")
+
+        results = await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+
+class TestLeases:
+    """Cross-worker leases."""
+
+    @pytest.mark.asyncio
+    async def test_second_owner_is_refused_until_release(self, async_db_session):
+        assert await acquire_lease(async_db_session, "k", 60, owner="a")
+        assert not await acquire_lease(async_db_session, "k", 60, owner="b")
+        await release_lease(async_db_session, "k", owner="a")
+        assert await acquire_lease(async_db_session, "k", 60, owner="b")
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_can_be_taken_over(self, async_db_session):
+        async_db_session.add(Lease(key="k", owner="dead", expires_at=datetime.utcnow() - timedelta(seconds=1)))
+        await async_db_session.commit()
+        assert await acquire_lease(async_db_session, "k", 60, owner="b")
+
+
+class TestLessonGeneration:
+    """A burst of generate calls makes one model call."""
+
+    def setup_method(self):
+        metrics.reset()
+
+    @pytest.mark.asyncio
+    async def test_burst_generates_once(self, async_db_session, async_session_factory, lesson_tree):
+        lesson_id = lesson_tree[0].id
+        original = GeminiService.generate_content
+        calls = 0
+
+        async def slow_generate(self, lesson):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return await original(self, lesson)
+
+        with patch.object(GeminiService, "generate_content", slow_generate):
+            results = await asyncio.gather(*(
+                generate_lesson_content(async_session_factory, lesson_id) for _ in range(10)
+            ))
+
+        assert calls == 1
+        assert len({r.lesson_text for r in results}) == 1
+        assert metrics.get_counter("lesson_generation.coalesced") == 9
+        rows = (await async_db_session.scalars(select(LessonContent).where(LessonContent.lesson_id == lesson_id))).all()
+        assert len(rows) == 1
+        assert (await async_db_session.scalars(select(Lease))).all() == []
+
+    @pytest.mark.asyncio
+    async def test_waits_for_other_workers_lease(self, async_db_session, async_session_factory, lesson_tree):
+        lesson_id = lesson_tree[0].id
+        assert await acquire_lease(async_db_session, f"lesson_content:{lesson_id}", 60, owner="other-worker")
+
+        async def other_worker_finishes():
+            await asyncio.sleep(0.1)
+            async with async_session_factory() as db:
+                service = GeminiService()
+                lesson = lesson_tree[0]
+                await service.save_content(db, lesson, service._generate_mock_content(lesson))
+                await release_lease(db, f"lesson_content:{lesson_id}", owner="other-worker")
+
+        with patch.object(GeminiService, "generate_content") as generate:
+            result, _ = await asyncio.gather(
+                generate_lesson_content(async_session_factory, lesson_id, replace=True),
+                other_worker_finishes(),
+            )
+
+        generate.assert_not_called()
+        assert result.lesson_id == lesson_id
+        assert metrics.get_counter("lesson_generation.lease_waits") == 1
+
+    def test_generate_endpoint(self, test_client, auth_headers, lesson_tree):
+        lesson_id = lesson_tree[0].id
+        first = test_client.post(f"/api/lessons/{lesson_id}/generate", headers=auth_headers)
+        second = test_client.post(f"/api/lessons/{lesson_id}/generate", headers=auth_headers)
+        assert first.status_code == 200
+        assert second.json()["created_at"] == first.json()["created_at"]
+
+        regenerated = test_client.post(f"/api/lessons/{lesson_id}/regenerate", headers=auth_headers)
+        assert regenerated.status_code == 200
+        assert regenerated.json()["lesson_text"] == first.json()["lesson_text"]
@@ -0,0 +1,114 @@
+"""
+Tests for lesson section splitting and BM25 retrieval for coach context.
+"""
+from unittest.mock import patch
+
+import pytest
+
+from app.models import LessonContent
+from app.services import lesson_index, metrics
+from app.services.ai_service import coach_chat
+from app.services.token_budget import estimate_tokens
+
+LESSON = """Intro paragraph before any heading.
+
+## Saving Money
+
+### Emergency Fund
+
+Keep three to six months of expenses in an emergency fund for job loss or medical bills.
+
+### Compound Interest
+
+Interest earns interest: compound growth rewards starting early and investing regularly.
+
+## Debt
+
+Credit cards charge high interest. Pay the card balance in full every month to avoid debt.
+"""
+
+
+class TestSplitSections:
+    """Markdown heading splits."""
+
+    def test_splits_at_level_two_and_three_headings(self):
+        sections = lesson_index.split_sections(LESSON)
+        assert [s.heading for s in sections] == [
+            "", "Saving Money", "Saving Money › Emergency Fund", "Saving Money › Compound Interest", "Debt",
+        ]
+        assert sections[0].body == "Intro paragraph before any heading."
+        assert [s.position for s in sections] == list(range(5))
+
+    def test_text_without_headings_is_one_section(self):
+        sections = lesson_index.split_sections("Just a paragraph.")
+        assert len(sections) == 1
+
+
+class TestRetrieval:
+    """BM25 ranking and incremental indexing."""
+
+    def setup_method(self):
+        lesson_index.reset()
+        metrics.reset()
+
+    def test_best_section_first(self):
+        found = lesson_index.relevant_sections(1, LESSON, "how big should my emergency fund be?", k=2)
+        assert found[0].heading == "Saving Money › Emergency Fund"
+
+    def test_stemming_matches_word_forms(self):
+        found = lesson_index.relevant_sections(1, LESSON, "what about my credit card balances", k=1)
+        assert found[0].heading == "Debt"
+
+    def test_cyrillic_word_forms(self):
+        text = "## Бюджет\n\nБюджет помогает планировать расходы.\n\n## Кредиты\n\nКредит стоит денег."
+        found = lesson_index.relevant_sections(1, text, "как составить бюджета план", k=1)
+        assert found[0].heading == "Бюджет"
+
+    def test_no_match_falls_back_to_opening_sections(self):
+        found = lesson_index.relevant_sections(1, LESSON, "hello!", k=2)
+        assert [s.position for s in found] == [0, 1]
+        assert metrics.get_counter("lesson_index.no_match") == 1
+
+    def test_reindexing_is_incremental(self):
+        lesson_index.index_lesson(1, LESSON)
+        assert lesson_index.index_lesson(1, LESSON) is lesson_index.index_lesson(1, LESSON)
+        assert metrics.get_counter("lesson_index.builds") == 1
+        assert metrics.get_counter("lesson_index.sections_analyzed") == 5
+
+        regenerated = LESSON.replace("Pay the card balance", "Always pay the card balance")
+        index = lesson_index.index_lesson(1, regenerated)
+        assert metrics.get_counter("lesson_index.builds") == 2
+        # Only the changed section is analysed again
+        assert metrics.get_counter("lesson_index.sections_analyzed") == 6
+        assert "Always pay" in index.sections[-1].body
+
+
+class TestCoachContext:
+    """The coach prompt carries the matching sections, not the start of the lesson."""
+
+    def setup_method(self):
+        lesson_index.reset()
+
+    @pytest.mark.asyncio
+    @patch("app.services.ai_service._call_gemini")
+    async def test_prompt_contains_relevant_section(self, mock_gemini, async_db_session, db_session, test_user, test_lesson):
+        mock_gemini.return_value = "ok"
+        filler = "\n\n".join(f"## Topic {i}\n\n" + "Unrelated filler about topic %d. " % i * 40 for i in range(10))
+        text = LESSON + "\n\n" + filler
+        content = db_session.query(LessonContent).filter_by(lesson_id=test_lesson.id).one()
+        content.lesson_text = text
+        db_session.commit()
+
+        user, _ = test_user
+        await coach_chat(db=async_db_session, user_id=user.id, lesson_id=test_lesson.id,
+                         user_message="How much should go into an emergency fund?")
+
+        system_prompt = mock_gemini.call_args.kwargs["system_instruction"]
+        assert "three to six months" in system_prompt
+        assert "Unrelated filler" not in system_prompt
+        assert estimate_tokens(system_prompt) < estimate_tokens(text)
+
+    def test_generated_content_is_indexed_on_save(self, test_client, auth_headers, lesson_tree):
+        metrics.reset()
+        test_client.post(f"/api/lessons/{lesson_tree[0].id}/generate", headers=auth_headers)
+        assert metrics.get_counter("lesson_index.builds") == 1
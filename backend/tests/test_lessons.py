@@ -0,0 +1,79 @@
+"""
+Tests for the lesson catalog endpoints.
+"""
+from app.models import LessonContent
+from app.services import versions
+
+
+def _complete(test_client, auth_headers, lessons):
+    for lesson in lessons:
+        response = test_client.post(f"/api/progress/{lesson.id}/complete", headers=auth_headers)
+        assert response.status_code == 200
+
+
+class TestLessonList:
+    """Test GET /lessons."""
+
+    def test_tree_shape_and_locking(self, test_client, auth_headers, lesson_tree):
+        response = test_client.get("/api/lessons", headers=auth_headers)
+        assert response.status_code == 200
+        levels = response.json()["levels"]
+        assert [lvl["level_number"] for lvl in levels] == [1, 2, 3]
+        assert [lvl["is_locked"] for lvl in levels] == [False, True, True]
+        assert [len(m["lessons"]) for m in levels[0]["modules"]] == [2, 2]
+
+    def test_completion_unlocks_next_level(self, test_client, auth_headers, lesson_tree):
+        level_one = [l for l in lesson_tree if l.level == 1]
+        _complete(test_client, auth_headers, level_one)
+
+        levels = test_client.get("/api/lessons", headers=auth_headers).json()["levels"]
+        assert [lvl["is_locked"] for lvl in levels] == [False, False, True]
+        completed = [l["is_completed"] for m in levels[0]["modules"] for l in m["lessons"]]
+        assert all(completed)
+
+    def test_constant_query_count(self, test_client, auth_headers, lesson_tree, query_counter):
+        test_client.get("/api/lessons", headers=auth_headers)  # warm the catalog and identity cache
+        query_counter.clear()
+
+        response = test_client.get("/api/lessons", headers=auth_headers)
+        assert response.status_code == 200
+        # catalog version + progress version (ETag) + per-level aggregate + completed ids
+        assert len(query_counter) == 4
+
+        query_counter.clear()
+        cached = test_client.get("/api/lessons", headers={**auth_headers, "If-None-Match": response.headers["etag"]})
+        assert cached.status_code == 304
+        assert len(query_counter) == 2
+
+    def test_content_delete_refreshes_catalog(self, test_client, auth_headers, test_lesson):
+        lessons = test_client.get("/api/lessons", headers=auth_headers).json()["levels"][0]["modules"][0]["lessons"]
+        assert lessons[0]["has_content"] is True
+
+        test_client.delete(f"/api/lessons/{test_lesson.id}/content", headers=auth_headers)
+
+        lessons = test_client.get("/api/lessons", headers=auth_headers).json()["levels"][0]["modules"][0]["lessons"]
+        assert lessons[0]["has_content"] is False
+
+    def test_sees_writes_from_other_processes(self, test_client, auth_headers, test_lesson, db_session):
+        test_client.get("/api/lessons", headers=auth_headers)  # warm the catalog
+
+        # What clear_content.py does: no access to this process's cache, only the shared version
+        db_session.query(LessonContent).delete()
+        db_session.execute(versions.shared_version_bump(db_session.bind.dialect.name, versions.CATALOG))
+        db_session.commit()
+
+        lessons = test_client.get("/api/lessons", headers=auth_headers).json()["levels"][0]["modules"][0]["lessons"]
+        assert lessons[0]["has_content"] is False
+
+
+class TestLessonDetail:
+    """Test GET /lessons/{id}."""
+
+    def test_locked_level_forbidden(self, test_client, auth_headers, lesson_tree):
+        level_two = next(l for l in lesson_tree if l.level == 2)
+        response = test_client.get(f"/api/lessons/{level_two.id}", headers=auth_headers)
+        assert response.status_code == 403
+
+    def test_unknown_lesson(self, test_client, auth_headers, lesson_tree):
+        response = test_client.get("/api/lessons/99999", headers=auth_headers)
+        assert response.status_code == 404
@@ -0,0 +1,32 @@
+"""
+Tests for GET /metrics access control.
+"""
+import pytest
+
+from app import main
+from app.services import metrics
+
+
+class TestMetricsEndpoint:
+    """Only scrapers holding METRICS_TOKEN see the metrics."""
+
+    @pytest.fixture
+    def token(self, monkeypatch):
+        monkeypatch.setattr(main.settings, "METRICS_TOKEN", "scrape")
+        return "scrape"
+
+    def test_disabled_without_token(self, test_client):
+        assert test_client.get("/metrics").status_code == 404
+
+    def test_rejects_missing_or_wrong_token(self, test_client, token, auth_headers):
+        assert test_client.get("/metrics").status_code == 401
+        assert test_client.get("/metrics", headers={"Authorization": "Bearer nope"}).status_code == 401
+        # A user's access token is not a metrics token
+        assert test_client.get("/metrics", headers=auth_headers).status_code == 401
+
+    def test_serves_snapshot_with_token(self, test_client, token):
+        metrics.reset()
+        metrics.inc("test.counter")
+        response = test_client.get("/metrics", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        assert response.json()["counters"]["test.counter"] == 1
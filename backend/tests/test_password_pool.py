@@ -0,0 +1,84 @@
+"""
+Tests for the bounded password hashing pool.
+"""
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from app import main
+from app.services import metrics
+from app.services.password_pool import PasswordPool, PasswordPoolSaturated
+
+
+class TestPasswordPool:
+    """Admission, fast reject and metrics."""
+
+    def setup_method(self):
+        metrics.reset()
+
+    @pytest.mark.asyncio
+    async def test_runs_work_off_the_loop(self):
+        pool = PasswordPool(workers=1, queue_limit=0)
+        loop_thread = threading.get_ident()
+
+        worker_thread = await pool.run("hash", threading.get_ident)
+
+        assert worker_thread != loop_thread
+        assert pool.in_flight == 0
+        assert metrics.get_histogram("password_pool.hash_ms").count == 1
+        assert metrics.get_histogram("password_pool.wait_ms").count == 1
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_queue_full(self):
+        pool = PasswordPool(workers=1, queue_limit=1)
+        release = threading.Event()
+
+        running = asyncio.ensure_future(pool.run("hash", release.wait))
+        queued = asyncio.ensure_future(pool.run("hash", release.wait))
+        await asyncio.sleep(0)
+
+        assert pool.in_flight == 2
+        assert metrics.get_gauge("password_pool.queue_depth") == 1
+        with pytest.raises(PasswordPoolSaturated):
+            await pool.run("hash", release.wait)
+        assert metrics.get_counter("password_pool.rejected") == 1
+
+        release.set()
+        await asyncio.gather(running, queued)
+        assert pool.in_flight == 0
+        assert metrics.get_gauge("password_pool.queue_depth") == 0
+
+
+class TestAuthFastReject:
+    """Signup and login answer 503 instead of queueing behind a full pool."""
+
+    def test_signup_rejected_when_saturated(self, test_client):
+        with patch("app.services.password_pool.PasswordPool.run", side_effect=PasswordPoolSaturated("full")):
+            response = test_client.post("/api/auth/signup", json={
+                "name": "Burst",
+                "email": "burst@example.com",
+                "password": "burstpassword",
+            })
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+
+    def test_login_rejected_when_saturated(self, test_client, test_user):
+        with patch("app.services.password_pool.PasswordPool.run", side_effect=PasswordPoolSaturated("full")):
+            response = test_client.post("/api/auth/login", json={
+                "email": "test@example.com",
+                "password": "testpassword123",
+            })
+        assert response.status_code == 503
+
+    def test_login_uses_pool(self, test_client, test_user, monkeypatch):
+        monkeypatch.setattr(main.settings, "METRICS_TOKEN", "scrape")
+        metrics.reset()
+        response = test_client.post("/api/auth/login", json={
+            "email": "test@example.com",
+            "password": "testpassword123",
+        })
+        assert response.status_code == 200
+        assert metrics.get_histogram("password_pool.verify_ms").count == 1
+        assert "password_pool.verify_ms" in test_client.get("/metrics", headers={"Authorization": "Bearer scrape"}).json()["histograms"]
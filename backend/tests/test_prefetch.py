@@ -0,0 +1,104 @@
+"""
+Tests for predictive prefetch of the next lessons' content.
+"""
+import pytest
+from fastapi import BackgroundTasks
+from sqlalchemy import select
+
+from app.api.progress import complete_lesson
+from app.models import Job, LessonContent
+from app.services import metrics, prefetch
+from app.services.ai_client import get_ai_client
+from app.services.catalog import get_catalog, invalidate_catalog
+from app.services.circuit_breaker import OPEN
+from app.services.jobs import PRIORITY_BACKGROUND
+from app.services.lesson_generation import generate_lesson_content
+
+
+def _queued_lessons(db_session):
+    db_session.expire_all()
+    jobs = db_session.query(Job).filter(Job.kind == "lesson_content").order_by(Job.id).all()
+    return [(job.payload_json, job.priority) for job in jobs]
+
+
+def _payload(lesson):
+    return f'{{"lesson_id": {lesson.id}}}'
+
+
+class TestPrefetch:
+    """Completing or opening a lesson queues the next ones."""
+
+    def setup_method(self):
+        metrics.reset()
+        prefetch.reset()
+
+    @pytest.mark.asyncio
+    async def test_following_crosses_modules_and_levels(self, async_db_session, lesson_tree):
+        catalog = await get_catalog(async_db_session)
+        # lesson_tree: 3 levels x 2 modules x 2 lessons, in course order
+        assert [e.id for e in catalog.following(lesson_tree[1].id, 2)] == [lesson_tree[2].id, lesson_tree[3].id]
+        assert [e.id for e in catalog.following(lesson_tree[3].id, 1)] == [lesson_tree[4].id]
+        assert catalog.following(lesson_tree[-1].id, 2) == []
+
+    def test_complete_queues_next_lessons_once(self, test_client, auth_headers, lesson_tree, db_session):
+        test_client.post(f"/api/progress/{lesson_tree[0].id}/complete", headers=auth_headers)
+        test_client.get(f"/api/lessons/{lesson_tree[0].id}/content", headers=auth_headers)
+
+        assert _queued_lessons(db_session) == [
+            (_payload(lesson_tree[1]), PRIORITY_BACKGROUND),
+            (_payload(lesson_tree[2]), PRIORITY_BACKGROUND),
+        ]
+        assert metrics.get_counter("prefetch.scheduled") == 2
+
+    def test_missing_content_queues_nothing(self, test_client, auth_headers, lesson_tree, db_session):
+        response = test_client.get(f"/api/lessons/{lesson_tree[0].id}/content", headers=auth_headers)
+        assert response.status_code == 404
+        assert _queued_lessons(db_session) == []
+
+    def test_lessons_with_content_are_skipped(self, test_client, auth_headers, lesson_tree, db_session):
+        db_session.add(LessonContent(lesson_id=lesson_tree[1].id, lesson_text="x", flashcards_json="[]", quiz_json="[]"))
+        db_session.commit()
+        invalidate_catalog()
+
+        test_client.post(f"/api/progress/{lesson_tree[0].id}/complete", headers=auth_headers)
+        assert _queued_lessons(db_session) == [(_payload(lesson_tree[2]), PRIORITY_BACKGROUND)]
+
+    def test_skipped_while_ai_is_unavailable(self, test_client, auth_headers, lesson_tree, db_session, monkeypatch):
+        monkeypatch.setattr(get_ai_client().breaker, "state", OPEN)
+        test_client.post(f"/api/progress/{lesson_tree[0].id}/complete", headers=auth_headers)
+
+        assert _queued_lessons(db_session) == []
+        assert metrics.get_counter("prefetch.skipped.busy") == 1
+
+    @pytest.mark.asyncio
+    async def test_runs_after_the_response_in_its_own_session(
+        self, async_db_session, async_session_factory, test_user, lesson_tree, db_session
+    ):
+        user, _ = test_user
+        background_tasks = BackgroundTasks()
+        await complete_lesson(
+            lesson_tree[0].id, background_tasks, db=async_db_session,
+            session_factory=async_session_factory, current_user=user,
+        )
+        await async_db_session.close()  # the request session is gone by the time it runs
+        assert _queued_lessons(db_session) == []
+
+        await background_tasks()
+        assert _queued_lessons(db_session) == [
+            (_payload(lesson_tree[1]), PRIORITY_BACKGROUND),
+            (_payload(lesson_tree[2]), PRIORITY_BACKGROUND),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_hit_rate(self, async_db_session, async_session_factory, lesson_tree):
+        queued = await prefetch.schedule_prefetch(async_db_session, lesson_tree[0].id)
+        assert queued == [lesson_tree[1].id, lesson_tree[2].id]
+
+        await generate_lesson_content(async_session_factory, lesson_tree[1].id)  # what the job does
+        prefetch.record_open(lesson_tree[1].id, has_content=True)
+        prefetch.record_open(lesson_tree[2].id, has_content=False)
+        prefetch.record_open(lesson_tree[1].id, has_content=True)  # second reader: not counted again
+
+        assert metrics.get_counter("prefetch.hits") == 1
+        assert metrics.get_counter("prefetch.late") == 1
+        assert metrics.get_gauge("prefetch.hit_rate") == 0.5
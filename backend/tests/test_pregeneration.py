@@ -0,0 +1,150 @@
+"""
+Tests for bulk lesson pre-generation (the `app.pregenerate` CLI).
+"""
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models import LessonContent
+from app.pregenerate import parse_args
+from app.schemas.lesson import GeneratedContentSchema
+from app.services import metrics, pregeneration, versions
+from app.services.admission import OverloadedError
+from app.services.ai_client import AITimeoutError
+from app.services.gemini import GeminiService
+from app.services.pregeneration import Checkpoint, pregenerate
+
+_original_generate = GeminiService.generate_content
+
+
+class TestPregenerate:
+    """Missing lessons are generated once, with resume across runs."""
+
+    def setup_method(self):
+        metrics.reset()
+
+    async def _content_count(self, db):
+        await db.rollback()
+        return await db.scalar(select(func.count(LessonContent.id)))
+
+    @pytest.mark.asyncio
+    async def test_generates_missing_lessons_concurrently(self, async_db_session, async_session_factory, lesson_tree, tmp_path):
+        active = peak = 0
+
+        async def slow_generate(self, lesson):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.1)
+            active -= 1
+            return await _original_generate(self, lesson)
+
+        checkpoint = tmp_path / "checkpoint.json"
+        with patch.object(GeminiService, "generate_content", slow_generate):
+            report = await pregenerate(async_session_factory, concurrency=3, checkpoint_path=str(checkpoint))
+
+        assert report.pending == report.generated == len(lesson_tree)
+        assert report.failed == {}
+        assert peak == 3
+        assert await self._content_count(async_db_session) == len(lesson_tree)
+        assert sorted(json.loads(checkpoint.read_text())["completed"]) == sorted(l.id for l in lesson_tree)
+        assert "lessons/min" in report.summary()
+
+        again = await pregenerate(async_session_factory, checkpoint_path=str(checkpoint))
+        assert again.pending == 0
+
+    @pytest.mark.asyncio
+    async def test_failures_are_checkpointed_and_retried_on_request(self, async_session_factory, lesson_tree, tmp_path):
+        broken_id = lesson_tree[1].id
+
+        async def flaky_generate(self, lesson):
+            if lesson.id == broken_id:
+                raise RuntimeError("model down")
+            return await _original_generate(self, lesson)
+
+        path = str(tmp_path / "checkpoint.json")
+        with patch.object(GeminiService, "generate_content", flaky_generate):
+            first = await pregenerate(async_session_factory, concurrency=2, checkpoint_path=path)
+        assert list(first.failed) == [broken_id]
+        assert Checkpoint.load(path).failed == {broken_id: "model down"}
+
+        resumed = await pregenerate(async_session_factory, checkpoint_path=path)
+        assert resumed.pending == 0
+        assert resumed.skipped_failed == 1
+
+        retried = await pregenerate(async_session_factory, checkpoint_path=path, retry_failed=True)
+        assert retried.generated == 1
+        assert Checkpoint.load(path).failed == {}
+
+    @pytest.mark.asyncio
+    async def test_transient_failures_are_retried(self, async_session_factory, lesson_tree):
+        calls = 0
+
+        async def shed_once(self, lesson):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise OverloadedError("bulk", "queue full", retry_after=0.01)
+            return await _original_generate(self, lesson)
+
+        with patch.object(GeminiService, "generate_content", shed_once):
+            report = await pregenerate(async_session_factory, lesson_ids=[lesson_tree[0].id])
+
+        assert report.generated == 1
+        assert report.failed == report.deferred == {}
+        assert metrics.get_counter("pregenerate.retries") == 1
+
+    @pytest.mark.asyncio
+    async def test_lasting_transient_failures_stay_pending(self, async_session_factory, lesson_tree, tmp_path, monkeypatch):
+        monkeypatch.setattr(pregeneration, "RETRY_DELAY_SECONDS", 0)
+        lesson_id = lesson_tree[0].id
+
+        async def timing_out(self, lesson):
+            raise AITimeoutError("AI call timed out after 30s")
+
+        path = str(tmp_path / "checkpoint.json")
+        with patch.object(GeminiService, "generate_content", timing_out):
+            report = await pregenerate(async_session_factory, lesson_ids=[lesson_id], checkpoint_path=path)
+
+        assert report.deferred == {lesson_id: "AI call timed out after 30s"}
+        assert report.failed == {}
+        assert Checkpoint.load(path).failed == {}
+        assert metrics.get_counter("pregenerate.retries") == pregeneration.TRANSIENT_RETRIES
+
+        resumed = await pregenerate(async_session_factory, lesson_ids=[lesson_id], checkpoint_path=path)
+        assert resumed.generated == 1
+
+    @pytest.mark.asyncio
+    async def test_generated_content_moves_the_catalog_version(self, async_session_factory, lesson_tree):
+        async with async_session_factory() as db:
+            before = await versions.get_shared_version(db, versions.CATALOG)
+
+        await pregenerate(async_session_factory, lesson_ids=[lesson_tree[0].id])
+
+        async with async_session_factory() as db:
+            assert await versions.get_shared_version(db, versions.CATALOG) > before
+
+    @pytest.mark.asyncio
+    async def test_invalid_content_is_discarded(self, async_db_session, async_session_factory, lesson_tree):
+        async def empty_generate(self, lesson):
+            return GeneratedContentSchema(lesson_text="Text", flashcards=[], quiz=[])
+
+        with patch.object(GeminiService, "generate_content", empty_generate):
+            report = await pregenerate(async_session_factory, lesson_ids=[lesson_tree[0].id])
+
+        assert report.failed == {lesson_tree[0].id: "invalid content: no flashcards"}
+        assert await self._content_count(async_db_session) == 0
+
+    @pytest.mark.asyncio
+    async def test_lessons_with_content_are_left_alone(self, async_session_factory, test_lesson):
+        report = await pregenerate(async_session_factory)
+        assert report.pending == 0
+
+    def test_cli_arguments(self):
+        args = parse_args(["--concurrency", "8", "--retry-failed", "3", "5"])
+        assert args.concurrency == 8
+        assert args.retry_failed
+        assert args.lesson_ids == [3, 5]
@@ -0,0 +1,262 @@
+"""
+Tests for progress endpoints — dashboard summary aggregation.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.api.profile import BossAction, boss_turn
+from app.models import BossBattle, UserProgress, UserLevelProgress, UserStats, XpDaily, XpEvent, XpWeekly
+from app.services import xp
+from app.services.progress_counters import get_module_counters, increment_completed, rebuild_counters
+from app.services.xp import award_xp, rebuild_xp
+
+
+def _complete(test_client, auth_headers, lessons):
+    for lesson in lessons:
+        response = test_client.post(f"/api/progress/{lesson.id}/complete", headers=auth_headers)
+        assert response.status_code == 200
+
+
+class TestSummary:
+    """Test GET /progress/summary."""
+
+    def test_summary_counts(self, test_client, auth_headers, lesson_tree):
+        level_one = [l for l in lesson_tree if l.level == 1]
+        first_of_level_two = next(l for l in lesson_tree if l.level == 2)
+        _complete(test_client, auth_headers, level_one + [first_of_level_two])
+
+        response = test_client.get("/api/progress/summary", headers=auth_headers)
+        assert response.status_code == 200
+        data = response.json()
+
+        assert data["lessons_completed"] == 5
+        assert data["modules_completed"] == 2
+        assert data["levels_completed"] == 1
+        assert len(data["recent_activity"]) == 5
+
+        levels = data["level_progress"]
+        assert [lp["level"] for lp in levels] == [1, 2, 3, 4, 5]
+        assert [lp["total_lessons"] for lp in levels] == [4, 4, 4, 0, 0]
+        assert [lp["completed_lessons"] for lp in levels] == [4, 1, 0, 0, 0]
+        assert [lp["progress_percent"] for lp in levels] == [100.0, 25.0, 0, 0, 0]
+        assert [lp["is_locked"] for lp in levels] == [False, False, True, True, True]
+
+    def test_summary_query_budget(self, test_client, auth_headers, lesson_tree, query_counter):
+        test_client.get("/api/progress/summary", headers=auth_headers)  # creates UserStats, caches the user
+        query_counter.clear()
+
+        response = test_client.get("/api/progress/summary", headers=auth_headers)
+        assert response.status_code == 200
+        # catalog version + progress version (ETag) + stats + (level, module) aggregate + recent activity
+        assert len(query_counter) == 5
+
+
+class TestProgressCounters:
+    """Test the denormalized per-module completion counters."""
+
+    def test_completion_increments_once(self, test_client, auth_headers, test_user, db_session, lesson_tree):
+        user, _ = test_user
+        lesson = lesson_tree[0]
+        _complete(test_client, auth_headers, [lesson, lesson])
+
+        counters = db_session.query(UserLevelProgress).filter(UserLevelProgress.user_id == user.id).all()
+        assert [(c.level, c.module, c.completed_count) for c in counters] == [(1, 1, 1)]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_first_completions_all_count(self, async_session_factory, test_user):
+        user, _ = test_user
+
+        async def complete():
+            async with async_session_factory() as db:
+                await increment_completed(db, user.id, 2, 1)
+                await db.commit()
+
+        await asyncio.gather(*(complete() for _ in range(3)))
+
+        async with async_session_factory() as db:
+            assert await get_module_counters(db, user.id) == {(2, 1): 3}
+
+    def test_profile_lessons_completed(self, test_client, auth_headers, lesson_tree):
+        _complete(test_client, auth_headers, lesson_tree[:3])
+
+        response = test_client.get("/api/social/me", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["stats"]["lessons_completed"] == 3
+
+    def test_rebuild_from_user_progress(self, test_client, auth_headers, test_user, db_session, lesson_tree):
+        user, _ = test_user
+        for lesson in lesson_tree[:4]:
+            db_session.add(UserProgress(
+                user_id=user.id, lesson_id=lesson.id, completed=True,
+                completed_at=datetime.utcnow(), xp_earned=20,
+            ))
+        db_session.commit()
+
+        assert test_client.get("/api/progress/summary", headers=auth_headers).json()["lessons_completed"] == 0
+
+        rows = rebuild_counters(db_session)
+        assert rows == 2
+
+        data = test_client.get("/api/progress/summary", headers=auth_headers).json()
+        assert data["lessons_completed"] == 4
+        assert data["modules_completed"] == 2
+
+
+class TestCompletion:
+    """Test the completion upsert."""
+
+    def test_repeat_completion_awards_once(self, test_client, auth_headers, test_user, db_session, lesson_tree):
+        user, _ = test_user
+        lesson = lesson_tree[0]
+        first = test_client.post(f"/api/progress/{lesson.id}/complete", headers=auth_headers).json()
+        second = test_client.post(f"/api/progress/{lesson.id}/complete", headers=auth_headers).json()
+
+        assert second == first
+        assert db_session.query(UserProgress).filter(UserProgress.user_id == user.id).count() == 1
+        stats = db_session.query(UserStats).filter(UserStats.user_id == user.id).one()
+        assert stats.total_xp == first["xp_earned"]
+        assert stats.streak_days == 1
+
+    def test_completes_an_unfinished_row(self, test_client, auth_headers, test_user, db_session, lesson_tree):
+        user, _ = test_user
+        lesson = lesson_tree[0]
+        db_session.add(UserProgress(user_id=user.id, lesson_id=lesson.id, completed=False))
+        db_session.commit()
+
+        _complete(test_client, auth_headers, [lesson])
+
+        progress = db_session.query(UserProgress).filter(UserProgress.user_id == user.id).one()
+        db_session.refresh(progress)
+        assert progress.completed and progress.completed_at is not None
+
+
+class TestAwardXp:
+    """Test the atomic XP, title and streak update."""
+
+    @pytest.mark.asyncio
+    async def test_creates_and_accumulates(self, async_db_session, test_user):
+        user, _ = test_user
+        first = await award_xp(async_db_session, user.id, 150, xp.LESSON)
+        assert (first.total_xp, first.current_title, first.streak_days) == (150, "Beginner", 1)
+
+        second = await award_xp(async_db_session, user.id, 60, xp.LESSON)
+        await async_db_session.commit()
+        assert (second.total_xp, second.current_title, second.streak_days) == (210, "Confident", 1)
+
+    @pytest.mark.asyncio
+    async def test_streak_follows_calendar_days(self, async_db_session, test_user):
+        user, _ = test_user
+        day = datetime(2026, 3, 10, 23, 30)
+        await award_xp(async_db_session, user.id, 10, xp.LESSON, now=day)
+
+        assert (await award_xp(async_db_session, user.id, 10, xp.LESSON, now=day + timedelta(hours=1))).streak_days == 2
+        assert (await award_xp(async_db_session, user.id, 10, xp.LESSON, now=day + timedelta(hours=12))).streak_days == 2
+        assert (await award_xp(async_db_session, user.id, 10, xp.LESSON, now=day + timedelta(days=3))).streak_days == 1
+
+    @pytest.mark.asyncio
+    async def test_non_activity_award_keeps_streak(self, async_db_session, test_user):
+        user, _ = test_user
+        day = datetime(2026, 3, 10, 12, 0)
+        await award_xp(async_db_session, user.id, 10, xp.LESSON, now=day)
+
+        award = await award_xp(async_db_session, user.id, 100, xp.LESSON, now=day + timedelta(days=5), activity=False)
+        assert (award.total_xp, award.streak_days) == (110, 1)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_awards_all_land(self, async_session_factory, test_user):
+        user, _ = test_user
+
+        async def award():
+            async with async_session_factory() as db:
+                await award_xp(db, user.id, 10, xp.LESSON)
+                await db.commit()
+
+        await asyncio.gather(*(award() for _ in range(5)))
+
+        async with async_session_factory() as db:
+            assert (await award_xp(db, user.id, 0, xp.LESSON)).total_xp == 50
+
+
+class TestXpLedger:
+    """Test the XP ledger and its rollups."""
+
+    @pytest.mark.asyncio
+    async def test_award_writes_ledger_and_rollups(self, async_db_session, test_user, db_session):
+        user, _ = test_user
+        monday = datetime(2026, 3, 9, 9, 0)
+        await award_xp(async_db_session, user.id, 20, xp.LESSON, ref_id=7, now=monday)
+        await award_xp(async_db_session, user.id, 30, xp.TRAP, now=monday + timedelta(hours=2))
+        await award_xp(async_db_session, user.id, 200, xp.BOSS, now=monday + timedelta(days=6))
+        await award_xp(async_db_session, user.id, 10, xp.LESSON, now=monday + timedelta(days=7))
+        await async_db_session.commit()
+
+        events = db_session.query(XpEvent).order_by(XpEvent.id).all()
+        assert [(e.amount, e.source, e.ref_id) for e in events][0] == (20, "lesson", 7)
+        assert sum(e.amount for e in events) == 260
+        daily = {(r.day.isoformat(), r.xp) for r in db_session.query(XpDaily)}
+        assert daily == {("2026-03-09", 50), ("2026-03-15", 200), ("2026-03-16", 10)}
+        weekly = {(r.week.isoformat(), r.xp) for r in db_session.query(XpWeekly)}
+        assert weekly == {("2026-03-09", 250), ("2026-03-16", 10)}
+
+    def test_every_award_path_writes_the_ledger(self, test_client, auth_headers, test_user, db_session, lesson_tree):
+        user, _ = test_user
+        _complete(test_client, auth_headers, [lesson_tree[0], lesson_tree[0]])
+
+        trap = test_client.post("/api/game/traps/start", json={"scenario_type": "scam"}, headers=auth_headers).json()
+        for _ in range(trap["total_steps"]):
+            result = test_client.post(
+                f"/api/game/traps/{trap['id']}/choose", json={"scenario_id": trap["id"], "choice_index": 0}, headers=auth_headers
+            ).json()
+        assert result["finished"]
+        again = test_client.post(
+            f"/api/game/traps/{trap['id']}/choose", json={"scenario_id": trap["id"], "choice_index": 0}, headers=auth_headers
+        )
+        assert again.status_code == 400
+
+        sources = sorted((e.source, e.amount) for e in db_session.query(XpEvent).filter(XpEvent.user_id == user.id))
+        assert sources == sorted([("lesson", 20), ("trap", result["xp_earned"])])
+        stats = db_session.query(UserStats).filter(UserStats.user_id == user.id).one()
+        assert stats.total_xp == 20 + result["xp_earned"]
+
+    @pytest.mark.asyncio
+    async def test_rebuild_from_ledger(self, async_db_session, test_user, db_session):
+        user, _ = test_user
+        await award_xp(async_db_session, user.id, 150, xp.LESSON, now=datetime(2026, 3, 9, 9, 0))
+        await award_xp(async_db_session, user.id, 100, xp.BOSS, now=datetime(2026, 3, 20, 9, 0))
+        await async_db_session.commit()
+        db_session.query(XpWeekly).delete()
+        db_session.query(UserStats).update({"total_xp": 0, "current_title": "Beginner"})
+        db_session.commit()
+
+        assert rebuild_xp(db_session) == 1
+
+        stats = db_session.query(UserStats).filter(UserStats.user_id == user.id).one()
+        assert (stats.total_xp, stats.current_title) == (250, "Confident")
+        weekly = {(r.week.isoformat(), r.xp) for r in db_session.query(XpWeekly)}
+        assert weekly == {("2026-03-09", 150), ("2026-03-16", 100)}
+
+    @pytest.mark.asyncio
+    async def test_double_submitted_boss_win_awards_once(self, async_session_factory, test_user, db_session):
+        user, _ = test_user
+        battle = BossBattle(user_id=user.id, boss_name="Inflation Dragon", boss_level=1, boss_hp=20, player_hp=100)
+        db_session.add(battle)
+        db_session.commit()
+
+        async with async_session_factory() as first, async_session_factory() as second:
+            # The second submit read the battle while it was still active
+            stale = await second.get(BossBattle, battle.id)
+            await second.commit()
+            assert stale.status == "active"
+
+            action = BossAction(battle_id=battle.id, answer_idx=1)
+            results = [
+                await boss_turn(action, db=first, current_user=user),
+                await boss_turn(action, db=second, current_user=user),
+            ]
+
+        assert [r.outcome for r in results] == ["won", "won"]
+        events = db_session.query(XpEvent).filter(XpEvent.user_id == user.id).all()
+        assert [(e.source, e.amount) for e in events] == [("boss", 100)]
+        assert db_session.query(UserStats).filter(UserStats.user_id == user.id).one().total_xp == 100
@@ -0,0 +1,178 @@
+"""
+Query-plan audit: the per-user queries behind the API must be index lookups.
+
+The SQLite sweep records every statement a set of endpoints executes
+against seeded data and runs EXPLAIN QUERY PLAN on it. The Postgres check
+runs EXPLAIN on the hot per-user queries with sequential scans disabled;
+it needs TEST_POSTGRES_URL (a sync SQLAlchemy URL to a scratch database)
+and is skipped without it.
+"""
+import json
+import os
+import re
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event, func, select, text
+
+from app.database import Base
+from app.models import (
+    BossBattle, BudgetScenario, DictionaryCache, Duel, HabitTracker,
+    RegeneratedContent, TrapScenario, UserProgress,
+)
+
+from conftest import async_engine, engine
+
+# Whole-table reads that are intended: the lesson catalog loads every lesson
+FULL_READ_TABLES = {"lessons", "lesson_content"}
+
+SQLITE_FULL_SCAN = re.compile(r"^SCAN (\w+)")
+
+
+def hot_queries(user_id: int, lesson_id: int):
+    """The per-user lookups the new indexes exist for, as the API issues them."""
+    return {
+        "my duels": select(Duel).where(
+            (Duel.challenger_id == user_id) | (Duel.opponent_id == user_id)
+        ).order_by(Duel.created_at.desc()).limit(20),
+        "habits": select(HabitTracker).where(HabitTracker.user_id == user_id).order_by(HabitTracker.created_at.desc()),
+        "active habits": select(func.count(HabitTracker.id)).where(
+            HabitTracker.user_id == user_id, HabitTracker.is_active == True
+        ),
+        "traps": select(TrapScenario).where(TrapScenario.user_id == user_id),
+        "budgets": select(BudgetScenario).where(BudgetScenario.user_id == user_id),
+        "boss battles": select(BossBattle).where(BossBattle.user_id == user_id),
+        "completed lessons": select(UserProgress.lesson_id).where(
+            UserProgress.user_id == user_id, UserProgress.completed == True
+        ),
+        "lesson completed": select(UserProgress.id).where(
+            UserProgress.user_id == user_id, UserProgress.lesson_id == lesson_id, UserProgress.completed == True
+        ),
+        "dictionary": select(DictionaryCache).where(DictionaryCache.term == "apr", DictionaryCache.user_level == 1),
+        "dictionary fallback": select(DictionaryCache).where(DictionaryCache.term == "apr").order_by(
+            func.abs(DictionaryCache.user_level - 1), DictionaryCache.created_at.desc()
+        ),
+        "regenerated": select(RegeneratedContent).where(
+            RegeneratedContent.lesson_id == lesson_id,
+            RegeneratedContent.params_hash == "abc",
+            RegeneratedContent.user_level == 1,
+        ),
+        "regenerated fallback": select(RegeneratedContent).where(RegeneratedContent.lesson_id == lesson_id).order_by(
+            func.abs(RegeneratedContent.user_level - 1), RegeneratedContent.created_at.desc()
+        ),
+    }
+
+
+def sqlite_full_scans(conn, statement, parameters=()):
+    """Tables a statement reads in full, per EXPLAIN QUERY PLAN."""
+    plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", tuple(parameters)).fetchall()
+    scans = []
+    for row in plan:
+        match = SQLITE_FULL_SCAN.match(row[-1])
+        if match and match.group(1) not in FULL_READ_TABLES:
+            scans.append(row[-1])
+    return scans
+
+
+def postgres_seq_scans(plan):
+    """Relations read by Seq Scan nodes anywhere in an EXPLAIN (FORMAT JSON) plan."""
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(postgres_seq_scans(child))
+    return found
+
+
+def seed(session, user_id, lesson_id):
+    session.add_all([
+        Duel(challenger_id=user_id, level=1),
+        HabitTracker(user_id=user_id, habit_name="Save", completions_json="[]"),
+        TrapScenario(user_id=user_id, scenario_type="scam"),
+        BudgetScenario(user_id=user_id, monthly_income=1000),
+        BossBattle(user_id=user_id, boss_name="Inflation Dragon"),
+        UserProgress(user_id=user_id, lesson_id=lesson_id, completed=True, completed_at=datetime.utcnow()),
+        DictionaryCache(term="apr", user_level=1, definition="d", example="e"),
+        RegeneratedContent(lesson_id=lesson_id, user_level=1, params_hash="abc", content_json="{}"),
+    ])
+    session.commit()
+
+
+class TestSqlitePlans:
+    """Index use on SQLite, the development database."""
+
+    def test_hot_queries_use_indexes(self, db_session, test_user, test_lesson):
+        user, _ = test_user
+        seed(db_session, user.id, test_lesson.id)
+        with engine.connect() as conn:
+            for name, query in hot_queries(user.id, test_lesson.id).items():
+                compiled = query.compile(engine, compile_kwargs={"literal_binds": True})
+                assert sqlite_full_scans(conn, str(compiled)) == [], name
+
+    def test_endpoint_queries_use_indexes(self, test_client, db_session, auth_headers, test_user, test_lesson):
+        user, _ = test_user
+        seed(db_session, user.id, test_lesson.id)
+        habit_id = db_session.scalar(select(HabitTracker.id).where(HabitTracker.user_id == user.id))
+
+        executed = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+                executed.append((statement, parameters))
+
+        event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+        try:
+            for method, path in [
+                ("GET", "/api/lessons"),
+                ("GET", f"/api/lessons/{test_lesson.id}"),
+                ("GET", f"/api/lessons/{test_lesson.id}/content"),
+                ("POST", f"/api/progress/{test_lesson.id}/complete"),
+                ("GET", "/api/progress/summary"),
+                ("GET", "/api/game/duels/my"),
+                ("GET", "/api/game/habits"),
+                ("POST", f"/api/game/habits/{habit_id}/check"),
+                ("GET", "/api/social/me"),
+                ("GET", f"/api/ai/coach/history?lesson_id={test_lesson.id}"),
+            ]:
+                response = test_client.request(method, path, headers=auth_headers)
+                assert response.status_code < 500, path
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+        assert executed
+        with engine.connect() as conn:
+            for statement, parameters in executed:
+                assert sqlite_full_scans(conn, statement, parameters) == [], statement
+
+
+@pytest.fixture
+def postgres_engine():
+    url = os.environ.get("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    pg = create_engine(url)
+    try:
+        pg.connect().close()
+    except Exception as e:
+        pytest.skip(f"Postgres unavailable: {e}")
+    Base.metadata.create_all(bind=pg)
+    try:
+        yield pg
+    finally:
+        Base.metadata.drop_all(bind=pg)
+        pg.dispose()
+
+
+class TestPostgresPlans:
+    """Index use on Postgres, the production database."""
+
+    def test_hot_queries_use_indexes(self, postgres_engine):
+        with postgres_engine.connect() as conn:
+            # Tiny tables are cheapest to read in full; make the planner show what it can use
+            conn.execute(text("SET enable_seqscan = off"))
+            for name, query in hot_queries(1, 1).items():
+                compiled = query.compile(postgres_engine, compile_kwargs={"literal_binds": True})
+                plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                assert postgres_seq_scans(plan[0]["Plan"]) == [], name
@@ -0,0 +1,144 @@
+"""
+Tests for the token-bucket rate limiter and 429 responses.
+"""
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import select
+
+from app.models import RateLimitBucket
+from app.services import rate_limiter
+from app.services.rate_limiter import (
+    DatabaseRateLimiter, MemoryRateLimiter, RateLimit, RateLimitExceeded, parse_limits,
+)
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestParseLimits:
+    def test_parses_spec(self):
+        limits = parse_limits("coach=15/60, dictionary=30/30")
+        assert limits["coach"] == RateLimit(15, 60.0)
+        assert limits["dictionary"].rate == 1.0
+
+    def test_rejects_bad_entry(self):
+        with pytest.raises(ValueError, match="coach=fast"):
+            parse_limits("coach=fast")
+
+
+class TestMemoryRateLimiter:
+    """Bucket arithmetic and eviction."""
+
+    def test_burst_then_refill(self):
+        clock = FakeClock()
+        limiter = MemoryRateLimiter(clock=clock)
+        limit = RateLimit(3, 30)  # one token per 10s
+
+        assert [limiter.check("k", limit) for _ in range(3)] == [0, 0, 0]
+        assert limiter.check("k", limit) == pytest.approx(10)
+
+        clock.now += 5
+        assert limiter.check("k", limit) == pytest.approx(5)
+        clock.now += 5
+        assert limiter.check("k", limit) == 0
+
+    def test_idle_buckets_are_evicted_once_full(self):
+        clock = FakeClock()
+        limiter = MemoryRateLimiter(clock=clock)
+        limit = RateLimit(2, 20)
+        limiter.check("a", limit)
+        limiter.check("b", limit)
+        assert len(limiter) == 2
+
+        clock.now += 11  # both buckets have refilled
+        limiter.check("c", limit)
+        assert len(limiter) == 1
+
+    def test_over_max_keys_evicts_full_buckets_anywhere(self):
+        clock = FakeClock()
+        limiter = MemoryRateLimiter(max_keys=3, clock=clock)
+        limiter.check("slow", RateLimit(2, 600))  # least recently used, refills for 300s
+        limiter.check("a", RateLimit(2, 20))
+        limiter.check("b", RateLimit(2, 20))
+
+        clock.now += 11  # "a" and "b" are full again, "slow" is not
+        limiter.check("c", RateLimit(2, 20))
+        assert len(limiter) == 2
+        assert limiter.check("slow", RateLimit(2, 600)) == 0
+        assert limiter.check("slow", RateLimit(2, 600)) > 0  # its spent token was remembered
+
+    def test_refilling_buckets_are_never_evicted(self):
+        limiter = MemoryRateLimiter(max_keys=10, clock=FakeClock())
+        limit = RateLimit(1, 60)
+        for user_id in range(50):
+            assert limiter.check(f"coach:{user_id}", limit) == 0
+        assert len(limiter) == 50
+        # Dropping any of them would let that user straight back in
+        assert all(limiter.check(f"coach:{user_id}", limit) > 0 for user_id in range(50))
+
+
+class TestDatabaseRateLimiter:
+    """Buckets shared between workers through the database."""
+
+    @pytest.mark.asyncio
+    async def test_workers_share_buckets(self, async_session_factory):
+        clock = FakeClock()
+        worker_a = DatabaseRateLimiter(async_session_factory, clock=clock)
+        worker_b = DatabaseRateLimiter(async_session_factory, clock=clock)
+        limit = RateLimit(2, 20)
+
+        assert await worker_a.acquire("coach:1", limit) == 0
+        assert await worker_b.acquire("coach:1", limit) == 0
+        assert await worker_a.acquire("coach:1", limit) == pytest.approx(10)
+        assert await worker_b.acquire("coach:2", limit) == 0
+
+        clock.now += 10
+        assert await worker_b.acquire("coach:1", limit) == 0
+
+    @pytest.mark.asyncio
+    async def test_full_buckets_are_swept(self, async_session_factory, async_db_session):
+        clock = FakeClock()
+        limiter = DatabaseRateLimiter(async_session_factory, clock=clock)
+        limit = RateLimit(2, 20)
+        await limiter.acquire("coach:1", limit)
+
+        clock.now += DatabaseRateLimiter.SWEEP_INTERVAL_SECONDS + 1
+        await limiter.acquire("coach:2", limit)
+
+        keys = (await async_db_session.scalars(select(RateLimitBucket.key))).all()
+        assert keys == ["coach:2"]
+
+
+class TestRateLimitedEndpoints:
+    """429 with Retry-After instead of string matching."""
+
+    @patch("app.services.ai_service._call_gemini")
+    def test_coach_returns_retry_after(self, mock_gemini, test_client, auth_headers, test_lesson, monkeypatch):
+        mock_gemini.return_value = "ok"
+        monkeypatch.setattr(rate_limiter, "get_limits", lambda: {"coach": RateLimit(1, 60)})
+        body = {"lesson_id": test_lesson.id, "user_message": "Hi"}
+
+        assert test_client.post("/api/ai/coach", json=body, headers=auth_headers).status_code == 200
+        response = test_client.post("/api/ai/coach", json=body, headers=auth_headers)
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "60"
+
+        streamed = test_client.post("/api/ai/coach/stream", json=body, headers=auth_headers)
+        assert streamed.status_code == 429
+
+    @pytest.mark.asyncio
+    async def test_limits_are_per_endpoint(self, monkeypatch):
+        monkeypatch.setattr(rate_limiter, "get_limits", lambda: {
+            "coach": RateLimit(1, 60), "dictionary": RateLimit(5, 60),
+        })
+        await rate_limiter.enforce("coach", 1)
+        with pytest.raises(RateLimitExceeded) as exc:
+            await rate_limiter.enforce("coach", 1)
+        assert exc.value.retry_after == pytest.approx(60, abs=1)
+        await rate_limiter.enforce("dictionary", 1)